@@ -1,56 +1,232 @@
+import datetime
 import os
-from datetime import timedelta
+import signal
+from typing import Any
 
-from backend.extensions import db
+import click
+from backend.compression import init_compression
+from backend.config import config_from_env
+from backend.db_pool import init_db_pool
+from backend.db_routing import init_db_routing
+from backend.enums.transaction_enums import TransactionType
+from backend.extensions import db, redis_cache
+from backend.jobs import Worker, init_jobs
+from backend.json_codec import FastJSONProvider
+
+# Imported for their tables, so `create-db` creates every one
+from backend.models import (  # noqa: F401
+    budget_evaluation_models,
+    budget_models,
+    category_rule_models,
+    transaction_models,
+    user_models,
+)
+from backend.queries.auth_queries import get_user_by
 from backend.routes.auth_routes import auth_blueprint
 from backend.routes.budget_routes import budgets_blueprint
+from backend.routes.category_rules_routes import category_rules_blueprint
 from backend.routes.dashboard_routes import dashboard_blueprint
 from backend.routes.transactions_routes import transactions_blueprint
 from backend.routes.users_routes import users_blueprint
+from backend.services.budget_evaluation_services import run_evaluation
+from backend.services.import_services import import_transactions, parse_category
+
+# Imported for its jobs, so workers can run every one
+from backend.services import job_services  # noqa: F401
+from backend.slow_query_log import init_slow_query_log
+from backend.statement_parsers import PARSERS, detect_format
+from backend.tracing import init_tracing
 from backend.utils import setup_logging
 from flask import Flask
 from flask_cors import CORS
 
-# Initialise logging
-setup_logging()
 
+def create_app(config: dict[str, Any] | None = None) -> Flask:
+    """Create and configure the Flask app.
 
-app = Flask(
-    __name__,
-    template_folder="/app/frontend/templates/",
-    static_folder="/app/frontend/static/",
-)  # prepend /app/ for Docker
+    Creating the app doesn't touch the database, the schema is created with
+    `flask --app backend.app create-db`.
 
-CORS(
-    app,
-    resources={r"/api/*": {"origins": "https://localhost:3000"}},
-    supports_credentials=True,
-)
+    Args:
+        config, dict[str, Any] | None: Config keys, read from the environment when not given.
+
+    Returns:
+        Flask: The configured app.
+    """
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.config.update(config_from_env() if config is None else config)
+
+    CORS(
+        app,
+        resources={r"/api/*": {"origins": app.config.get("CORS_ORIGINS", [])}},
+        supports_credentials=True,
+    )
+
+    # Initialise the database
+    db.init_app(app)
+    init_slow_query_log(app)
+    init_db_pool(app)
+    init_db_routing(app, redis_cache)
+    init_jobs(app, redis_cache)
+
+    # Register Blueprints
+    app.register_blueprint(auth_blueprint)
+    app.register_blueprint(budgets_blueprint)
+    app.register_blueprint(category_rules_blueprint)
+    app.register_blueprint(dashboard_blueprint)
+    app.register_blueprint(transactions_blueprint)
+    app.register_blueprint(users_blueprint)
+
+    # Compression runs before tracing's after_request (hooks run in reverse), so it's timed
+    init_tracing(app)
+    init_compression(app)
+
+    @app.cli.command("create-db")
+    def create_db():
+        """Create any missing database tables."""
+        db.create_all()
+        click.echo("Database tables created.")
+
+    @app.cli.command("import-transactions")
+    @click.argument("email")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option(
+        "--format",
+        "statement_format",
+        type=click.Choice(sorted(PARSERS)),
+        help="By default from the file's extension.",
+    )
+    @click.option("--income-category", help="Category for income rows without one.")
+    @click.option("--expense-category", help="Category for expense rows without one.")
+    def import_transactions_command(
+        email, path, statement_format, income_category, expense_category
+    ):
+        """Import a bank statement file for the user with EMAIL."""
+        user = get_user_by(email=email)
+        if user is None:
+            raise click.ClickException(f"No user with email {email}")
+        statement_format = statement_format or detect_format(path)
+        if statement_format is None:
+            raise click.ClickException("Unknown file type, pass --format")
+
+        categories = {
+            TransactionType.INCOME: income_category,
+            TransactionType.EXPENSE: expense_category,
+        }
+        try:
+            default_categories = {
+                type_: parse_category(value)
+                for type_, value in categories.items()
+                if value
+            }
+            with open(path, encoding="utf-8-sig", newline="") as stream:
+                result = import_transactions(
+                    user.id, stream, statement_format, default_categories
+                )
+        except (ValueError, UnicodeDecodeError) as e:
+            raise click.ClickException(str(e))
+
+        click.echo(f"Imported {result.imported}, {result.invalid} invalid rows.")
+        for row, message in result.errors:
+            click.echo(f"  row {row}: {message}")
+
+    @app.cli.command("run-worker")
+    @click.option(
+        "--processes",
+        type=click.IntRange(min=0),
+        default=os.cpu_count(),
+        show_default=True,
+        help="Size of the process pool, 0 to run jobs in the worker itself.",
+    )
+    @click.option("--burst", is_flag=True, help="Exit once there are no jobs left.")
+    def run_worker_command(processes, burst):
+        """Run queued background jobs until interrupted."""
+        setup_logging()
+        worker = Worker(app, app.extensions["jobs"], processes)
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        click.echo(f"Worker running jobs on {processes} processes.")
+        stats = worker.run(burst=burst)
+
+        for name, job_stats in sorted(stats.items()):
+            click.echo(
+                f"{name}: {job_stats.runs} runs, {job_stats.failures} failed, "
+                f"{job_stats.run_ms / job_stats.runs:.1f} ms mean, "
+                f"{job_stats.max_run_ms:.1f} ms max, "
+                f"{job_stats.wait_ms / job_stats.runs:.1f} ms mean wait"
+            )
+
+    @app.cli.command("evaluate-budgets")
+    @click.option(
+        "--date",
+        "run_date",
+        type=click.DateTime(formats=["%Y-%m-%d"]),
+        help="Day to evaluate budgets up to, by default today.",
+    )
+    @click.option(
+        "--shards",
+        type=click.IntRange(min=1),
+        help="Shards to split users into, by default those of the day's earlier run or 64.",
+    )
+    @click.option(
+        "--processes",
+        type=click.IntRange(min=0),
+        default=os.cpu_count(),
+        show_default=True,
+        help="Size of the process pool, 0 to evaluate shards in this process.",
+    )
+    def evaluate_budgets_command(run_date, shards, processes):
+        """Evaluate every user's budgets, resuming the day's run if it was interrupted."""
+        setup_logging()
+        run_date = run_date.date() if run_date else datetime.date.today()
+
+        def report(progress):
+            eta = progress.eta_seconds
+            click.echo(
+                f"{progress.shards + progress.failed + progress.skipped}/"
+                f"{progress.shard_count} shards, {progress.budgets} budgets, "
+                f"{progress.budgets_per_second:.0f} budgets/s"
+                + (f", {eta:.0f} s left" if eta is not None else "")
+            )
 
+        try:
+            progress = run_evaluation(app, run_date, shards, processes, report)
+        except ValueError as e:
+            raise click.ClickException(str(e))
 
-# Flask app configuration
-app.config["SECRET_KEY"] = os.environ["FLASK_SECRET_KEY"]  # for session
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ["FLOW_DB_URI"]  # for PSQL
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["PERMANENT_SESSION_LIFETIME"] = timedelta(minutes=30)
+        if progress.skipped:
+            click.echo(f"Skipped {progress.skipped} shards already evaluated.")
+        click.echo(
+            f"Evaluated {progress.budgets} budgets in {progress.elapsed:.1f} s, "
+            f"{progress.flagged} breached or near it."
+        )
+        if progress.failed:
+            raise click.ClickException(
+                f"{progress.failed} shards failed, run again to retry them."
+            )
 
+    return app
 
-# Initialise the database
-db.init_app(app)
-with app.app_context():
-    db.create_all()
 
+def reset_after_fork(app: Flask) -> None:
+    """Drop connections inherited from the master process.
 
-# Register Blueprints
-app.register_blueprint(auth_blueprint)
-app.register_blueprint(budgets_blueprint)
-app.register_blueprint(dashboard_blueprint)
-app.register_blueprint(transactions_blueprint)
-app.register_blueprint(users_blueprint)
+    The master's pooled connections are discarded without being closed, closing them would
+    shut the sockets the master still owns. Logging is set up again since the log queue's
+    listener thread doesn't survive the fork.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    redis_cache.connection_pool.reset()
+    setup_logging()
 
 
 if __name__ == "__main__":
-    app.run(
+    # Development server, production runs `backend.wsgi` under gunicorn
+    setup_logging()
+    create_app().run(
         host="0.0.0.0",
         debug=True,
         ssl_context=("certs/localhost.pem", "certs/localhost-key.pem"),
@@ -0,0 +1,140 @@
+"""Negotiated gzip / brotli compression of large responses.
+
+Responses above `COMPRESSION_MIN_SIZE` bytes are compressed with the best encoding the client
+accepts, brotli when the `brotli` package is installed, otherwise gzip. Each encoding is a
+different representation, so a strong ETag gets the encoding appended (`"<etag>-gzip"`).
+
+Responses carrying an ETag from `@conditional_get` are content-addressed, so their compressed
+bodies are also stored in Redis under the ETag and encoding. The next request for the same
+representation is then answered from there without running the route or compressing again,
+see `get_precompressed`.
+"""
+
+import gzip
+from typing import Final
+
+import redis
+from backend.extensions import logger, redis_cache
+from backend.tracing import traced
+from flask import Flask, Request, Response, current_app, g, request
+from redis.client import NEVER_DECODE
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - exercised by patching `brotli` to None
+    brotli = None
+
+# Bytes, below this the saving isn't worth the CPU time
+COMPRESSION_MIN_SIZE: Final[int] = 1024
+COMPRESSIBLE_MIMETYPES: Final[frozenset[str]] = frozenset(
+    {"application/json", "application/x-ndjson", "text/csv", "text/plain"}
+)
+GZIP_LEVEL: Final[int] = 6
+BROTLI_QUALITY: Final[int] = 5  # quality 11 is far too slow to run per request
+PRECOMPRESSED_KEY_PREFIX: Final[str] = "compressed:"
+PRECOMPRESSED_EXPIRATION: Final[int] = 60 * 30
+
+
+def available_encodings() -> list[str]:
+    """Encodings this server can produce, in order of preference."""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def negotiate_encoding(req: Request) -> str | None:
+    """The preferred encoding the client accepts, None if it accepts none of them."""
+    if "compression" not in current_app.extensions:
+        return None
+    return req.accept_encodings.best_match(available_encodings())
+
+
+@traced("serialise", "compress")
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported encoding {encoding!r}")
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """The ETag of the `encoding` representation of the entity tagged `etag`."""
+    return f"{etag}-{encoding}"
+
+
+def _precompressed_key(etag: str, encoding: str) -> str:
+    return f"{PRECOMPRESSED_KEY_PREFIX}{encoded_etag(etag, encoding)}"
+
+
+@traced("cache")
+def get_precompressed(etag: str, encoding: str) -> bytes | None:
+    """Get a stored compressed body for the representation, None if there isn't one."""
+    # The client decodes responses, the compressed body has to come back as raw bytes
+    return redis_cache.execute_command(
+        "GET", _precompressed_key(etag, encoding), **{NEVER_DECODE: True}
+    )
+
+
+@traced("cache")
+def store_precompressed(etag: str, encoding: str, body: bytes) -> None:
+    redis_cache.set(
+        _precompressed_key(etag, encoding), body, ex=PRECOMPRESSED_EXPIRATION
+    )
+
+
+def precompressed_response(etag: str, encoding: str, body: bytes) -> Response:
+    """A 200 response for a stored compressed body."""
+    response = current_app.response_class(body, mimetype="application/json")
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    response.set_etag(encoded_etag(etag, encoding))
+    return response
+
+
+def compress_response(response: Response) -> Response:
+    """after_request hook compressing eligible responses."""
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate_encoding(request)
+    if encoding is None:
+        return response
+
+    body = response.get_data()
+    if len(body) < current_app.extensions["compression"]["min_size"]:
+        return response
+
+    compressed = compress(body, encoding)
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(encoded_etag(etag, encoding), weak)
+        if g.get("precompress_etag") == etag:
+            try:
+                store_precompressed(etag, encoding, compressed)
+            except redis.RedisError as e:
+                logger.warning(f"compression.compress_response : Not stored: {e}")
+    return response
+
+
+def init_compression(app: Flask) -> None:
+    """Register response compression on the app unless `COMPRESSION_ENABLED` is False.
+
+    Config:
+        COMPRESSION_ENABLED, bool: compress responses (default True).
+        COMPRESSION_MIN_SIZE, int: smallest body in bytes worth compressing (default 1024).
+    """
+    if not app.config.get("COMPRESSION_ENABLED", True):
+        return
+    app.extensions["compression"] = {
+        "min_size": int(app.config.get("COMPRESSION_MIN_SIZE", COMPRESSION_MIN_SIZE))
+    }
+    app.after_request(compress_response)
@@ -0,0 +1,52 @@
+"""Application configuration read from the environment."""
+
+import os
+from datetime import timedelta
+from typing import Any
+
+from backend.db_pool import engine_options
+
+
+def config_from_env() -> dict[str, Any]:
+    """Build the app config from environment variables.
+
+    Returns:
+        dict[str, Any]: Config keys for `create_app`.
+
+    Raises:
+        KeyError: If FLASK_SECRET_KEY or FLOW_DB_URI is not set.
+    """
+    db_uri = os.environ["FLOW_DB_URI"]
+    replica_uri = os.getenv("FLOW_DB_REPLICA_URI")
+    return {
+        "SECRET_KEY": os.environ["FLASK_SECRET_KEY"],  # for session
+        "SQLALCHEMY_DATABASE_URI": db_uri,  # for PSQL
+        "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+        "SQLALCHEMY_ENGINE_OPTIONS": engine_options(
+            db_uri,
+            pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "10")),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+            pool_pre_ping=os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+            statement_timeout_ms=int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000")),
+        ),
+        "SQLALCHEMY_BINDS": {"replica": replica_uri} if replica_uri else {},
+        "REPLICA_STICKY_SECONDS": float(os.getenv("REPLICA_STICKY_SECONDS", "5")),
+        "DB_POOL_METRICS_LOG_INTERVAL": float(
+            os.getenv("DB_POOL_METRICS_LOG_INTERVAL", "60")
+        ),
+        "PERMANENT_SESSION_LIFETIME": timedelta(minutes=30),
+        "CORS_ORIGINS": os.getenv("CORS_ORIGINS", "https://localhost:3000").split(","),
+        "COMPRESSION_ENABLED": os.getenv("COMPRESSION_ENABLED", "true").lower()
+        == "true",
+        "COMPRESSION_MIN_SIZE": int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+        "TRACING_ENABLED": os.getenv("TRACING_ENABLED", "false").lower() == "true",
+        "TRACING_SAMPLE_RATE": float(os.getenv("TRACING_SAMPLE_RATE", "0.01")),
+        "SLOW_QUERY_THRESHOLD_MS": float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "100")),
+        "SLOW_QUERY_EXPLAIN_SAMPLE_RATE": float(
+            os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", "0")
+        ),
+        "JOBS_BROKER": os.getenv("JOBS_BROKER", "redis"),
+        "JOBS_WORKER_NAME": os.getenv("JOBS_WORKER_NAME"),
+    }
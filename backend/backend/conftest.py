@@ -0,0 +1,61 @@
+"""Fixtures for tests running the real app, see `routes/test/harness.py`.
+
+Modules change the app's config by overriding `app_config`, the data by overriding `user_id`,
+or the app itself by overriding `app` with a fixture which requests it.
+
+The harness is imported inside the fixtures: importing it here would import every route before
+the route tests patch `login_required` out.
+"""
+
+import pytest
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Point `redis_cache` at a fresh in-memory server for the test."""
+    from backend.extensions import redis_cache
+    from backend.routes.test.harness import use_fake_redis
+
+    monkeypatch.setattr(redis_cache, "connection_pool", redis_cache.connection_pool)
+    return use_fake_redis(redis_cache)
+
+
+@pytest.fixture
+def app_config() -> dict:
+    """Extra config keys for `create_harness_app`."""
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path, fake_redis, monkeypatch, app_config):
+    """The real app, on a SQLite database in the test's temporary directory."""
+    from backend.extensions import db
+    from backend.routes.test.harness import create_harness_app
+
+    monkeypatch.setenv("JWT_SECRET_KEY", "harness-secret")
+    app = create_harness_app(f"sqlite:///{tmp_path / 'harness.db'}", **app_config)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user_id(app) -> str:
+    from backend.routes.test.harness import add_user_with_history
+
+    with app.app_context():
+        return add_user_with_history(n_transactions=25, n_budgets=3)
+
+
+@pytest.fixture
+def headers(client, user_id) -> dict[str, str]:
+    from backend.routes.test.harness import login_as
+
+    return login_as(client, user_id)
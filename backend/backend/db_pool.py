@@ -0,0 +1,185 @@
+"""Connection pool metrics and statement timeouts for the SQLAlchemy engines behind `db`.
+
+`MeteredQueuePool` is a drop-in `QueuePool` that also records how long checkouts wait for a
+connection and how many give up with a timeout. Together with the pool's own gauges (checked out,
+overflow) these are logged periodically per worker process to the `backend.db_pool` logger.
+
+On PostgreSQL every connection gets a default `statement_timeout` (see `engine_options`), and
+routes which need a different limit can use `@statement_timeout(ms)`, applied with `SET LOCAL`
+to the transactions they open.
+"""
+
+import functools
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Final
+
+from backend.extensions import db
+from flask import Flask, g, has_app_context
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+POOL_METRICS_LOG_INTERVAL: Final[float] = 60.0  # seconds
+
+pool_logger = logging.getLogger("backend.db_pool")
+
+
+@dataclass
+class PoolMetrics:
+    """Counters for checkouts from a pool since it was created.
+
+    Wait times include checkouts which timed out.
+    """
+
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_total_ms: float = 0.0
+    wait_max_ms: float = 0.0
+
+    def record_wait(self, wait_ms: float) -> None:
+        self.wait_total_ms += wait_ms
+        self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+
+
+class MeteredQueuePool(QueuePool):
+    """A QueuePool recording checkout wait times and timeouts in `metrics`.
+
+    `_do_get` is only reached when a connection is checked out of the pool, not when a
+    connection already held by the session is reused, so the counts are real checkouts.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.record_wait((time.perf_counter() - start) * 1000)
+        self.metrics.checkouts += 1
+        return connection
+
+
+def engine_options(
+    db_uri: str,
+    pool_size: int = 5,
+    max_overflow: int = 10,
+    pool_timeout: float = 30,
+    pool_recycle: int = 1800,
+    pool_pre_ping: bool = True,
+    statement_timeout_ms: int | None = None,
+) -> dict[str, Any]:
+    """Build `SQLALCHEMY_ENGINE_OPTIONS` for a pooled engine.
+
+    Args:
+        db_uri, str: The database URI, the statement timeout is only set for PostgreSQL.
+        pool_size, int: Connections kept open.
+        max_overflow, int: Extra connections opened under load, closed when returned.
+        pool_timeout, float: Seconds to wait for a connection before giving up.
+        pool_recycle, int: Seconds after which a connection is replaced, -1 to never.
+        pool_pre_ping, bool: Test connections on checkout, to survive database restarts.
+        statement_timeout_ms, int | None: Default limit on every statement, None for no limit.
+
+    Returns:
+        dict[str, Any]: Keyword arguments for `create_engine`.
+    """
+    options = {
+        "poolclass": MeteredQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": pool_timeout,
+        "pool_recycle": pool_recycle,
+        "pool_pre_ping": pool_pre_ping,
+    }
+    if statement_timeout_ms and db_uri.startswith("postgresql"):
+        # Set once per connection at startup, so it costs no extra round trips
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={int(statement_timeout_ms)}"
+        }
+    return options
+
+
+def pool_stats(engine: Engine) -> dict[str, Any]:
+    """Gauges for the engine's pool, plus checkout metrics if it is a MeteredQueuePool."""
+    pool = engine.pool
+    stats: dict[str, Any] = {"pool": pool.__class__.__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    if isinstance(pool, MeteredQueuePool):
+        stats.update(asdict(pool.metrics))
+        stats["wait_total_ms"] = round(stats["wait_total_ms"], 3)
+        stats["wait_max_ms"] = round(stats["wait_max_ms"], 3)
+    return stats
+
+
+def statement_timeout(timeout_ms: int) -> Callable:
+    """Decorator overriding the default statement timeout for a route, on PostgreSQL.
+
+    Args:
+        timeout_ms, int: Limit on each statement in the route's transactions, 0 for no limit.
+    """
+
+    def decorator(f: Callable) -> Callable:
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            g.statement_timeout_ms = timeout_ms
+            return f(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _set_local_statement_timeout(conn) -> None:
+    timeout_ms = g.get("statement_timeout_ms") if has_app_context() else None
+    if timeout_ms is not None:
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+
+
+def init_db_pool(app: Flask) -> None:
+    """Install the statement timeout override and periodic pool metrics logging.
+
+    Config:
+        DB_POOL_METRICS_LOG_INTERVAL, float: seconds between pool metrics logs in each
+            process, None disables them (default 60).
+    """
+    with app.app_context():
+        engines = dict(db.engines)
+
+    for engine in engines.values():
+        if engine.dialect.name == "postgresql" and not event.contains(
+            engine, "begin", _set_local_statement_timeout
+        ):
+            event.listen(engine, "begin", _set_local_statement_timeout)
+
+    interval = app.config.get("DB_POOL_METRICS_LOG_INTERVAL", POOL_METRICS_LOG_INTERVAL)
+    if interval is None:
+        return
+
+    last_logged = time.monotonic()
+
+    @app.teardown_appcontext
+    def log_pool_metrics(error: BaseException | None = None):
+        nonlocal last_logged
+        now = time.monotonic()
+        if now - last_logged < interval:
+            return
+        last_logged = now
+        for bind, engine in engines.items():
+            stats = pool_stats(engine)
+            pool_logger.info(
+                f"db_pool.log_pool_metrics : {bind or 'default'} {stats}",
+                extra={"bind": bind, "pool_stats": stats},
+            )
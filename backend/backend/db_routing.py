@@ -0,0 +1,144 @@
+"""Read-replica routing for `db.session`.
+
+When a replica is configured (`SQLALCHEMY_BINDS["replica"]`), reads made while handling a route
+decorated with `@read_only` go to the replica and everything else goes to the primary. Replicas
+lag behind the primary, so after a user writes, their reads stay on the primary for
+`REPLICA_STICKY_SECONDS` (read-your-writes). The window is recorded in Redis so it holds across
+workers, and is only looked up when a read-only route actually reaches the database.
+"""
+
+import functools
+import logging
+from typing import Any, Callable, Final
+
+import redis
+from flask import Flask, current_app, g, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA_BIND: Final[str] = "replica"
+REPLICA_STICKY_SECONDS: Final[float] = 5.0
+
+logger = logging.getLogger(__name__)
+
+
+def read_only(f: Callable) -> Callable:
+    """Route decorator allowing the route's reads to be served by the replica."""
+
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+        return f(*args, **kwargs)
+
+    return wrapper
+
+
+class ReplicaRouter:
+    """Decides whether reads may go to the replica, and tracks each user's sticky window.
+
+    Attributes:
+        client: Redis client holding the sticky windows.
+        sticky_seconds: How long a user's reads stay on the primary after they write.
+    """
+
+    def __init__(
+        self, client: redis.Redis, sticky_seconds: float = REPLICA_STICKY_SECONDS
+    ):
+        self.client = client
+        self.sticky_seconds = sticky_seconds
+
+    @staticmethod
+    def _key(user_id: str) -> str:
+        return f"db_sticky:{user_id}"
+
+    def mark_write(self, user_id: str) -> None:
+        """Keep `user_id`'s reads on the primary for the sticky window."""
+        try:
+            self.client.set(
+                self._key(user_id), 1, px=max(1, int(self.sticky_seconds * 1000))
+            )
+        except redis.RedisError as e:
+            logger.warning(f"db_routing.mark_write : Unable to mark {user_id}: {e}")
+
+    def is_sticky(self, user_id: str) -> bool:
+        """Whether `user_id` wrote within the sticky window. Fails safe to the primary."""
+        try:
+            return bool(self.client.exists(self._key(user_id)))
+        except redis.RedisError as e:
+            logger.warning(f"db_routing.is_sticky : Unable to check {user_id}: {e}")
+            return True
+
+    def use_replica(self, session: Session) -> bool:
+        """Whether the current request's reads can go to the replica.
+
+        The sticky check is made at most once per request, and only once the request needs
+        the database.
+        """
+        if not has_request_context() or not g.get("db_read_only"):
+            return False
+        if session.info.get("wrote") or REPLICA_BIND not in session._db.engines:
+            return False
+        if "_db_sticky" not in g:
+            user_id = g.get("user_id")
+            g._db_sticky = user_id is not None and self.is_sticky(user_id)
+        return not g._db_sticky
+
+
+class RoutingSession(Session):
+    """`db.session` class sending reads to the replica when the ReplicaRouter allows it.
+
+    Flushes, and anything after a flush in the same session, always use the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing:
+            router = current_app.extensions.get("db_routing")
+            if router is not None and router.use_replica(self):
+                return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _record_flush(session: Session, flush_context: Any) -> None:
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _record_bulk_write(state: Any) -> None:
+    # INSERT/UPDATE/DELETE statements executed directly write without a flush
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _start_sticky_window(session: Session) -> None:
+    if not session.info.pop("wrote", False) or not has_request_context():
+        return
+    g._db_sticky = True
+    user_id = g.get("user_id")
+    router = current_app.extensions.get("db_routing")
+    if router is not None and user_id is not None:
+        router.mark_write(str(user_id))
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _discard_flush(session: Session) -> None:
+    session.info.pop("wrote", None)
+
+
+def init_db_routing(app: Flask, client: redis.Redis) -> None:
+    """Enable replica routing if a replica bind is configured.
+
+    Config:
+        SQLALCHEMY_BINDS["replica"]: the replica's URI (or engine options).
+        REPLICA_STICKY_SECONDS, float: read-your-writes window after a user writes
+            (default 5).
+    """
+    if REPLICA_BIND not in (app.config.get("SQLALCHEMY_BINDS") or {}):
+        return
+    app.extensions["db_routing"] = ReplicaRouter(
+        client,
+        sticky_seconds=float(
+            app.config.get("REPLICA_STICKY_SECONDS", REPLICA_STICKY_SECONDS)
+        ),
+    )
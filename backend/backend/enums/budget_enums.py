@@ -0,0 +1,8 @@
+import enum
+
+
+class BudgetStatus(str, enum.Enum):
+    """How a budget's spend over its current period compares with its amount."""
+
+    NEAR_BREACH = "near-breach"
+    BREACHED = "breached"
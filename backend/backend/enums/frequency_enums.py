@@ -1,7 +1,7 @@
 import enum
 
 
-class Frequency(enum.Enum):
+class Frequency(str, enum.Enum):
     """Represents the possible frequencies of an Income, Expense or Budget."""
 
     DAILY = "Daily"
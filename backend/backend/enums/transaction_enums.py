@@ -1,12 +1,12 @@
 import enum
 
 
-class TransactionType(enum.Enum):
+class TransactionType(str, enum.Enum):
     INCOME = "income"
     EXPENSE = "expense"
 
 
-class TransactionCategory(enum.Enum):
+class TransactionCategory(str, enum.Enum):
     """Represents possible categories for a user's transactions."""
 
     # INCOME
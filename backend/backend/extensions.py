@@ -4,10 +4,11 @@ import logging
 import os
 
 import redis
+from backend.db_routing import RoutingSession
 from flask_sqlalchemy import SQLAlchemy
 
 # SQLAlchemy instnace
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 # Redis instance
 redis_host = os.getenv("REDIS_HOST", "redis")
@@ -0,0 +1,503 @@
+"""A small job queue, for work which doesn't have to happen inside a request.
+
+Jobs are functions registered with `@job` and queued with `enqueue(function, *args)`, which
+returns straight away. A job's key is its name and arguments: queuing a job whose key is
+already waiting, on the queue or for a retry, does nothing, so e.g. ten imports in a row rebuild
+a user's cache once. Once a job is taken off the queue its key is free again, so changes made
+while it runs queue it anew.
+
+A worker (`flask --app backend.app run-worker`) takes jobs off the broker and runs them on a
+process pool. A job which raises is retried with exponential backoff, up to `MAX_ATTEMPTS`
+runs, then recorded as failed. `RedisBroker` moves a job it hands out onto the worker's own
+processing list until it has finished, so the jobs of a worker which dies mid-run aren't lost:
+the worker puts them back on the queue when it starts again (see `RedisBroker.recover`). How
+long each job waited and ran is logged, and totalled per job in `JobStats`.
+
+`RedisBroker` keeps the queue in Redis, `InMemoryBroker` in the process, for tests.
+"""
+
+import heapq
+import math
+import multiprocessing
+import signal
+import socket
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Final, Protocol
+
+import redis
+from backend.extensions import logger
+from backend.json_codec import dumps, loads
+from flask import Flask, current_app
+
+MAX_ATTEMPTS: Final[int] = 4
+BACKOFF_SECONDS: Final[float] = 2.0
+MAX_BACKOFF_SECONDS: Final[float] = 300.0
+POLL_INTERVAL: Final[float] = 1.0
+QUEUE_KEY: Final[str] = "jobs:queue"
+DELAYED_KEY: Final[str] = "jobs:delayed"
+FAILED_KEY: Final[str] = "jobs:failed"
+PENDING_KEY_PREFIX: Final[str] = "jobs:pending:"
+PROCESSING_KEY_PREFIX: Final[str] = "jobs:processing:"
+# A job lost with its worker doesn't block its key for longer than this
+PENDING_EXPIRATION: Final[int] = 60 * 60
+MAX_FAILED: Final[int] = 1000
+# Delayed jobs moved to the queue per poll
+PROMOTE_BATCH: Final[int] = 100
+
+JOBS: dict[str, Callable[..., None]] = {}
+
+
+@dataclass
+class Job:
+    """A queued call of a registered job.
+
+    Attributes:
+        name: The name the job is registered under.
+        args: Its arguments, as strings.
+        attempts: How many times it has been run.
+        enqueued_at: When it was queued, or is due again after a failure, as a Unix time.
+        receipt: The payload it was taken off the queue as, set by the broker which gave it out.
+    """
+
+    name: str
+    args: tuple[str, ...]
+    attempts: int = 0
+    enqueued_at: float = field(default_factory=time.time)
+    receipt: str | None = field(default=None, compare=False, repr=False)
+
+    @property
+    def key(self) -> str:
+        return ":".join((self.name, *self.args))
+
+    def dumps(self) -> str:
+        values = asdict(self)
+        del values["receipt"]
+        return dumps(values)
+
+    @classmethod
+    def loads(cls, payload: str) -> "Job":
+        values = loads(payload)
+        return cls(**{**values, "args": tuple(values["args"])})
+
+
+class Broker(Protocol):
+    def push(self, job: Job) -> bool:
+        """Queue a job unless one with its key is waiting, True if it was queued."""
+
+    def schedule(self, job: Job, run_at: float) -> None:
+        """Queue a job again once `run_at`, a Unix time, has passed, unless one with its key
+        is waiting, which runs instead. Its key is waiting until it is taken again."""
+
+    def pop(self, timeout: float = 0) -> Job | None:
+        """Take the next job, waiting up to `timeout` seconds for one, None if there isn't one."""
+
+    def done(self, job: Job) -> None:
+        """Drop a job taken with `pop` which has run."""
+
+    def fail(self, job: Job) -> None:
+        """Record a job which won't be retried."""
+
+    def recover(self) -> int:
+        """Queue again the jobs taken but not finished by this worker's previous run."""
+
+    def __len__(self) -> int:
+        """The number of jobs queued or scheduled."""
+
+
+class RedisBroker:
+    """A queue in Redis lists, with a sorted set of jobs scheduled for retries.
+
+    A job taken off the queue is moved, in the same command, onto a processing list named after
+    the worker, and removed from it once it has run, been scheduled for a retry or failed.
+    Workers must have different names, by default their host names.
+
+    Attributes:
+        client: The Redis client, shared by the web app and workers.
+        name: The name of the worker taking jobs, if any.
+    """
+
+    def __init__(self, client: redis.Redis, name: str | None = None):
+        self.client = client
+        self.name = name or socket.gethostname()
+        self.processing_key = f"{PROCESSING_KEY_PREFIX}{self.name}"
+
+    def push(self, job: Job) -> bool:
+        pending = f"{PENDING_KEY_PREFIX}{job.key}"
+        with self.client.pipeline(transaction=True) as pipeline:
+            try:
+                pipeline.watch(pending)
+                if pipeline.exists(pending):
+                    return False
+                pipeline.multi()
+                pipeline.set(pending, 1, ex=PENDING_EXPIRATION)
+                pipeline.lpush(QUEUE_KEY, job.dumps())
+                pipeline.execute()
+            except redis.WatchError:
+                # Queued by someone else meanwhile
+                return False
+        return True
+
+    def schedule(self, job: Job, run_at: float) -> None:
+        pending = f"{PENDING_KEY_PREFIX}{job.key}"
+        # Kept until the job is taken again, however far off that is
+        expiration = PENDING_EXPIRATION + max(0, math.ceil(run_at - time.time()))
+        with self.client.pipeline(transaction=True) as pipeline:
+            while True:
+                try:
+                    pipeline.watch(pending)
+                    waiting = pipeline.exists(pending)
+                    pipeline.multi()
+                    if not waiting:
+                        pipeline.set(pending, 1, ex=expiration)
+                        pipeline.zadd(DELAYED_KEY, {job.dumps(): run_at})
+                    self._finished(pipeline, job)
+                    pipeline.execute()
+                    return
+                except redis.WatchError:
+                    # Queued by someone else meanwhile, so it isn't scheduled after all
+                    continue
+
+    def _finished(self, pipeline: redis.client.Pipeline, job: Job) -> None:
+        if job.receipt is not None:
+            pipeline.lrem(self.processing_key, 1, job.receipt)
+
+    def _promote(self) -> None:
+        """Move scheduled jobs which are due onto the queue."""
+        with self.client.pipeline(transaction=True) as pipeline:
+            try:
+                # Only the worker whose transaction goes through queues them
+                pipeline.watch(DELAYED_KEY)
+                due = pipeline.zrangebyscore(
+                    DELAYED_KEY, "-inf", time.time(), start=0, num=PROMOTE_BATCH
+                )
+                if not due:
+                    return
+                pipeline.multi()
+                pipeline.zrem(DELAYED_KEY, *due)
+                pipeline.lpush(QUEUE_KEY, *due)
+                pipeline.execute()
+            except redis.WatchError:
+                pass
+
+    def pop(self, timeout: float = 0) -> Job | None:
+        self._promote()
+        if timeout > 0:
+            payload = self.client.blmove(
+                QUEUE_KEY, self.processing_key, timeout, "RIGHT", "LEFT"
+            )
+        else:
+            payload = self.client.lmove(QUEUE_KEY, self.processing_key, "RIGHT", "LEFT")
+        if payload is None:
+            return None
+        queued = Job.loads(payload)
+        queued.receipt = payload
+        self.client.delete(f"{PENDING_KEY_PREFIX}{queued.key}")
+        return queued
+
+    def done(self, job: Job) -> None:
+        pipeline = self.client.pipeline(transaction=True)
+        self._finished(pipeline, job)
+        pipeline.execute()
+
+    def fail(self, job: Job) -> None:
+        pipeline = self.client.pipeline(transaction=True)
+        pipeline.lpush(FAILED_KEY, job.dumps())
+        pipeline.ltrim(FAILED_KEY, 0, MAX_FAILED - 1)
+        self._finished(pipeline, job)
+        pipeline.execute()
+
+    def recover(self) -> int:
+        """Queue again the jobs on this worker's processing list, to be run first.
+
+        Only to be called before the worker takes any jobs, every job on its list is an orphan
+        of a previous run which died.
+        """
+        recovered = 0
+        while self.client.lmove(self.processing_key, QUEUE_KEY, "RIGHT", "RIGHT"):
+            recovered += 1
+        return recovered
+
+    def __len__(self) -> int:
+        pipeline = self.client.pipeline(transaction=False)
+        pipeline.llen(QUEUE_KEY)
+        pipeline.zcard(DELAYED_KEY)
+        return sum(pipeline.execute())
+
+
+class InMemoryBroker:
+    """A queue in the process, which workers in other processes can't see."""
+
+    def __init__(self):
+        self.queue: deque[Job] = deque()
+        self.pending: set[str] = set()
+        self.delayed: list[tuple[float, int, Job]] = []
+        self.failed: list[Job] = []
+        self._scheduled = 0
+
+    def push(self, job: Job) -> bool:
+        if job.key in self.pending:
+            return False
+        self.pending.add(job.key)
+        self.queue.append(job)
+        return True
+
+    def schedule(self, job: Job, run_at: float) -> None:
+        if job.key in self.pending:
+            return
+        self.pending.add(job.key)
+        self._scheduled += 1
+        heapq.heappush(self.delayed, (run_at, self._scheduled, job))
+
+    def pop(self, timeout: float = 0) -> Job | None:
+        now = time.time()
+        while self.delayed and self.delayed[0][0] <= now:
+            self.queue.append(heapq.heappop(self.delayed)[2])
+        if not self.queue:
+            return None
+        queued = self.queue.popleft()
+        self.pending.discard(queued.key)
+        return queued
+
+    def done(self, job: Job) -> None:
+        pass
+
+    def fail(self, job: Job) -> None:
+        self.failed.append(job)
+
+    def recover(self) -> int:
+        # The queue doesn't outlive the process, nor do its jobs
+        return 0
+
+    def __len__(self) -> int:
+        return len(self.queue) + len(self.delayed)
+
+
+def job(function: Callable[..., None]) -> Callable[..., None]:
+    """Register a function as a job, under its name. Its arguments must be strings."""
+    JOBS[function.__name__] = function
+    return function
+
+
+def enqueue(function: Callable[..., None], *args) -> Job | None:
+    """Queue a registered job on the app's broker.
+
+    Args:
+        function, Callable: the job, registered with `@job`.
+        *args: its arguments, converted to strings.
+
+    Returns:
+        Job | None: the job queued, None if one with its key was already waiting.
+
+    Raises:
+        KeyError: if the function isn't registered.
+        RedisError: if the job can't be queued.
+    """
+    if JOBS.get(function.__name__) is not function:
+        raise KeyError(f"{function.__name__} isn't a registered job")
+    queued = Job(function.__name__, tuple(str(arg) for arg in args))
+    return queued if current_app.extensions["jobs"].push(queued) else None
+
+
+def backoff(attempts: int) -> float:
+    """Seconds to wait before running a job again after its `attempts`-th run failed."""
+    return min(BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+
+
+# The app in pool processes, set when each starts
+_process_app: Flask | None = None
+
+
+def _init_process(app: Flask) -> None:
+    global _process_app
+    # Imported here, backend.app imports this module
+    from backend.app import reset_after_fork
+
+    _process_app = app
+    reset_after_fork(app)
+    # Shutting the pool down is left to the process which started it
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def in_app_context(function: Callable, *args):
+    """Call a function in a fresh app context, in a pool process or the current app's."""
+    app = _process_app or current_app._get_current_object()
+    with app.app_context():
+        return function(*args)
+
+
+def _run(name: str, args: tuple[str, ...]) -> float:
+    """Run a job in its own app context, returning how long it took in milliseconds."""
+    started = time.perf_counter()
+    in_app_context(JOBS[name], *args)
+    return (time.perf_counter() - started) * 1000
+
+
+class _InlineExecutor:
+    """Runs submitted calls straight away, in place of a process pool."""
+
+    def submit(self, function: Callable, *args) -> Future:
+        future = Future()
+        try:
+            future.set_result(function(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+def process_pool(app: Flask, processes: int) -> ProcessPoolExecutor | _InlineExecutor:
+    """A pool of `processes` processes to run calls with `in_app_context`, or if 0 an
+    executor running them straight away in this process.
+    """
+    if not processes:
+        return _InlineExecutor()
+    return ProcessPoolExecutor(
+        processes,
+        # Forked, so the pool processes start with the app already built
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_init_process,
+        initargs=(app,),
+    )
+
+
+@dataclass
+class JobStats:
+    """Totals for the runs of one job by a worker, times in milliseconds."""
+
+    runs: int = 0
+    failures: int = 0
+    run_ms: float = 0.0
+    max_run_ms: float = 0.0
+    wait_ms: float = 0.0
+
+    def record(self, run_ms: float, wait_ms: float, failed: bool) -> None:
+        self.runs += 1
+        self.failures += failed
+        self.run_ms += run_ms
+        self.max_run_ms = max(self.max_run_ms, run_ms)
+        self.wait_ms += wait_ms
+
+
+class Worker:
+    """Runs jobs from a broker on a process pool, until stopped or, in burst mode, idle.
+
+    Attributes:
+        app: The app, each pool process runs jobs in its own app context.
+        broker: Where jobs are taken from.
+        processes: The size of the pool, 0 to run jobs in this process.
+        max_attempts: Runs of a job before it is recorded as failed.
+        backoff: Seconds to wait before retrying a job, given how many times it has run.
+        stats: `JobStats` by job name.
+    """
+
+    def __init__(
+        self,
+        app: Flask,
+        broker: Broker,
+        processes: int,
+        max_attempts: int = MAX_ATTEMPTS,
+        backoff: Callable[[int], float] = backoff,
+        poll_interval: float = POLL_INTERVAL,
+    ):
+        self.app = app
+        self.broker = broker
+        self.processes = processes
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.poll_interval = poll_interval
+        self.stats: dict[str, JobStats] = {}
+        self._stopping = False
+
+    def stop(self, *_) -> None:
+        """Stop taking jobs, those already running are finished."""
+        self._stopping = True
+
+    def run(self, burst: bool = False) -> dict[str, JobStats]:
+        """Run jobs until `stop` is called, or until there are none left if `burst`.
+
+        Returns:
+            dict[str, JobStats]: the worker's `stats`.
+        """
+        recovered = self.broker.recover()
+        if recovered:
+            logger.warning(
+                f"jobs.Worker : Queued again {recovered} jobs left running by a previous run"
+            )
+        running: dict[Future, tuple[Job, float]] = {}
+        with process_pool(self.app, self.processes) as executor:
+            while running or not self._stopping:
+                while not self._stopping and len(running) < max(self.processes, 1):
+                    # Only block when there is nothing else to wait for
+                    idle = not running and not burst
+                    queued = self.broker.pop(self.poll_interval if idle else 0)
+                    if queued is None:
+                        break
+                    queued.attempts += 1
+                    started = time.time()
+                    future = executor.submit(_run, queued.name, queued.args)
+                    running[future] = (queued, started)
+
+                if not running:
+                    if burst and not len(self.broker):
+                        break
+                    if burst:
+                        # Only retries scheduled for later are left
+                        time.sleep(self.poll_interval)
+                    continue
+
+                done, _ = wait(
+                    running, timeout=self.poll_interval, return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    self._finish(*running.pop(future), future)
+        return self.stats
+
+    def _finish(self, finished: Job, started: float, future: Future) -> None:
+        wait_ms = max(0.0, started - finished.enqueued_at) * 1000
+        error = future.exception()
+        run_ms = (time.time() - started) * 1000 if error else future.result()
+        stats = self.stats.setdefault(finished.name, JobStats())
+        stats.record(run_ms, wait_ms, failed=error is not None)
+
+        if error is None:
+            self.broker.done(finished)
+            logger.info(
+                f"jobs.Worker : {finished.key} ran in {run_ms:.1f} ms, "
+                f"after waiting {wait_ms:.1f} ms"
+            )
+        elif finished.attempts < self.max_attempts:
+            delay = self.backoff(finished.attempts)
+            finished.enqueued_at = time.time() + delay
+            self.broker.schedule(finished, finished.enqueued_at)
+            logger.warning(
+                f"jobs.Worker : {finished.key} failed on attempt {finished.attempts}, "
+                f"retrying in {delay:.1f} s: {error}"
+            )
+        else:
+            self.broker.fail(finished)
+            logger.error(
+                f"jobs.Worker : {finished.key} failed after {finished.attempts} attempts: "
+                f"{error}"
+            )
+
+
+def init_jobs(app: Flask, client: redis.Redis) -> None:
+    """Set up the app's job broker.
+
+    Config:
+        JOBS_BROKER, str: "redis" (default) or "memory", the latter only for tests.
+        JOBS_WORKER_NAME, str | None: the name of this process's worker, unique among the
+            workers sharing a Redis, by default the host name.
+    """
+    if app.config.get("JOBS_BROKER", "redis") == "memory":
+        app.extensions["jobs"] = InMemoryBroker()
+    else:
+        app.extensions["jobs"] = RedisBroker(client, app.config.get("JOBS_WORKER_NAME"))
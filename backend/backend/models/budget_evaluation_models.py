@@ -0,0 +1,92 @@
+import datetime
+import uuid
+from typing import Final
+
+from backend.enums.budget_enums import BudgetStatus
+from backend.enums.frequency_enums import Frequency
+from backend.enums.transaction_enums import TransactionCategory
+from backend.extensions import db
+from backend.models.types import UUIDType
+from sqlalchemy import Date, DateTime, Enum, ForeignKey, Index, Integer, text
+
+GEN_RANDOM_UUID: Final[str] = "gen_random_uuid()"
+USER_ACCOUNT_ID: Final[str] = "user_account.id"
+
+
+class BudgetEvaluation(db.Model):
+    """Models a budget found breached, or near it, by a nightly evaluation.
+
+    Attributes:
+        id: The UUID of the evaluation.
+        run_date: The day of the evaluation run, the last day of the period evaluated.
+        budget_id: The UUID of the budget, kept after the budget is deleted.
+        user_id: The UUID of the user.
+        category: The category of the budget.
+        frequency: The frequency of the budget.
+        period_start: The first day of the period evaluated.
+        amount: The amount of the budget in pennies.
+        spent: The amount spent in the period in pennies.
+        status: Whether the budget was breached or near it.
+    """
+
+    __tablename__ = "budget_evaluation"
+    __table_args__ = (
+        # A run replaces a shard's evaluations by user range, and users read their latest
+        Index("ix_budget_evaluation_run_date_user_id", "run_date", "user_id"),
+        Index("ix_budget_evaluation_user_id_run_date", "user_id", "run_date"),
+    )
+
+    id: uuid.UUID = db.Column(
+        UUIDType,
+        primary_key=True,
+        unique=True,
+        default=uuid.uuid4,
+        server_default=text(GEN_RANDOM_UUID),
+    )
+    run_date: datetime.date = db.Column(Date, nullable=False)
+    budget_id: uuid.UUID = db.Column(UUIDType, nullable=False)
+    user_id: uuid.UUID = db.Column(ForeignKey(USER_ACCOUNT_ID), nullable=False)
+    category: TransactionCategory = db.Column(Enum(TransactionCategory), nullable=False)
+    frequency: Frequency = db.Column(Enum(Frequency), nullable=False)
+    period_start: datetime.date = db.Column(Date, nullable=False)
+    amount: int = db.Column(Integer, nullable=False)
+    spent: int = db.Column(Integer, nullable=False)
+    status: BudgetStatus = db.Column(Enum(BudgetStatus), nullable=False)
+
+    def to_dict(self) -> dict:
+        """Convert the instance to a dictionary, amounts in pounds.
+
+        UUIDs, dates and enums are left as they are, `backend.json_codec` encodes them.
+        """
+        return {
+            "budget_id": self.budget_id,
+            "run_date": self.run_date,
+            "category": self.category,
+            "frequency": self.frequency,
+            "period_start": self.period_start,
+            "amount": self.amount / 100,
+            "spent": self.spent / 100,
+            "status": self.status,
+        }
+
+
+class BudgetEvaluationShard(db.Model):
+    """Models a shard of a nightly evaluation run which has finished, its checkpoint.
+
+    Attributes:
+        run_date: The day of the evaluation run.
+        shard: The index of the shard, see `budget_evaluation_services.shard_bounds`.
+        shard_count: How many shards the run's users are split into.
+        budgets: How many budgets were evaluated.
+        flagged: How many of them were breached or near it.
+        finished_at: When the shard's evaluations were written.
+    """
+
+    __tablename__ = "budget_evaluation_shard"
+
+    run_date: datetime.date = db.Column(Date, primary_key=True)
+    shard: int = db.Column(Integer, primary_key=True, autoincrement=False)
+    shard_count: int = db.Column(Integer, nullable=False)
+    budgets: int = db.Column(Integer, nullable=False)
+    flagged: int = db.Column(Integer, nullable=False)
+    finished_at: datetime.datetime = db.Column(DateTime, nullable=False)
@@ -5,8 +5,8 @@ from backend.enums.frequency_enums import Frequency
 from backend.enums.transaction_enums import TransactionCategory
 from backend.extensions import db
 from backend.models.transaction_models import Transaction, TransactionType
-from sqlalchemy import Enum, ForeignKey, text
-from sqlalchemy.dialects.postgresql import UUID
+from backend.models.types import UUIDType
+from sqlalchemy import Enum, ForeignKey, UniqueConstraint, text
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.sql import text
 
@@ -29,17 +29,18 @@ class Budget(db.Model):
     """
 
     __tablename__ = "budget"
+    # One budget per category for each user
+    __table_args__ = (UniqueConstraint("user_id", "category"),)
 
     id: uuid.UUID = db.Column(
-        UUID(as_uuid=True),
+        UUIDType,
         primary_key=True,
         unique=True,
+        default=uuid.uuid4,
         server_default=text(GEN_RANDOM_UUID),
     )
     user_id: uuid.UUID = db.Column(ForeignKey(USER_ACCOUNT_ID), nullable=False)
-    category: TransactionCategory = db.Column(
-        Enum(TransactionCategory), nullable=False, unique=True
-    )
+    category: TransactionCategory = db.Column(Enum(TransactionCategory), nullable=False)
     frequency: Frequency = db.Column(Enum(Frequency), nullable=False)
     _amount: int = db.Column("amount", db.Integer, nullable=False)
 
@@ -78,20 +79,27 @@ class Budget(db.Model):
         """Calculates remaining budget."""
         return self.amount - self.spent
 
-    def to_dict(self) -> dict:
+    def to_dict(self, spent: float | None = None) -> dict:
         """Convert the instance to a dictionary.
 
-        In the case of "category" and "frequency", the values are converted to their enum values.
+        UUIDs and enums are left as they are, `backend.json_codec` encodes them.
+
+        Args:
+            spent, float | None: the amount spent against this budget if already known, e.g. from
+                `User.expense_totals()`. Otherwise `Budget.spent` is queried, one query per budget.
 
         Returns:
             dict: the instance as a dictionary
         """
+        if spent is None:
+            spent = self.spent
+
         return {
-            "id": str(self.id),
-            "user_id": str(self.user_id),
-            "category": self.category.value,
-            "frequency": self.frequency.value if self.frequency else None,
+            "id": self.id,
+            "user_id": self.user_id,
+            "category": self.category,
+            "frequency": self.frequency,
             "amount": self.amount,
-            "spent": self.spent,
-            "remaining": self.remaining,
+            "spent": spent,
+            "remaining": self.amount - spent,
         }
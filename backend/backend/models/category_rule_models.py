@@ -0,0 +1,55 @@
+import uuid
+from typing import Final, Optional
+
+from backend.enums.transaction_enums import TransactionCategory, TransactionType
+from backend.extensions import db
+from backend.models.types import UUIDType
+from sqlalchemy import Boolean, Enum, ForeignKey, Integer, String, text
+
+GEN_RANDOM_UUID: Final[str] = "gen_random_uuid()"
+USER_ACCOUNT_ID: Final[str] = "user_account.id"
+PATTERN_MAX_LENGTH: Final[int] = 200
+
+
+class CategoryRule(db.Model):
+    """Models a user's rule for categorising transactions by their description.
+
+    Attributes:
+        id: The UUID of the rule.
+        user_id: The UUID of the user.
+        pattern: A keyword found anywhere in the description, or a regular expression,
+            matched case-insensitively.
+        is_regex: Whether the pattern is a regular expression.
+        category: The category given to matching transactions.
+        type: Only apply to transactions of this type, or to both if None.
+        priority: When several rules match, the lowest priority wins.
+    """
+
+    __tablename__ = "category_rule"
+
+    id: uuid.UUID = db.Column(
+        UUIDType,
+        primary_key=True,
+        unique=True,
+        default=uuid.uuid4,
+        server_default=text(GEN_RANDOM_UUID),
+    )
+    user_id: uuid.UUID = db.Column(
+        ForeignKey(USER_ACCOUNT_ID), nullable=False, index=True
+    )
+    pattern: str = db.Column(String(PATTERN_MAX_LENGTH), nullable=False)
+    is_regex: bool = db.Column(Boolean, nullable=False, default=False)
+    category: TransactionCategory = db.Column(Enum(TransactionCategory), nullable=False)
+    type: Optional[TransactionType] = db.Column(Enum(TransactionType), nullable=True)
+    priority: int = db.Column(Integer, nullable=False, default=100)
+
+    def to_dict(self) -> dict:
+        """Convert the instance to a dictionary, serialisable with `backend.json_codec`."""
+        return {
+            "id": self.id,
+            "pattern": self.pattern,
+            "is_regex": self.is_regex,
+            "category": self.category,
+            "type": self.type,
+            "priority": self.priority,
+        }
@@ -1,16 +1,84 @@
+import datetime
+import hashlib
+import re
 import uuid
 from typing import Final, Optional
 
 from backend.enums.frequency_enums import Frequency
 from backend.enums.transaction_enums import TransactionCategory, TransactionType
 from backend.extensions import db
-from sqlalchemy import Date, Enum, ForeignKey, String, text
-from sqlalchemy.dialects.postgresql import UUID
+from backend.models.types import UUIDType
+from sqlalchemy import Date, Enum, ForeignKey, Index, String, text
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.sql import text
 
 GEN_RANDOM_UUID: Final[str] = "gen_random_uuid()"
 USER_ACCOUNT_ID: Final[str] = "user_account.id"
+_NON_ALPHANUMERIC: Final[re.Pattern] = re.compile(r"[\W_]+")
+
+
+def normalise_description(description: str | None) -> str:
+    """Casefold and drop punctuation and spacing, e.g. "TESCO  Stores-1234" -> "tescostores1234"."""
+    return _NON_ALPHANUMERIC.sub("", (description or "").casefold())
+
+
+def transaction_fingerprint(
+    user_id: uuid.UUID,
+    date: datetime.date,
+    pence: int,
+    description: str | None,
+    occurrence: int = 0,
+) -> str:
+    """A content hash identifying a transaction across imports of overlapping statements.
+
+    Args:
+        user_id, UUID: the UUID of the user.
+        date, date: the date of the transaction.
+        pence, int: the signed amount in pence, negative for expenses.
+        description, str | None: the description, normalised before hashing.
+        occurrence, int: how many identical transactions came before this one in the same
+            statement, so that e.g. two equal coffees on one day are both kept.
+
+    Returns:
+        str: 32 hex characters.
+    """
+    content = (
+        f"{user_id}|{date.isoformat()}|{pence}|"
+        f"{normalise_description(description)}|{occurrence}"
+    )
+    return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+
+class Fingerprinter:
+    """Fingerprints a user's transactions as they are written, in statement order.
+
+    Identical transactions get distinct fingerprints by their `occurrence`, so every one of them
+    is kept, and the same statement fingerprints the same way however often it is written.
+    """
+
+    def __init__(self, user_id: uuid.UUID):
+        self.user_id = user_id
+        # Times each first-occurrence fingerprint has been seen
+        self._occurrences: dict[str, int] = {}
+
+    def __call__(
+        self,
+        transaction_type: TransactionType,
+        date: datetime.date,
+        pence: int,
+        description: str | None,
+    ) -> str:
+        """The fingerprint of the next transaction, `pence` unsigned as it is stored."""
+        if transaction_type == TransactionType.EXPENSE:
+            pence = -pence
+        fingerprint = transaction_fingerprint(self.user_id, date, pence, description)
+        occurrence = self._occurrences.get(fingerprint, 0)
+        self._occurrences[fingerprint] = occurrence + 1
+        if not occurrence:
+            return fingerprint
+        return transaction_fingerprint(
+            self.user_id, date, pence, description, occurrence
+        )
 
 
 class Transaction(db.Model):
@@ -24,18 +92,52 @@ class Transaction(db.Model):
         frequency: The frequency of the income.
         amount: The amount of the income in pennies.
         description: A description of the income.
+        fingerprint: Content hash of an imported transaction, see `transaction_fingerprint`.
 
     Relationships:
         user: The user to whom the income belongs.
     """
 
     __tablename__ = "transaction"
+    # Serves per-user date ranges, and keyset pagination by (date, id) e.g. for exports
+    __table_args__ = (
+        Index("ix_transaction_user_id_date_id", "user_id", "date", "id"),
+        # Covers the balance and spend aggregates of forecasts, so they never read the table
+        Index(
+            "ix_transaction_user_id_date_totals",
+            "user_id",
+            "date",
+            "type",
+            "category",
+            "frequency",
+            "amount",
+        ),
+        # The few recurring transactions, without scanning the rest of the user's history
+        Index(
+            "ix_transaction_user_id_recurring",
+            "user_id",
+            "date",
+            "id",
+            postgresql_where=text("frequency IS NOT NULL"),
+            sqlite_where=text("frequency IS NOT NULL"),
+        ),
+        # Imports insert with ON CONFLICT DO NOTHING against this to skip duplicates
+        Index(
+            "uq_transaction_user_id_fingerprint",
+            "user_id",
+            "fingerprint",
+            unique=True,
+            postgresql_where=text("fingerprint IS NOT NULL"),
+            sqlite_where=text("fingerprint IS NOT NULL"),
+        ),
+    )
 
     # Columns
     id: uuid.UUID = db.Column(
-        UUID(as_uuid=True),
+        UUIDType,
         primary_key=True,
         unique=True,
+        default=uuid.uuid4,
         server_default=text(GEN_RANDOM_UUID),
     )
     user_id: uuid.UUID = db.Column(ForeignKey(USER_ACCOUNT_ID), nullable=False)
@@ -45,6 +147,7 @@ class Transaction(db.Model):
     frequency: Frequency = db.Column(Enum(Frequency), nullable=True)
     _amount: int = db.Column("amount", db.Integer, nullable=False)
     description: Optional[str] = db.Column(String(100), nullable=True)
+    fingerprint: Optional[str] = db.Column(String(32), nullable=True)
 
     @hybrid_property
     def amount(self) -> float:
@@ -62,18 +165,18 @@ class Transaction(db.Model):
     def to_dict(self) -> dict:
         """Convert the instance to a dictionary.
 
-        In the case of "category" and "frequency", the values are converted to their enum values.
+        UUIDs, dates and enums are left as they are, `backend.json_codec` encodes them.
 
         Returns:
             dict: the instance as a dictionary
         """
         return {
-            "id": str(self.id),
-            "user_id": str(self.user_id),
-            "type": self.type.value,
-            "category": self.category.value,
-            "date": str(self.date),
-            "frequency": self.frequency.value if self.frequency else None,
+            "id": self.id,
+            "user_id": self.user_id,
+            "type": self.type,
+            "category": self.category,
+            "date": self.date,
+            "frequency": self.frequency,
             "amount": self.amount,
             "description": self.description,
         }
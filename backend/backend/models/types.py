@@ -0,0 +1,21 @@
+import uuid
+
+from sqlalchemy import Uuid
+from sqlalchemy.types import TypeDecorator
+
+
+class UUIDType(TypeDecorator):
+    """A UUID column which also accepts string UUIDs as bound parameters.
+
+    User ids arrive as strings from the JWT and are compared against UUID columns throughout the
+    queries. PostgreSQL's driver coerces these itself, this makes the same true of every backend
+    (e.g. the SQLite databases used in tests). Native UUID on PostgreSQL, CHAR(32) elsewhere.
+    """
+
+    impl = Uuid(as_uuid=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if isinstance(value, str):
+            return uuid.UUID(value)
+        return value
@@ -1,9 +1,10 @@
 import uuid
 from typing import Dict, Final
 
+from backend.enums.transaction_enums import TransactionCategory, TransactionType
 from backend.extensions import db
+from backend.models.types import UUIDType
 from sqlalchemy import text
-from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import text
 
 GEN_RANDOM_UUID: Final[str] = "gen_random_uuid()"
@@ -27,9 +28,10 @@ class User(db.Model):
     __tablename__ = "user_account"
 
     id: uuid.UUID = db.Column(
-        UUID(as_uuid=True),
+        UUIDType,
         primary_key=True,
         unique=True,
+        default=uuid.uuid4,
         server_default=text(GEN_RANDOM_UUID),
     )
     email: str = db.Column(db.String(100), unique=True, nullable=False)
@@ -39,12 +41,29 @@ class User(db.Model):
     transactions = db.relationship("Transaction", back_populates="user")
     budgets = db.relationship("Budget", back_populates="user")
 
+    def expense_totals(self) -> Dict[TransactionCategory, float]:
+        """Total expenses per category, in pounds, from the already loaded transactions.
+
+        Used to serialise budgets without querying each budget's spend separately.
+        """
+        totals: Dict[TransactionCategory, int] = {}
+        for transaction in self.transactions:
+            if transaction.type == TransactionType.EXPENSE:
+                totals[transaction.category] = (
+                    totals.get(transaction.category, 0) + transaction._amount
+                )
+        return {category: pence / 100 for category, pence in totals.items()}
+
     def to_dict(self) -> Dict:
-        """Returns the User object and it's related data in a JSON serialisable format."""
+        """Returns the User object and it's related data, serialisable with `backend.json_codec`."""
+        expense_totals = self.expense_totals()
         return {
-            "meta": {"id": str(self.id), "alias": self.alias},
+            "meta": {"id": self.id, "alias": self.alias},
             "transactions": [
                 transaction.to_dict() for transaction in self.transactions
             ],
-            "budgets": [budget.to_dict() for budget in self.budgets],
+            "budgets": [
+                budget.to_dict(spent=expense_totals.get(budget.category, 0))
+                for budget in self.budgets
+            ],
         }
@@ -1,5 +1,17 @@
+import datetime
+import uuid
+from typing import List
+
+from backend.enums.frequency_enums import Frequency
+from backend.enums.transaction_enums import TransactionType
 from backend.extensions import db
+from backend.models.budget_evaluation_models import (
+    BudgetEvaluation,
+    BudgetEvaluationShard,
+)
 from backend.models.budget_models import Budget
+from backend.models.transaction_models import Transaction
+from sqlalchemy import Row, and_, case, or_, select
 
 
 def get_budgets_by(user_id: str) -> list[Budget]:
@@ -12,3 +24,147 @@ def get_budgets_by(user_id: str) -> list[Budget]:
         list[Budget]: a list of Budget objects.
     """
     return db.session.query(Budget).where(Budget.user_id == user_id).all()
+
+
+def _in_user_range(column, lower: uuid.UUID, upper: uuid.UUID | None):
+    if upper is None:
+        return column >= lower
+    return and_(column >= lower, column < upper)
+
+
+def get_budget_spend_in_range(
+    lower: uuid.UUID,
+    upper: uuid.UUID | None,
+    period_starts: dict[Frequency, datetime.date],
+    end: datetime.date,
+) -> List[Row]:
+    """Get every budget of the users in a range with its spend over its period, in one query.
+
+    Spend counts expenses without a frequency in the budget's category, from the start of its
+    frequency's period to `end`.
+
+    Args:
+        lower, UUID: the lowest user id in the range.
+        upper, UUID | None: the user id the range ends before, None for no end.
+        period_starts, dict[Frequency, date]: the first day of each frequency's period.
+        end, date: the last day of every period.
+
+    Returns:
+        List[Row]: (id, user_id, category, frequency, _amount, period_start, spent) rows,
+            amounts in pence.
+    """
+    # Compared with `==` rather than `case(value=...)`, so the frequencies bind as the enum
+    period_start = case(
+        *[
+            (Budget.frequency == frequency, start)
+            for frequency, start in period_starts.items()
+        ]
+    )
+    spent = db.func.coalesce(db.func.sum(Transaction._amount), 0)
+    return db.session.execute(
+        select(
+            Budget.id,
+            Budget.user_id,
+            Budget.category,
+            Budget.frequency,
+            Budget._amount,
+            period_start.label("period_start"),
+            spent.label("spent"),
+        )
+        .outerjoin(
+            Transaction,
+            and_(
+                Transaction.user_id == Budget.user_id,
+                Transaction.date >= period_start,
+                Transaction.date <= end,
+                Transaction.type == TransactionType.EXPENSE,
+                Transaction.category == Budget.category,
+                Transaction.frequency.is_(None),
+            ),
+        )
+        .where(_in_user_range(Budget.user_id, lower, upper))
+        .group_by(
+            Budget.id,
+            Budget.user_id,
+            Budget.category,
+            Budget.frequency,
+            Budget._amount,
+        )
+    ).all()
+
+
+def get_recurring_expenses_in_range(
+    lower: uuid.UUID, upper: uuid.UUID | None, end: datetime.date
+) -> List[Row]:
+    """Get the recurring expenses of the users in a range which start by `end`.
+
+    Returns:
+        List[Row]: (user_id, category, date, frequency, _amount) rows, `_amount` in pence.
+    """
+    return db.session.execute(
+        select(
+            Transaction.user_id,
+            Transaction.category,
+            Transaction.date,
+            Transaction.frequency,
+            Transaction._amount,
+        ).where(
+            _in_user_range(Transaction.user_id, lower, upper),
+            Transaction.type == TransactionType.EXPENSE,
+            Transaction.frequency.isnot(None),
+            Transaction.date <= end,
+        )
+    ).all()
+
+
+def get_evaluation_shard_counts() -> List[int]:
+    """Get the shard counts budget evaluation runs have been checkpointed with."""
+    return (
+        db.session.execute(select(BudgetEvaluationShard.shard_count).distinct())
+        .scalars()
+        .all()
+    )
+
+
+def get_latest_evaluations_by(
+    user_id: str, shards: dict[int, int]
+) -> List[BudgetEvaluation]:
+    """Get the user's budget evaluations from the latest run which evaluated their budgets.
+
+    The latest run is the latest to have checkpointed the user's shard, whether or not it
+    flagged any of their budgets, so budgets no longer breached aren't returned.
+
+    Args:
+        user_id, str: the UUID of the user.
+        shards, dict[int, int]: the user's shard for each shard count runs have used.
+
+    Returns:
+        List[BudgetEvaluation]: the evaluations, by category.
+    """
+    latest = (
+        select(db.func.max(BudgetEvaluationShard.run_date))
+        .where(
+            or_(
+                *[
+                    and_(
+                        BudgetEvaluationShard.shard_count == shard_count,
+                        BudgetEvaluationShard.shard == shard,
+                    )
+                    for shard_count, shard in shards.items()
+                ]
+            )
+        )
+        .scalar_subquery()
+    )
+    return (
+        db.session.execute(
+            select(BudgetEvaluation)
+            .where(
+                BudgetEvaluation.user_id == user_id,
+                BudgetEvaluation.run_date == latest,
+            )
+            .order_by(BudgetEvaluation.category)
+        )
+        .scalars()
+        .all()
+    )
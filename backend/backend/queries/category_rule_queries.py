@@ -0,0 +1,19 @@
+from backend.extensions import db
+from backend.models.category_rule_models import CategoryRule
+
+
+def get_category_rules_by(user_id: str) -> list[CategoryRule]:
+    """Get all categorisation rules for a user, in priority order.
+
+    Args:
+        user_id, str: the UUID of the user.
+
+    Returns:
+        list[CategoryRule]: the rules, lowest priority first.
+    """
+    return (
+        db.session.query(CategoryRule)
+        .where(CategoryRule.user_id == user_id)
+        .order_by(CategoryRule.priority, CategoryRule.id)
+        .all()
+    )
@@ -1,7 +1,11 @@
-from typing import List, Literal
+import datetime
+import uuid
+from typing import Iterator, List, Literal, Sequence
 
+from backend.enums.transaction_enums import TransactionCategory, TransactionType
 from backend.extensions import db
 from backend.models.transaction_models import Transaction
+from sqlalchemy import ColumnElement, Date, DateTime, Row, cast, select, text, tuple_
 from sqlalchemy.orm.attributes import InstrumentedAttribute
 
 
@@ -14,6 +18,91 @@ def get_all_transactions(user_id: str) -> List[Transaction]:
     )
 
 
+def iter_user_transactions(
+    user_id: str, batch_size: int = 500
+) -> Iterator[List[Transaction]]:
+    """Get all transactions for a user_id, newest first, in batches of `batch_size`.
+
+    Rows are fetched with `yield_per` (a server-side cursor on PostgreSQL), so only one batch
+    is held in memory at a time.
+    """
+    result = db.session.execute(
+        select(Transaction)
+        .where(Transaction.user_id == user_id)
+        .order_by(Transaction.date.desc(), Transaction.id)
+        .execution_options(yield_per=batch_size)
+    )
+    yield from result.scalars().partitions()
+
+
+def get_transactions_after(
+    user_id: str,
+    after: tuple[datetime.date, uuid.UUID] | None = None,
+    limit: int = 1000,
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+    categories: Sequence[TransactionCategory] | None = None,
+) -> List[Row]:
+    """Get the next page of a user's transactions as rows, oldest first.
+
+    Keyset pagination on (date, id), using the (user_id, date, id) index, so each page costs the
+    same however far into the history it is.
+
+    Args:
+        user_id, str: the UUID of the user.
+        after, tuple[date, UUID] | None: the (date, id) of the last row of the previous page.
+        limit, int: the maximum number of rows.
+        start, date | None: the earliest date to include.
+        end, date | None: the latest date to include.
+        categories, Sequence[TransactionCategory] | None: only include these categories.
+
+    Returns:
+        List[Row]: rows with the `Transaction` columns, `_amount` in pence.
+    """
+    query = select(
+        Transaction.id,
+        Transaction.date,
+        Transaction.type,
+        Transaction.category,
+        Transaction.frequency,
+        Transaction._amount,
+        Transaction.description,
+    ).where(Transaction.user_id == user_id)
+    if start is not None:
+        query = query.where(Transaction.date >= start)
+    if end is not None:
+        query = query.where(Transaction.date <= end)
+    if categories:
+        query = query.where(Transaction.category.in_(categories))
+    if after is not None:
+        query = query.where(tuple_(Transaction.date, Transaction.id) > after)
+
+    return db.session.execute(
+        query.order_by(Transaction.date, Transaction.id).limit(limit)
+    ).all()
+
+
+def get_recurring_transactions_by(user_id: str) -> List[Row]:
+    """Get a user's transactions with a frequency as rows, to expand with `backend.recurrence`.
+
+    Returns:
+        List[Row]: rows with the `Transaction` columns, `_amount` in pence, oldest first.
+    """
+    return db.session.execute(
+        select(
+            Transaction.id,
+            Transaction.date,
+            Transaction.type,
+            Transaction.category,
+            Transaction.frequency,
+            Transaction._amount,
+            Transaction.description,
+        )
+        .where(Transaction.user_id == user_id, Transaction.frequency.isnot(None))
+        .order_by(Transaction.date, Transaction.id)
+    ).all()
+
+
 def get_n_user_transactions_ordered(
     user_id: str,
     ordered_by: InstrumentedAttribute = Transaction.date,
@@ -66,3 +155,174 @@ def get_category_totals_by(user_id: str) -> dict[str, float]:
     )
 
     return {category.value: total for category, total in category_totals}
+
+
+def get_balance_by(user_id: str, on: datetime.date) -> int:
+    """Get a user's balance at the end of a day, incomes less expenses, in pence."""
+    signed = db.case(
+        (Transaction.type == TransactionType.INCOME, Transaction._amount),
+        else_=-Transaction._amount,
+    )
+    return db.session.execute(
+        select(db.func.coalesce(db.func.sum(signed), 0)).where(
+            Transaction.user_id == user_id, Transaction.date <= on
+        )
+    ).scalar_one()
+
+
+def get_discretionary_totals_by(
+    user_id: str, start: datetime.date, end: datetime.date
+) -> List[Row]:
+    """Get a user's spend per category on expenses without a frequency, between two dates.
+
+    Returns:
+        List[Row]: (category, total in pence, earliest date) rows.
+    """
+    return db.session.execute(
+        select(
+            Transaction.category,
+            db.func.sum(Transaction._amount),
+            db.func.min(Transaction.date),
+        )
+        .where(
+            Transaction.user_id == user_id,
+            Transaction.type == TransactionType.EXPENSE,
+            Transaction.frequency.is_(None),
+            Transaction.date.between(start, end),
+        )
+        .group_by(Transaction.category)
+    ).all()
+
+
+def _bucket_start(bucket: str, dialect_name: str) -> ColumnElement:
+    """SQL for the first day of the day, week (from Monday), month or year of each date."""
+    if dialect_name == "postgresql":
+        if bucket not in ("day", "week", "month", "year"):
+            raise ValueError(f"Unsupported bucket {bucket!r}")
+        # A literal rather than a parameter, so GROUP BY repeats the exact SELECT expression
+        return cast(
+            db.func.date_trunc(text(f"'{bucket}'"), cast(Transaction.date, DateTime)),
+            Date,
+        )
+    if bucket == "day":
+        return Transaction.date
+    if bucket == "week":
+        # The next Sunday, or the day itself on a Sunday, less six days
+        return db.func.date(Transaction.date, "weekday 0", "-6 days")
+    formats = {"month": "%Y-%m-01", "year": "%Y-01-01"}
+    return db.func.strftime(formats[bucket], Transaction.date)
+
+
+def get_bucket_totals_by(
+    user_id: str,
+    bucket: str,
+    start: datetime.date,
+    end: datetime.date,
+    transaction_type: TransactionType = TransactionType.EXPENSE,
+    categories: Sequence[TransactionCategory] | None = None,
+) -> List[Row]:
+    """Get a user's totals per day, week, month or year between two dates, aggregated in SQL.
+
+    Args:
+        user_id, str: the UUID of the user.
+        bucket, str: "day", "week", "month" or "year".
+        start, date: the earliest date to include.
+        end, date: the latest date to include.
+        transaction_type, TransactionType: only include transactions of this type.
+        categories, Sequence[TransactionCategory] | None: only include these categories.
+
+    Returns:
+        List[Row]: (bucket start, total in pence) rows for the buckets with transactions. The
+            bucket start is a date, or its ISO string on SQLite.
+    """
+    bucket_start = _bucket_start(bucket, db.session.get_bind().dialect.name).label(
+        "bucket_start"
+    )
+    query = select(bucket_start, db.func.sum(Transaction._amount)).where(
+        Transaction.user_id == user_id,
+        Transaction.type == transaction_type,
+        Transaction.date.between(start, end),
+    )
+    if categories:
+        query = query.where(Transaction.category.in_(categories))
+    return db.session.execute(query.group_by(bucket_start)).all()
+
+
+def get_latest_by_description(user_id: str, per_description: int) -> List[Row]:
+    """Get the latest transactions without a frequency for each description of a user's.
+
+    The ranking is done in SQL, so at most `per_description` rows per distinct (type,
+    description) leave the database however long the history is.
+
+    Returns:
+        List[Row]: (type, category, date, _amount, description, rank, total) rows, `_amount`
+            in pence, `rank` 1 for the latest of a description and `total` the number of
+            transactions with it.
+    """
+    partition = (Transaction.type, Transaction.description)
+    ranked = (
+        select(
+            Transaction.type,
+            Transaction.category,
+            Transaction.date,
+            Transaction._amount,
+            Transaction.description,
+            db.func.row_number()
+            .over(
+                partition_by=partition,
+                order_by=(Transaction.date.desc(), Transaction.id.desc()),
+            )
+            .label("rank"),
+            db.func.count().over(partition_by=partition).label("total"),
+        )
+        .where(
+            Transaction.user_id == user_id,
+            Transaction.frequency.is_(None),
+            Transaction.description.is_not(None),
+        )
+        .subquery()
+    )
+    return db.session.execute(
+        select(ranked).where(ranked.c.rank <= per_description)
+    ).all()
+
+
+def get_expenses_in_order_by(user_id: str) -> List[Row]:
+    """Get a user's expenses as rows, oldest first.
+
+    Returns:
+        List[Row]: (id, category, date, _amount, description) rows, `_amount` in pence.
+    """
+    return db.session.execute(
+        select(
+            Transaction.id,
+            Transaction.category,
+            Transaction.date,
+            Transaction._amount,
+            Transaction.description,
+        )
+        .where(
+            Transaction.user_id == user_id,
+            Transaction.type == TransactionType.EXPENSE,
+        )
+        .order_by(Transaction.date, Transaction.id)
+    ).all()
+
+
+def get_unscheduled_totals_by(
+    user_id: str, start: datetime.date, end: datetime.date
+) -> List[Row]:
+    """Get a user's totals of transactions without a frequency, between two dates.
+
+    Returns:
+        List[Row]: (type, category, total in pence) rows.
+    """
+    return db.session.execute(
+        select(Transaction.type, Transaction.category, db.func.sum(Transaction._amount))
+        .where(
+            Transaction.user_id == user_id,
+            Transaction.frequency.is_(None),
+            Transaction.date.between(start, end),
+        )
+        .group_by(Transaction.type, Transaction.category)
+    ).all()
@@ -0,0 +1,189 @@
+"""Expanding recurring transactions into their occurrences over a date window.
+
+A transaction with a `Frequency` recurs from its date onwards, its date being the first
+occurrence. Occurrences are computed arithmetically: the first one in a window is found by
+division rather than by stepping from the transaction's date, so the cost is proportional to the
+occurrences produced however old the transaction is, and `count_occurrences` costs the same for
+any window.
+
+Monthly and annual occurrences keep the day of the month of the first one, clamped to the length
+of shorter months. A transaction on 31 January recurs on 28 (or 29) February, then 31 March, and
+one on 29 February recurs on 28 February in years which aren't leap years.
+"""
+
+import calendar
+import datetime
+import heapq
+from typing import Final, Iterable, Iterator, NamedTuple, Protocol
+
+from backend.enums.frequency_enums import Frequency
+from backend.enums.transaction_enums import TransactionCategory, TransactionType
+
+DAY_STEPS: Final[dict[Frequency, int]] = {
+    Frequency.DAILY: 1,
+    Frequency.WEEKLY: 7,
+    Frequency.BI_WEEKLY: 14,
+    Frequency.FOUR_WEEKLY: 28,
+}
+MONTH_STEPS: Final[dict[Frequency, int]] = {
+    Frequency.MONTHLY: 1,
+    Frequency.ANNUALLY: 12,
+}
+
+
+class Recurring(Protocol):
+    """The attributes of a transaction, or a row of its columns, used to expand it."""
+
+    date: datetime.date
+    frequency: Frequency | None
+
+
+class Amounted(Recurring, Protocol):
+    type: TransactionType
+    category: TransactionCategory
+    _amount: int
+
+
+class Occurrence(NamedTuple):
+    """One occurrence of a recurring item.
+
+    Attributes:
+        date: The date of the occurrence.
+        item: The transaction (or row) it is an occurrence of.
+    """
+
+    date: datetime.date
+    item: Recurring
+
+
+def _add_months(anchor: datetime.date, months: int) -> datetime.date:
+    """The date `months` after `anchor`, on the same day of the month or the month's last."""
+    year, month = divmod(anchor.month - 1 + months, 12)
+    year += anchor.year
+    day = min(anchor.day, calendar.monthrange(year, month + 1)[1])
+    return datetime.date(year, month + 1, day)
+
+
+def _months_between(start: datetime.date, end: datetime.date) -> int:
+    return (end.year - start.year) * 12 + end.month - start.month
+
+
+def nth_occurrence(start: datetime.date, frequency: Frequency, n: int) -> datetime.date:
+    """The date of the `n`th occurrence (from 0) of something first occurring on `start`."""
+    if frequency in DAY_STEPS:
+        return start + datetime.timedelta(days=n * DAY_STEPS[frequency])
+    return _add_months(start, n * MONTH_STEPS[frequency])
+
+
+def _first_index(
+    start: datetime.date, frequency: Frequency, window_start: datetime.date
+) -> int:
+    """The index of the first occurrence on or after `window_start`."""
+    if window_start <= start:
+        return 0
+    if frequency in DAY_STEPS:
+        return -(-(window_start - start).days // DAY_STEPS[frequency])
+    step = MONTH_STEPS[frequency]
+    n = -(-_months_between(start, window_start) // step)
+    # The occurrence in window_start's month may fall before it
+    if nth_occurrence(start, frequency, n) < window_start:
+        n += 1
+    return n
+
+
+def _last_index(
+    start: datetime.date, frequency: Frequency, window_end: datetime.date
+) -> int:
+    """The index of the last occurrence on or before `window_end`, -1 if there is none."""
+    if window_end < start:
+        return -1
+    if frequency in DAY_STEPS:
+        return (window_end - start).days // DAY_STEPS[frequency]
+    step = MONTH_STEPS[frequency]
+    n = _months_between(start, window_end) // step
+    if nth_occurrence(start, frequency, n) > window_end:
+        n -= 1
+    return n
+
+
+def count_occurrences(
+    start: datetime.date,
+    frequency: Frequency | None,
+    window_start: datetime.date,
+    window_end: datetime.date,
+) -> int:
+    """How many times something first occurring on `start` occurs in the window, inclusive.
+
+    Without a frequency it occurs once, on `start`.
+    """
+    if frequency is None:
+        return int(window_start <= start <= window_end)
+    first = _first_index(start, frequency, window_start)
+    return max(0, _last_index(start, frequency, window_end) - first + 1)
+
+
+def occurrence_dates(
+    start: datetime.date,
+    frequency: Frequency | None,
+    window_start: datetime.date,
+    window_end: datetime.date,
+) -> Iterator[datetime.date]:
+    """The dates something first occurring on `start` occurs on in the window, inclusive."""
+    if frequency is None:
+        if window_start <= start <= window_end:
+            yield start
+        return
+    last = _last_index(start, frequency, window_end)
+    for n in range(_first_index(start, frequency, window_start), last + 1):
+        yield nth_occurrence(start, frequency, n)
+
+
+def _occurrences(
+    item: Recurring, window_start: datetime.date, window_end: datetime.date
+) -> Iterator[Occurrence]:
+    for date in occurrence_dates(item.date, item.frequency, window_start, window_end):
+        yield Occurrence(date, item)
+
+
+def expand(
+    items: Iterable[Recurring],
+    window_start: datetime.date,
+    window_end: datetime.date,
+) -> Iterator[Occurrence]:
+    """Expand recurring items into their occurrences in the window, in date order.
+
+    Occurrences are produced lazily, merging the items' date sequences, so only one pending
+    occurrence per item is held however long the window.
+
+    Args:
+        items, Iterable[Recurring]: transactions or rows with `date` and `frequency`. Those
+            without a frequency occur once, on their date.
+        window_start, date: the first day of the window.
+        window_end, date: the last day of the window.
+
+    Returns:
+        Iterator[Occurrence]: (date, item), items occurring on the same day in the order given.
+    """
+    return heapq.merge(
+        *(_occurrences(item, window_start, window_end) for item in items),
+        key=lambda occurrence: occurrence.date,
+    )
+
+
+def occurrence_totals(
+    items: Iterable[Amounted],
+    window_start: datetime.date,
+    window_end: datetime.date,
+) -> dict[tuple[TransactionType, TransactionCategory], int]:
+    """Total amounts in pence by (type, category) of the items' occurrences in the window.
+
+    Occurrences are counted rather than expanded, so each item costs the same however long the
+    window.
+    """
+    totals: dict[tuple[TransactionType, TransactionCategory], int] = {}
+    for item in items:
+        count = count_occurrences(item.date, item.frequency, window_start, window_end)
+        if count:
+            key = (item.type, item.category)
+            totals[key] = totals.get(key, 0) + count * item._amount
+    return totals
@@ -1,9 +1,11 @@
 import jwt
 from backend.extensions import logger
 from backend.services.auth_services import (
+    TokenRevokedError,
     authenticate,
     generate_token,
     get_token_from_header,
+    revoke_token,
     verify_token,
 )
 from flask import Blueprint, Response, g, jsonify, make_response, request
@@ -95,7 +97,7 @@ def verify_authenticity() -> tuple[Response, int]:
     Returns:
         tuple[Response, int]: (response, status_code)
             - 200: Token valid
-            - 401: Token missing/expired/invalid
+            - 401: Token missing/expired/revoked/invalid
 
     Response Format:
         Success (200):
@@ -131,6 +133,9 @@ def verify_authenticity() -> tuple[Response, int]:
             "auth_routes.verify_authenticity : Token is EXPIRED.", exc_info=1
         )
         return jsonify({"success": False, "message": "Token expired."}), 401
+    except TokenRevokedError:
+        logger.info("auth_routes.verify_authenticity : Token is REVOKED.")
+        return jsonify({"success": False, "message": "Token revoked."}), 401
     except jwt.InvalidTokenError:
         logger.warning(
             "auth_routes.verify_authenticity : Token is INVALID.", exc_info=1
@@ -153,9 +158,10 @@ def verify_authenticity() -> tuple[Response, int]:
 @auth_blueprint.route("/logout", methods=["POST"])
 def terminate_session() -> tuple[Response, int]:
     """
-    Terminate the current user session by clearing the JWT cookie.
+    Terminate the current user session by revoking the JWT and clearing the cookie.
 
-    No authentication required. Safe to call with invalid/expired sessions.
+    Revoking the token means a copy of it (e.g. a stolen one) can't be used for the rest of its
+    lifetime. No authentication required. Safe to call with invalid/expired sessions.
 
     Returns:
         tuple[Response, int]: (response, 200)
@@ -166,6 +172,14 @@ def terminate_session() -> tuple[Response, int]:
             "message": "Logged out successfully"
         }
     """
+    token = request.cookies.get("jwt")
+    if token:
+        try:
+            revoke_token(token)
+        except Exception as e:
+            # Still clear the cookie, the token will expire on its own
+            logger.error(f"auth_routes.terminate_session : Unable to revoke token: {e}")
+
     response = make_response(
         jsonify({"success": True, "message": "Logged out successfully"})
     )
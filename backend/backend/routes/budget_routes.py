@@ -1,8 +1,11 @@
+from backend.db_routing import read_only
 from backend.services.auth_services import login_required
+from backend.services.budget_evaluation_services import get_budget_evaluations
 from backend.services.cache_services import (
     cache_user_with_associations,
     get_user_cache_field,
 )
+from backend.services.etag_services import conditional_get
 from backend.services.users_services import get_user_with_associations
 from backend.extensions import logger
 from flask import Blueprint, Response, g, jsonify
@@ -28,6 +31,8 @@ def validate_budget_data(data: Any) -> bool:
 
 @budgets_blueprint.route("/load", methods=["GET"])
 @login_required
+@read_only
+@conditional_get
 def load_budgets() -> tuple[Response, int]:
     """
     Load the user's budget data.
@@ -105,3 +110,46 @@ def load_budgets() -> tuple[Response, int]:
             "success": False,
             "message": "Internal server error while loading budgets"
         }), 500
+
+
+@budgets_blueprint.route("/evaluations", methods=["GET"])
+@login_required
+@read_only
+def budget_evaluations():
+    """
+    The authenticated user's budgets breached, or near it, at the latest nightly evaluation.
+
+    See `backend.services.budget_evaluation_services`, run by `flask evaluate-budgets`.
+
+    Returns:
+        tuple[Response, int]: (response, status_code)
+            - 200: Success with the evaluations, empty if none of the user's budgets were flagged
+            - 500: Internal server error
+
+    Response Format:
+        Success (200):
+            {
+                "success": true,
+                "evaluations": [
+                    {
+                        "budget_id": str,
+                        "run_date": str,
+                        "category": str,
+                        "frequency": str,
+                        "period_start": str,
+                        "amount": float,
+                        "spent": float,
+                        "status": str  # "breached" | "near-breach"
+                    }
+                ]
+            }
+    """
+    try:
+        evaluations = get_budget_evaluations(g.user_id)
+    except Exception as e:
+        logger.error(
+            f"budget_routes.budget_evaluations : Unexpected error: {str(e)}",
+            exc_info=True,
+        )
+        return jsonify({"success": False, "message": "Internal server error"}), 500
+    return jsonify({"success": True, "evaluations": evaluations}), 200
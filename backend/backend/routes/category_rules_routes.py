@@ -0,0 +1,114 @@
+import redis
+from backend.enums.transaction_enums import TransactionType
+from backend.extensions import db, logger
+from backend.models.category_rule_models import CategoryRule
+from backend.queries.category_rule_queries import get_category_rules_by
+from backend.services.auth_services import login_required
+from backend.services.cache_services import bump_rules_version
+from backend.services.categorisation_services import validate_pattern
+from backend.services.import_services import parse_category
+from flask import Blueprint, Response, g, jsonify, request
+
+category_rules_blueprint = Blueprint(
+    "category_rules", __name__, url_prefix="/api/category-rules"
+)
+
+
+def _rules_changed(user_id: str) -> None:
+    try:
+        bump_rules_version(user_id)
+    except redis.RedisError as e:
+        logger.warning(
+            f"category_rules_routes._rules_changed : Version not bumped for user {user_id}: {e}"
+        )
+
+
+@category_rules_blueprint.route("", methods=["GET"])
+@login_required
+def list_rules() -> tuple[Response, int]:
+    """
+    List the authenticated user's categorisation rules, in priority order.
+
+    Returns:
+        tuple[Response, int]: (response, status_code)
+            - 200: {"success": true, "rules": list[dict]}
+    """
+    rules = get_category_rules_by(g.user_id)
+    return jsonify({"success": True, "rules": [rule.to_dict() for rule in rules]}), 200
+
+
+@category_rules_blueprint.route("", methods=["POST"])
+@login_required
+def create_rule() -> tuple[Response, int]:
+    """
+    Create a categorisation rule for the authenticated user.
+
+    Request Body:
+        pattern (str): A keyword, or a regular expression if is_regex
+        is_regex (bool): Whether pattern is a regular expression (default: false)
+        category (str): The category for matching transactions
+        type (str): "income" or "expense" to only apply to that type (optional)
+        priority (int): Lower wins when several rules match (default: 100)
+
+    Returns:
+        tuple[Response, int]: (response, status_code)
+            - 201: {"success": true, "rule": dict}
+            - 400: Invalid rule
+            - 500: Internal server error
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        pattern = str(data.get("pattern") or "")
+        is_regex = bool(data.get("is_regex", False))
+        validate_pattern(pattern, is_regex)
+        category = parse_category(str(data.get("category") or ""))
+        type_ = TransactionType(data["type"]) if data.get("type") else None
+        priority = int(data.get("priority", 100))
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    try:
+        rule = CategoryRule(
+            user_id=g.user_id,
+            pattern=pattern,
+            is_regex=is_regex,
+            category=category,
+            type=type_,
+            priority=priority,
+        )
+        db.session.add(rule)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(
+            f"category_rules_routes.create_rule : Unexpected error: {str(e)}",
+            exc_info=True,
+        )
+        return jsonify({"success": False, "message": "Unable to create rule"}), 500
+
+    _rules_changed(g.user_id)
+    return jsonify({"success": True, "rule": rule.to_dict()}), 201
+
+
+@category_rules_blueprint.route("/<uuid:rule_id>", methods=["DELETE"])
+@login_required
+def delete_rule(rule_id) -> tuple[Response, int]:
+    """
+    Delete one of the authenticated user's categorisation rules.
+
+    Returns:
+        tuple[Response, int]: (response, status_code)
+            - 200: {"success": true}
+            - 404: No such rule for this user
+    """
+    deleted = (
+        db.session.query(CategoryRule)
+        .filter(CategoryRule.id == rule_id, CategoryRule.user_id == g.user_id)
+        .delete()
+    )
+    db.session.commit()
+    if not deleted:
+        return jsonify({"success": False, "message": "Rule not found"}), 404
+
+    _rules_changed(g.user_id)
+    return jsonify({"success": True}), 200
@@ -1,15 +1,33 @@
+import datetime
+
+from backend.db_routing import read_only
 from backend.extensions import logger
+from backend.jobs import enqueue
 from backend.services.auth_services import login_required
 from backend.services.cache_services import cache_user_with_associations, get_user_cache
 from backend.services.dashboard_services import compute_dashboard
+from backend.services.etag_services import conditional_get
+from backend.services.forecast_services import (
+    FORECAST_DEFAULT_MONTHS,
+    FORECAST_MAX_MONTHS,
+    get_forecast,
+)
+from backend.services.job_services import recompute_rollup
+from backend.services.rollup_services import (
+    ROLLUP_MONTH_FORMAT,
+    get_rollup,
+    parse_month,
+)
 from backend.services.users_services import get_user_with_associations
-from flask import Blueprint, Response, g, jsonify
+from flask import Blueprint, Response, g, jsonify, request
 
 dashboard_blueprint = Blueprint("dashboard", __name__, url_prefix="/api/dashboard")
 
 
 @dashboard_blueprint.route("/load", methods=["GET"])
 @login_required
+@read_only
+@conditional_get
 def load_dashboard() -> tuple[Response, int]:
     """
     Load and compute dashboard data for the authenticated user.
@@ -107,3 +125,130 @@ def load_dashboard() -> tuple[Response, int]:
             exc_info=True,
         )
         return jsonify({"success": False, "message": "Internal server error"}), 500
+
+
+@dashboard_blueprint.route("/forecast", methods=["GET"])
+@login_required
+@read_only
+def forecast() -> tuple[Response, int]:
+    """
+    Forecast the authenticated user's balance day by day.
+
+    The forecast is cached per generation of the user's data and per day, see
+    `backend.services.forecast_services`.
+
+    Query Parameters:
+        months (int): How many months to forecast (default: 12, at most 60)
+
+    Returns:
+        tuple[Response, int]: (response, status_code)
+            - 200: Success with the forecast
+            - 400: Invalid months
+            - 500: Internal server error
+
+    Response Format:
+        Success (200):
+            {
+                "success": true,
+                "forecast": {
+                    "start": str,
+                    "end": str,
+                    "opening_balance": float,
+                    "balance": list[float],
+                    "recurring": {"income": float, "expense": float},
+                    "discretionary": dict[str, float]
+                }
+            }
+        Error (400/500):
+            {
+                "success": false,
+                "message": str
+            }
+    """
+    months = request.args.get("months", FORECAST_DEFAULT_MONTHS, type=int)
+    if not 1 <= months <= FORECAST_MAX_MONTHS:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": f"months must be between 1 and {FORECAST_MAX_MONTHS}",
+                }
+            ),
+            400,
+        )
+
+    try:
+        return (
+            jsonify({"success": True, "forecast": get_forecast(g.user_id, months)}),
+            200,
+        )
+    except Exception as e:
+        logger.error(
+            f"dashboard_routes.forecast : Forecast error for user {g.user_id}: {str(e)}",
+            exc_info=True,
+        )
+        return jsonify({"success": False, "message": "Internal server error"}), 500
+
+
+@dashboard_blueprint.route("/rollup", methods=["GET"])
+@login_required
+@read_only
+def rollup() -> tuple[Response, int]:
+    """
+    The authenticated user's totals per category for a month.
+
+    Rollups are computed by a background job. If the month's rollup of the user's current data
+    isn't ready the job is queued and 202 returned straight away, to be asked for again later.
+
+    Query Parameters:
+        month (str): The month, YYYY-MM (default: the current month)
+
+    Returns:
+        tuple[Response, int]: (response, status_code)
+            - 200: Success with the rollup
+            - 202: The rollup is being computed
+            - 400: Invalid month
+            - 500: Internal server error
+
+    Response Format:
+        Success (200):
+            {
+                "success": true,
+                "rollup": {
+                    "month": str,
+                    "income": dict[str, float],
+                    "expense": dict[str, float],
+                    "total_income": float,
+                    "total_expense": float,
+                    "net": float
+                }
+            }
+        Pending (202):
+            {
+                "success": true,
+                "status": "pending"
+            }
+    """
+    month = request.args.get("month") or datetime.date.today().strftime(
+        ROLLUP_MONTH_FORMAT
+    )
+    try:
+        parse_month(month)
+    except ValueError:
+        return (
+            jsonify({"success": False, "message": "month must be YYYY-MM"}),
+            400,
+        )
+
+    try:
+        cached = get_rollup(g.user_id, month)
+        if cached is not None:
+            return jsonify({"success": True, "rollup": cached}), 200
+        enqueue(recompute_rollup, g.user_id, month)
+    except Exception as e:
+        logger.error(
+            f"dashboard_routes.rollup : Rollup error for user {g.user_id}: {str(e)}",
+            exc_info=True,
+        )
+        return jsonify({"success": False, "message": "Internal server error"}), 500
+    return jsonify({"success": True, "status": "pending"}), 202
@@ -0,0 +1,193 @@
+"""Runs the real routes and services against stand-in backing services.
+
+Unlike the other route tests nothing is monkeypatched: SQL goes to a throwaway SQLite database (or the
+database at `HARNESS_DB_URI`, e.g. a local PostgreSQL) and Redis commands go to an in-memory fakeredis
+server. Both are counted, so tests can hold endpoints to a budget of round trips and catch N+1
+queries or extra cache calls as soon as they are introduced.
+"""
+
+import datetime
+import os
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+
+import fakeredis
+import redis
+from backend.app import create_app
+from backend.enums.frequency_enums import Frequency
+from backend.enums.transaction_enums import TransactionCategory, TransactionType
+from backend.extensions import db
+from backend.models.budget_models import Budget
+from backend.models.transaction_models import Fingerprinter, Transaction
+from backend.models.user_models import User
+from backend.services.auth_services import generate_token
+from flask import Flask, g, request
+from flask.testing import FlaskClient
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+HARNESS_USER_HEADER = "X-Harness-User"
+
+
+@dataclass
+class CallCounts:
+    """SQL statements and Redis round trips made while counting."""
+
+    sql: int = 0
+    redis: int = 0
+    statements: list[str] = field(default_factory=list)
+    commands: list[str] = field(default_factory=list)
+
+
+@contextmanager
+def count_calls(engine: Engine, client: redis.Redis) -> Iterator[CallCounts]:
+    """Count SQL statements executed on `engine` and Redis round trips made by `client`.
+
+    A pipeline counts as a single round trip, however many commands it holds.
+    """
+    counts = CallCounts()
+
+    def on_statement(conn, cursor, statement, parameters, context, executemany):
+        counts.sql += 1
+        counts.statements.append(statement)
+
+    execute_command = client.execute_command
+    pipeline = client.pipeline
+
+    def counted_execute_command(*args, **options):
+        counts.redis += 1
+        counts.commands.append(str(args[0]))
+        return execute_command(*args, **options)
+
+    def counted_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        def counted_execute(*execute_args, **execute_kwargs):
+            counts.redis += 1
+            counts.commands.append("PIPELINE")
+            return execute(*execute_args, **execute_kwargs)
+
+        pipe.execute = counted_execute
+        return pipe
+
+    event.listen(engine, "before_cursor_execute", on_statement)
+    client.execute_command = counted_execute_command
+    client.pipeline = counted_pipeline
+    try:
+        yield counts
+    finally:
+        event.remove(engine, "before_cursor_execute", on_statement)
+        del client.execute_command
+        del client.pipeline
+
+
+def use_fake_redis(client: redis.Redis) -> fakeredis.FakeRedis:
+    """Point an existing client (e.g. `extensions.redis_cache`) at a fresh in-memory server.
+
+    Swapping the connection pool rather than the client means every module that imported the
+    client talks to the fake server. Returns the fake client, e.g. for `flushall()`.
+    """
+    fake = fakeredis.FakeRedis(
+        decode_responses=client.connection_pool.connection_kwargs.get(
+            "decode_responses", False
+        )
+    )
+    client.connection_pool = fake.connection_pool
+    return fake
+
+
+def create_harness_app(db_uri: str, **config) -> Flask:
+    """The real app, using `db_uri` for the database and any extra `config` keys.
+
+    Requests made after `login_as()` are authenticated whether or not `@login_required` has
+    been patched out by other test modules.
+    """
+    app = create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": os.getenv("HARNESS_DB_URI", db_uri),
+            "TOKEN_REVOCATION_ENABLED": False,
+            "SLOW_QUERY_THRESHOLD_MS": None,
+            "DB_POOL_METRICS_LOG_INTERVAL": None,
+            **config,
+        }
+    )
+
+    @app.before_request
+    def authenticate_harness_user():
+        user_id = request.headers.get(HARNESS_USER_HEADER)
+        if user_id:
+            g.user_id = user_id
+
+    return app
+
+
+def login_as(client: FlaskClient, user_id: str) -> dict[str, str]:
+    """Authenticate the test client as `user_id`, returning the headers to send with requests.
+
+    Sets a real JWT cookie for `@login_required` and the harness header for when it has been
+    patched out. Requires `JWT_SECRET_KEY` to be set.
+    """
+    token, _ = generate_token(user_id=user_id)
+    client.set_cookie("jwt", token)
+    return {HARNESS_USER_HEADER: user_id}
+
+
+def add_user_with_history(
+    n_transactions: int = 25, n_budgets: int = 3, email: str = "harness@example.com"
+) -> str:
+    """Add a user with `n_transactions` transactions and `n_budgets` budgets, returning their id.
+
+    Must be called inside an app context.
+    """
+    user = User(
+        id=uuid.uuid4(), email=email, password="not-a-real-hash", alias="Harness"
+    )
+    db.session.add(user)
+
+    expense_categories = [
+        TransactionCategory.RENT,
+        TransactionCategory.GROCERIES,
+        TransactionCategory.DINING,
+        TransactionCategory.UTILITIES,
+    ]
+    start = datetime.date(2024, 1, 1)
+    # As an import would, so statements overlapping the history aren't imported twice
+    fingerprint = Fingerprinter(user.id)
+    for i in range(n_transactions):
+        is_income = i % 5 == 0
+        transaction = Transaction(
+            user_id=user.id,
+            type=TransactionType.INCOME if is_income else TransactionType.EXPENSE,
+            category=(
+                TransactionCategory.SALARY
+                if is_income
+                else expense_categories[i % len(expense_categories)]
+            ),
+            date=start + datetime.timedelta(days=i),
+            amount=1000 if is_income else 10 + i,
+            description=f"Transaction {i}",
+        )
+        transaction.fingerprint = fingerprint(
+            transaction.type,
+            transaction.date,
+            transaction._amount,
+            transaction.description,
+        )
+        db.session.add(transaction)
+
+    for category in expense_categories[:n_budgets]:
+        db.session.add(
+            Budget(
+                user_id=user.id,
+                category=category,
+                frequency=Frequency.MONTHLY,
+                amount=500,
+            )
+        )
+
+    db.session.commit()
+    return str(user.id)
@@ -0,0 +1,86 @@
+"""Per-endpoint budgets of SQL statements and Redis round trips.
+
+Runs the real services (see `harness.py`), so a regression such as a query per budget inside
+`Budget.to_dict` fails here even though the monkeypatched route tests still pass.
+"""
+
+from typing import Final
+
+import pytest
+from backend.extensions import db, redis_cache
+from backend.routes.test.harness import login_as, count_calls
+from backend.services.cache_services import bump_user_generation
+
+# (endpoint, cache state, max SQL statements, max Redis round trips). Every request reads the
+# user's data generation for its ETag, "not_modified" requests send a matching If-None-Match.
+ENDPOINT_BUDGETS: Final[list[tuple[str, str, int, int]]] = [
+    ("/api/dashboard/load", "warm", 0, 2),
+    ("/api/dashboard/load", "cold", 3, 3),
+    ("/api/dashboard/load", "not_modified", 0, 1),
+    ("/api/budgets/load", "warm", 0, 2),
+    ("/api/budgets/load", "cold", 3, 3),
+    ("/api/budgets/load", "not_modified", 0, 1),
+    ("/api/transactions/list", "warm", 0, 2),
+    ("/api/transactions/list", "cold", 1, 2),
+    ("/api/transactions/list", "not_modified", 0, 1),
+    ("/api/users/me", "warm", 0, 2),
+    ("/api/users/me", "cold", 3, 3),
+    ("/api/users/me", "not_modified", 0, 1),
+]
+
+
+@pytest.mark.parametrize("path, cache_state, max_sql, max_redis", ENDPOINT_BUDGETS)
+def test_endpoint_within_budget(
+    app, client, fake_redis, user_id, path, cache_state, max_sql, max_redis
+):
+    headers = login_as(client, user_id)
+    fake_redis.flushall()
+    if cache_state == "warm":
+        assert client.get("/api/users/me", headers=headers).status_code == 200
+    if cache_state == "not_modified":
+        etag = client.get(path, headers=headers).headers["ETag"]
+        headers = {**headers, "If-None-Match": etag}
+
+    with app.app_context():
+        engine = db.engine
+    with count_calls(engine, redis_cache) as counts:
+        response = client.get(path, headers=headers)
+
+    expected_status = 304 if cache_state == "not_modified" else 200
+    assert response.status_code == expected_status, response.get_json()
+    assert counts.sql <= max_sql, (
+        f"{path} ({cache_state}) ran {counts.sql} SQL statements, budget is {max_sql}:\n"
+        + "\n".join(counts.statements)
+    )
+    assert counts.redis <= max_redis, (
+        f"{path} ({cache_state}) made {counts.redis} Redis round trips, budget is "
+        f"{max_redis}: {counts.commands}"
+    )
+
+
+def test_budget_spend_matches_between_cold_and_warm(client, fake_redis, user_id):
+    headers = login_as(client, user_id)
+    fake_redis.flushall()
+
+    cold = client.get("/api/dashboard/load", headers=headers).get_json()
+    warm = client.get("/api/dashboard/load", headers=headers).get_json()
+
+    assert cold == warm
+    assert len(cold["user_budget_summary"]) == 3
+    assert all(budget["spent"] > 0 for budget in cold["user_budget_summary"])
+
+
+def test_etag_changes_with_generation(client, fake_redis, user_id):
+    headers = login_as(client, user_id)
+    first = client.get("/api/dashboard/load", headers=headers)
+    conditional = {**headers, "If-None-Match": first.headers["ETag"]}
+
+    assert client.get("/api/dashboard/load", headers=conditional).status_code == 304
+    assert client.get("/api/budgets/load", headers=conditional).status_code == 200
+
+    bump_user_generation(user_id)
+    response = client.get("/api/dashboard/load", headers=conditional)
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != first.headers["ETag"]
+    assert response.get_json() == first.get_json()
@@ -1,9 +1,41 @@
+import datetime
+import io
+from typing import Final
+
+import redis
+from backend.db_pool import statement_timeout
+from backend.db_routing import read_only
+from backend.enums.transaction_enums import TransactionCategory, TransactionType
+from backend.jobs import enqueue
+from backend.models.transaction_models import Transaction
 from backend.queries.transactions_queries import get_all_transactions
+from backend.services.anomaly_services import (
+    ANOMALIES_DEFAULT_LIMIT,
+    MAX_ANOMALIES,
+    get_anomalies,
+)
 from backend.services.auth_services import login_required
 from backend.services.cache_services import get_user_cache_field
+from backend.services.etag_services import conditional_get
+from backend.services.export_services import EXPORT_FORMATS, iter_export_batches
+from backend.services.import_services import import_transactions, parse_category
+from backend.services.job_services import rebuild_user_cache
+from backend.services.recurring_services import get_recurring_payments
+from backend.services.series_services import (
+    SERIES_BUCKETS,
+    SERIES_DEFAULT_DAYS,
+    SERIES_MAX_POINTS,
+    SERIES_POINTS_LIMIT,
+    bucket_count,
+    get_series,
+)
 from backend.services.transactions_services import paginate_transactions
+from backend.statement_parsers import PARSERS, detect_format
 from backend.extensions import logger
-from flask import Blueprint, g, jsonify, request
+from flask import Blueprint, Response, g, jsonify, request, stream_with_context
+
+# Applies to each page of an export, not the whole export
+EXPORT_STATEMENT_TIMEOUT_MS: Final[int] = 5000
 
 transactions_blueprint = Blueprint(
     "transactions", __name__, url_prefix="/api/transactions"
@@ -12,6 +44,8 @@ transactions_blueprint = Blueprint(
 
 @transactions_blueprint.route("/list", methods=["GET"])
 @login_required
+@read_only
+@conditional_get
 def list_transactions():
     """
     List paginated transactions for the authenticated user.
@@ -105,6 +139,12 @@ def list_transactions():
                     200,
                 )
 
+            # Rows from the database still need serialising, only do so for this page
+            page_transactions = [
+                tx.to_dict() if isinstance(tx, Transaction) else tx
+                for tx in result["transactions"]
+            ]
+
             logger.info(
                 f"transactions_routes.list_transactions : Successfully retrieved transactions for user {g.user_id}"
             )
@@ -113,7 +153,7 @@ def list_transactions():
                     {
                         "success": True,
                         "message": "Transactions retrieved successfully",
-                        "transactions": result["transactions"],
+                        "transactions": page_transactions,
                         "has_more": result["has_more"],
                     }
                 ),
@@ -144,3 +184,398 @@ def list_transactions():
             ),
             500,
         )
+
+
+@transactions_blueprint.route("/export", methods=["GET"])
+@login_required
+@read_only
+@statement_timeout(EXPORT_STATEMENT_TIMEOUT_MS)
+def export_transactions():
+    """
+    Export the authenticated user's transactions, streamed as CSV or JSON Lines.
+
+    Transactions are read and sent a page at a time, oldest first, see
+    `backend.services.export_services`.
+
+    Query Parameters:
+        format (str): "csv" (default) or "jsonl"
+        start (str): Earliest date to include, YYYY-MM-DD (optional)
+        end (str): Latest date to include, YYYY-MM-DD (optional)
+        category (str): Categories to include, repeated or comma-separated (optional)
+
+    Returns:
+        tuple[Response, int]: (response, status_code)
+            - 200: The export, as an attachment
+            - 400: Invalid parameters
+    """
+    export_format = request.args.get("format", "csv").lower()
+    if export_format not in EXPORT_FORMATS:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": f"format must be one of {', '.join(EXPORT_FORMATS)}",
+                }
+            ),
+            400,
+        )
+
+    try:
+        start = _parse_date(request.args.get("start"))
+        end = _parse_date(request.args.get("end"))
+        categories = _parse_categories()
+    except ValueError as e:
+        logger.warning(
+            f"transactions_routes.export_transactions : Invalid parameters: {str(e)}"
+        )
+        return (
+            jsonify({"success": False, "message": "Invalid date or category"}),
+            400,
+        )
+
+    if start is not None and end is not None and start > end:
+        return (
+            jsonify({"success": False, "message": "start must not be after end"}),
+            400,
+        )
+
+    logger.info(
+        f"transactions_routes.export_transactions : Exporting {export_format} for user {g.user_id}"
+    )
+    encode, mimetype, extension = EXPORT_FORMATS[export_format]
+    batches = iter_export_batches(
+        g.user_id, start=start, end=end, categories=categories
+    )
+    response = Response(stream_with_context(encode(batches)), mimetype=mimetype)
+    response.headers["Content-Disposition"] = (
+        f'attachment; filename="transactions.{extension}"'
+    )
+    return response, 200
+
+
+@transactions_blueprint.route("/series", methods=["GET"])
+@login_required
+@read_only
+def transactions_series():
+    """
+    Totals of the authenticated user's transactions per day, week, month or year.
+
+    Totals are aggregated in SQL and zero-filled, so the response holds one value per bucket
+    however many transactions there are, see `backend.services.series_services`.
+
+    Query Parameters:
+        bucket (str): "day", "week", "month" (default) or "year"
+        from (str): Earliest date to include, YYYY-MM-DD (default: a year before `to`)
+        to (str): Latest date to include, YYYY-MM-DD (default: today)
+        category (str): Categories to include, repeated or comma-separated (optional)
+        type (str): "expense" (default) or "income"
+        max_points (int): Most buckets to return, coarser buckets are used to fit (default: 366)
+
+    Returns:
+        tuple[Response, int]: (response, status_code)
+            - 200: Success with the series
+            - 400: Invalid parameters, or more years from `from` to `to` than `max_points`
+            - 500: Internal server error
+
+    Response Format:
+        Success (200):
+            {
+                "success": true,
+                "bucket": str,
+                "buckets": list[str],
+                "totals": list[float]
+            }
+    """
+    bucket = request.args.get("bucket", "month").lower()
+    if bucket not in SERIES_BUCKETS:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": f"bucket must be one of {', '.join(SERIES_BUCKETS)}",
+                }
+            ),
+            400,
+        )
+
+    try:
+        end = _parse_date(request.args.get("to")) or datetime.date.today()
+        start = _parse_date(request.args.get("from")) or end - datetime.timedelta(
+            days=SERIES_DEFAULT_DAYS
+        )
+        categories = _parse_categories()
+        transaction_type = TransactionType(request.args.get("type", "expense").lower())
+    except ValueError as e:
+        logger.warning(
+            f"transactions_routes.transactions_series : Invalid parameters: {str(e)}"
+        )
+        return (
+            jsonify({"success": False, "message": "Invalid date, category or type"}),
+            400,
+        )
+
+    max_points = request.args.get("max_points", SERIES_MAX_POINTS, type=int)
+    if start > end or not 1 <= max_points <= SERIES_POINTS_LIMIT:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": f"from must not be after to, and max_points must be between 1 and {SERIES_POINTS_LIMIT}",
+                }
+            ),
+            400,
+        )
+    if bucket_count(start, end, "year") > max_points:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": "from and to are more than max_points years apart",
+                }
+            ),
+            400,
+        )
+
+    try:
+        series = get_series(
+            g.user_id,
+            bucket,
+            start,
+            end,
+            transaction_type=transaction_type,
+            categories=categories,
+            max_points=max_points,
+        )
+    except Exception as e:
+        logger.error(
+            f"transactions_routes.transactions_series : Unexpected error: {str(e)}",
+            exc_info=True,
+        )
+        return jsonify({"success": False, "message": "Internal server error"}), 500
+    return jsonify({"success": True, **series}), 200
+
+
+@transactions_blueprint.route("/recurring", methods=["GET"])
+@login_required
+@read_only
+def recurring_payments():
+    """
+    Likely subscriptions and bills found in the authenticated user's transactions.
+
+    Transactions without a frequency are grouped by description, and groups with evenly
+    spaced dates and similar amounts are returned, see `backend.services.recurring_services`.
+
+    Returns:
+        tuple[Response, int]: (response, status_code)
+            - 200: Success with the recurring payments, largest first
+            - 500: Internal server error
+
+    Response Format:
+        Success (200):
+            {
+                "success": true,
+                "recurring": [
+                    {
+                        "description": str,
+                        "type": str,
+                        "category": str,
+                        "frequency": str,
+                        "amount": float,
+                        "occurrences": int,
+                        "last_date": str,
+                        "next_date": str
+                    }
+                ]
+            }
+    """
+    try:
+        recurring = get_recurring_payments(g.user_id)
+    except Exception as e:
+        logger.error(
+            f"transactions_routes.recurring_payments : Unexpected error: {str(e)}",
+            exc_info=True,
+        )
+        return jsonify({"success": False, "message": "Internal server error"}), 500
+    return jsonify({"success": True, "recurring": recurring}), 200
+
+
+@transactions_blueprint.route("/anomalies", methods=["GET"])
+@login_required
+@read_only
+def anomalous_expenses():
+    """
+    The authenticated user's latest unusually large expenses, and their categories' norms.
+
+    An expense is flagged when it was at least three standard deviations above its category's
+    mean at the time, see `backend.services.anomaly_services`.
+
+    Query Parameters:
+        limit (int): Most anomalies to return, up to 100 (default: 20)
+
+    Returns:
+        tuple[Response, int]: (response, status_code)
+            - 200: Success with the anomalies, newest first
+            - 400: Invalid limit
+            - 500: Internal server error
+
+    Response Format:
+        Success (200):
+            {
+                "success": true,
+                "anomalies": [
+                    {
+                        "id": str,
+                        "date": str,
+                        "category": str,
+                        "amount": float,
+                        "description": str | null,
+                        "mean": float,
+                        "sigma": float,
+                        "percentile": float
+                    }
+                ],
+                "categories": {
+                    str: {
+                        "count": int,
+                        "mean": float,
+                        "std": float,
+                        "p50": float,
+                        "p90": float,
+                        "p99": float
+                    }
+                }
+            }
+    """
+    limit = request.args.get("limit", ANOMALIES_DEFAULT_LIMIT, type=int)
+    if not 1 <= limit <= MAX_ANOMALIES:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": f"limit must be between 1 and {MAX_ANOMALIES}",
+                }
+            ),
+            400,
+        )
+
+    try:
+        anomalies = get_anomalies(g.user_id, limit)
+    except Exception as e:
+        logger.error(
+            f"transactions_routes.anomalous_expenses : Unexpected error: {str(e)}",
+            exc_info=True,
+        )
+        return jsonify({"success": False, "message": "Internal server error"}), 500
+    return jsonify({"success": True, **anomalies}), 200
+
+
+@transactions_blueprint.route("/import", methods=["POST"])
+@login_required
+def import_statement():
+    """
+    Import the transactions in a bank statement for the authenticated user.
+
+    The file is parsed as it is read and inserted in batches in a single database transaction,
+    see `backend.services.import_services`.
+
+    Form Data:
+        file: The statement, CSV, OFX or QIF
+        format (str): "csv", "ofx" or "qif", by default from the file's extension (optional)
+        income_category (str): Category for income rows without one (optional)
+        expense_category (str): Category for expense rows without one (optional)
+
+    Returns:
+        tuple[Response, int]: (response, status_code)
+            - 200: Imported, with counts and the first invalid rows
+            - 400: Missing file or invalid parameters
+            - 500: Internal server error, nothing was imported
+
+    Response Format:
+        Success (200):
+            {
+                "success": true,
+                "imported": int,
+                "invalid": int,
+                "errors": [{"row": int, "message": str}]
+            }
+    """
+    statement = request.files.get("file")
+    if statement is None:
+        return jsonify({"success": False, "message": "No file uploaded"}), 400
+
+    statement_format = request.form.get("format") or detect_format(statement.filename)
+    if statement_format not in PARSERS:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": f"format must be one of {', '.join(PARSERS)}",
+                }
+            ),
+            400,
+        )
+
+    try:
+        default_categories = {
+            type_: parse_category(request.form[f"{type_.value}_category"])
+            for type_ in TransactionType
+            if request.form.get(f"{type_.value}_category")
+        }
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    # Uploads are spooled to disk, so the statement is never read into memory whole
+    stream = io.TextIOWrapper(statement.stream, encoding="utf-8-sig", newline="")
+    try:
+        result = import_transactions(
+            g.user_id, stream, statement_format, default_categories
+        )
+    except (ValueError, UnicodeDecodeError) as e:
+        logger.warning(
+            f"transactions_routes.import_statement : Unreadable statement: {str(e)}"
+        )
+        return (
+            jsonify({"success": False, "message": f"Unreadable statement: {e}"}),
+            400,
+        )
+    except Exception as e:
+        logger.error(
+            f"transactions_routes.import_statement : Unexpected error: {str(e)}",
+            exc_info=True,
+        )
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": "Internal server error while importing transactions",
+                }
+            ),
+            500,
+        )
+
+    logger.info(
+        f"transactions_routes.import_statement : Imported {result.imported} transactions for user {g.user_id}, {result.invalid} invalid"
+    )
+    if result.imported:
+        # The import dropped the user's cache, warm it again off the request
+        try:
+            enqueue(rebuild_user_cache, g.user_id)
+        except redis.RedisError as e:
+            logger.warning(
+                f"transactions_routes.import_statement : Cache rebuild not queued: {str(e)}"
+            )
+    return jsonify({"success": True, **result.to_dict()}), 200
+
+
+def _parse_date(value: str | None) -> datetime.date | None:
+    return datetime.date.fromisoformat(value) if value else None
+
+
+def _parse_categories() -> list[TransactionCategory]:
+    """The request's `category` parameters, repeated or comma-separated."""
+    return [
+        TransactionCategory(category.strip())
+        for value in request.args.getlist("category")
+        for category in value.split(",")
+        if category.strip()
+    ]
@@ -1,12 +1,15 @@
+from backend.db_routing import read_only
 from backend.services.auth_services import hash_password, login_required
 from backend.services.cache_services import cache_user_with_associations, get_user_cache
+from backend.services.etag_services import conditional_get
+from backend.services.stream_services import stream_user_data
 from backend.services.users_services import (
     add_user_account_to_db,
     get_user_with_associations,
     is_taken,
     serialise_user_associations,
 )
-from flask import Blueprint, Response, g, jsonify, request
+from flask import Blueprint, Response, g, jsonify, request, stream_with_context
 from sqlalchemy.exc import IntegrityError
 
 users_blueprint = Blueprint("users", __name__, url_prefix="/api/users")
@@ -14,10 +17,25 @@ users_blueprint = Blueprint("users", __name__, url_prefix="/api/users")
 
 @users_blueprint.route("/me", methods=["GET"])
 @login_required
+@read_only
+@conditional_get
 def get_user_data() -> tuple[Response, int]:
-    """Retrieve user data from cache or database."""
+    """Retrieve user data from cache or database.
+
+    With `?stream=true` the JSON is streamed in chunks instead, so memory use doesn't grow with
+    the user's transaction history. See `backend.services.stream_services`.
+    """
     user_id = g.user_id  # Extracted from JWT, not sure this is right...
 
+    if request.args.get("stream", "").lower() == "true":
+        chunks = stream_user_data(user_id=user_id)
+        if chunks is None:
+            return jsonify({"success": False, "message": "User not found."}), 404
+        return (
+            Response(stream_with_context(chunks), mimetype="application/json"),
+            200,
+        )
+
     # Check Redis cache first
     user_data = get_user_cache(user_id=user_id)
 
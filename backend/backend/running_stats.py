@@ -0,0 +1,123 @@
+"""Summaries of a stream of amounts, updated one value at a time in constant space.
+
+`RunningStats` keeps the count, mean and variance with Welford's algorithm, which is numerically
+stable where summing squares isn't. `QuantileSketch` estimates quantiles to within a relative
+error, like DDSketch: values are counted in logarithmically sized buckets, so a value's bucket
+is found in O(1) and at most `MAX_BUCKETS` counts are kept however many values are added.
+
+Both pack into short lists of numbers, to be stored as JSON.
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Final
+
+RELATIVE_ACCURACY: Final[float] = 0.02
+GAMMA: Final[float] = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA: Final[float] = math.log(GAMMA)
+# Enough for 2% accuracy from 1p to over £7m, the lowest buckets are merged beyond it
+MAX_BUCKETS: Final[int] = 512
+
+
+@dataclass
+class RunningStats:
+    """Count, mean and variance of the values added so far."""
+
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0  # Sum of squared differences from the mean
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        """The sample variance, 0 until there are two values."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def zscore(self, value: float, min_std: float = 0.0) -> float:
+        """How many standard deviations `value` is above the mean.
+
+        The standard deviation is taken to be at least `min_std`, and 0 if both are 0, i.e.
+        there is no spread to measure `value` by.
+        """
+        std = max(self.std, min_std)
+        if std == 0:
+            return 0.0
+        return (value - self.mean) / std
+
+    def pack(self) -> list:
+        return [self.count, self.mean, self.m2]
+
+    @classmethod
+    def unpack(cls, packed: list) -> "RunningStats":
+        return cls(*packed)
+
+
+@dataclass
+class QuantileSketch:
+    """Quantiles of non-negative values, within `RELATIVE_ACCURACY` of the true ones.
+
+    Bucket `k` counts the values in (GAMMA ** (k - 1), GAMMA ** k], zeros are counted apart.
+    """
+
+    zeros: int = 0
+    buckets: dict[int, int] = field(default_factory=dict)
+
+    def add(self, value: float) -> None:
+        if value <= 0:
+            self.zeros += 1
+            return
+        key = math.ceil(math.log(value) / _LOG_GAMMA)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+        if len(self.buckets) > MAX_BUCKETS:
+            # Merge the lowest buckets, large values are the ones that matter here
+            lowest = min(self.buckets)
+            self.buckets[lowest + 1] = self.buckets.get(
+                lowest + 1, 0
+            ) + self.buckets.pop(lowest)
+
+    @property
+    def count(self) -> int:
+        return self.zeros + sum(self.buckets.values())
+
+    def quantile(self, q: float) -> float:
+        """The estimated `q` quantile, 0 <= q <= 1, of the values added, 0 if there are none."""
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                return 2 * GAMMA**key / (GAMMA + 1)
+        return 0.0
+
+    def rank(self, value: float) -> float:
+        """The estimated share of the values added which are at most `value`."""
+        count = self.count
+        if not count:
+            return 0.0
+        if value <= 0:
+            return self.zeros / count if value == 0 else 0.0
+        key = math.ceil(math.log(value) / _LOG_GAMMA)
+        below = self.zeros + sum(n for k, n in self.buckets.items() if k <= key)
+        return below / count
+
+    def pack(self) -> list:
+        """[zeros, key, count, key, count, ...]"""
+        packed = [self.zeros]
+        for key, count in self.buckets.items():
+            packed += (key, count)
+        return packed
+
+    @classmethod
+    def unpack(cls, packed: list) -> "QuantileSketch":
+        return cls(packed[0], dict(zip(packed[1::2], packed[2::2])))
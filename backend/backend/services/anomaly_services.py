@@ -0,0 +1,264 @@
+"""Flagging expenses which are unusually large for their category.
+
+Each (user, category) has a `RunningStats` and a `QuantileSketch` of its expenses, stored
+packed in a Redis hash along with the user's data generation. An expense is judged against its
+category's statistics as they were before it, and flagged when it is at least `ANOMALY_SIGMA`
+standard deviations above the mean, then added to them. The standard deviation is taken to be
+at least `MIN_STD_RATIO` of the mean, so categories which barely vary aren't flagged for
+pennies. Writes update only the categories they touch, O(1) per transaction (see
+`record_new_expenses`), and the latest `MAX_ANOMALIES` flagged expenses are kept in a Redis
+list. The whole history is only replayed, oldest first, when that state is missing, behind the
+user's data generation, or dropped by a write of more than `MAX_NEW_EXPENSES` expenses.
+"""
+
+from typing import Final, Iterable
+
+import redis
+from backend.enums.transaction_enums import TransactionType
+from backend.extensions import logger, redis_cache
+from backend.json_codec import dumps, loads
+from backend.queries.transactions_queries import get_expenses_in_order_by
+from backend.running_stats import QuantileSketch, RunningStats
+from backend.services.cache_services import (
+    get_user_generation,
+    get_user_state,
+    updatable_user_state,
+    user_state_pipeline,
+)
+from backend.tracing import traced
+
+ANOMALY_SIGMA: Final[float] = 3.0
+# Expenses a category needs before any of its expenses are judged
+MIN_HISTORY: Final[int] = 10
+# The least standard deviation expenses are judged by, as a share of their mean, so a category
+# of equal expenses, e.g. rent, doesn't flag a penny more than usual
+MIN_STD_RATIO: Final[float] = 0.1
+MAX_ANOMALIES: Final[int] = 100
+ANOMALIES_DEFAULT_LIMIT: Final[int] = 20
+SUMMARY_QUANTILES: Final[dict[str, float]] = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+STATS_KEY_PREFIX: Final[str] = "anomaly_stats:"
+ANOMALIES_KEY_PREFIX: Final[str] = "anomalies:"
+# Expenses a write may add and still update the stored statistics, see `NewExpenses`
+MAX_NEW_EXPENSES: Final[int] = 10_000
+
+
+class CategoryStats:
+    """The statistics of one category's expenses, in pence."""
+
+    def __init__(
+        self, stats: RunningStats | None = None, sketch: QuantileSketch | None = None
+    ):
+        self.stats = stats or RunningStats()
+        self.sketch = sketch or QuantileSketch()
+
+    def judge(self, pence: int) -> float | None:
+        """The z-score of an expense if it is an anomaly, else None, before adding it."""
+        if self.stats.count >= MIN_HISTORY:
+            zscore = self.stats.zscore(pence, MIN_STD_RATIO * abs(self.stats.mean))
+            if zscore >= ANOMALY_SIGMA:
+                return zscore
+        return None
+
+    def add(self, pence: int) -> None:
+        self.stats.add(pence)
+        self.sketch.add(pence)
+
+    def summary(self) -> dict:
+        """Count, mean, standard deviation and `SUMMARY_QUANTILES`, in pounds."""
+        return {
+            "count": self.stats.count,
+            "mean": round(self.stats.mean) / 100,
+            "std": round(self.stats.std) / 100,
+            **{
+                name: round(self.sketch.quantile(q)) / 100
+                for name, q in SUMMARY_QUANTILES.items()
+            },
+        }
+
+    def pack(self) -> str:
+        return dumps([self.stats.pack(), self.sketch.pack()])
+
+    @classmethod
+    def unpack(cls, packed: str) -> "CategoryStats":
+        stats, sketch = loads(packed)
+        return cls(RunningStats.unpack(stats), QuantileSketch.unpack(sketch))
+
+
+def apply_expenses(
+    categories: dict[str, CategoryStats], expenses: Iterable[tuple]
+) -> list[dict]:
+    """Judge then add expenses, in the order given, to their categories' statistics.
+
+    Args:
+        categories, dict[str, CategoryStats]: statistics by category value, updated in place
+            and added to for new categories.
+        expenses, Iterable[tuple]: (id, category, date, pence, description) tuples, like
+            the rows of `get_expenses_in_order_by`.
+
+    Returns:
+        list[dict]: the anomalies found, in the order given.
+    """
+    anomalies = []
+    for transaction_id, category, date, pence, description in expenses:
+        stats = categories.get(category.value)
+        if stats is None:
+            stats = categories[category.value] = CategoryStats()
+        zscore = stats.judge(pence)
+        if zscore is not None:
+            anomalies.append(
+                {
+                    "id": str(transaction_id),
+                    "date": date.isoformat(),
+                    "category": category.value,
+                    "amount": pence / 100,
+                    "description": description,
+                    "mean": round(stats.stats.mean) / 100,
+                    "sigma": round(zscore, 1),
+                    "percentile": round(100 * stats.sketch.rank(pence), 1),
+                }
+            )
+        stats.add(pence)
+    return anomalies
+
+
+def _keys(user_id: str) -> tuple[str, str]:
+    return f"{STATS_KEY_PREFIX}{user_id}", f"{ANOMALIES_KEY_PREFIX}{user_id}"
+
+
+@traced("cache")
+def _store(
+    user_id: str,
+    generation: int,
+    categories: dict[str, CategoryStats],
+    anomalies: list[dict],
+    replace: bool,
+) -> None:
+    """Write categories' statistics and push anomalies for a generation, in one transaction."""
+    stats_key, anomalies_key = keys = _keys(user_id)
+    hashes = {
+        stats_key: {category: stats.pack() for category, stats in categories.items()}
+    }
+    with user_state_pipeline(keys, generation, hashes, replace) as pipeline:
+        # Oldest first, so the newest ends up at the head
+        anomalies = anomalies[-MAX_ANOMALIES:]
+        if anomalies:
+            pipeline.lpush(anomalies_key, *map(dumps, anomalies))
+            pipeline.ltrim(anomalies_key, 0, MAX_ANOMALIES - 1)
+
+
+def _result(categories: dict[str, CategoryStats], anomalies: list[dict]) -> dict:
+    return {
+        "anomalies": anomalies,
+        "categories": {
+            category: stats.summary() for category, stats in sorted(categories.items())
+        },
+    }
+
+
+def _replay(user_id: str) -> tuple[dict[str, CategoryStats], list[dict]]:
+    categories: dict[str, CategoryStats] = {}
+    anomalies = apply_expenses(categories, get_expenses_in_order_by(user_id))
+    return categories, anomalies
+
+
+@traced("service")
+def get_anomalies(user_id: str, limit: int = MAX_ANOMALIES) -> dict:
+    """Get a user's latest anomalous expenses and the statistics of their categories.
+
+    Served from the stored state while it is of the user's current data generation,
+    otherwise the history is replayed and it is replaced.
+
+    Args:
+        user_id, str: the UUID of the user.
+        limit, int: the most anomalies to return, at most `MAX_ANOMALIES`.
+
+    Returns:
+        dict: "anomalies", newest first, each with the expense's id, date, category, amount,
+            description, its category's mean before it, how many standard deviations above
+            it it was and its percentile, and "categories", each category's summary (see
+            `CategoryStats.summary`).
+    """
+    user_id = str(user_id)
+    stats_key, anomalies_key = _keys(user_id)
+    try:
+        generation = get_user_generation(user_id)
+        stored = get_user_state(stats_key, generation)
+        if stored is not None:
+            categories = {
+                category: CategoryStats.unpack(packed)
+                for category, packed in stored.items()
+            }
+            anomalies = redis_cache.lrange(anomalies_key, 0, limit - 1)
+            return _result(categories, [loads(anomaly) for anomaly in anomalies])
+    except redis.RedisError as e:
+        logger.warning(f"anomaly_services.get_anomalies : No cache: {e}")
+        categories, anomalies = _replay(user_id)
+        return _result(categories, anomalies[::-1][:limit])
+
+    categories, anomalies = _replay(user_id)
+    try:
+        _store(user_id, generation, categories, anomalies, replace=True)
+    except redis.RedisError as e:
+        logger.warning(f"anomaly_services.get_anomalies : Not stored: {e}")
+    return _result(categories, anomalies[::-1][:limit])
+
+
+class NewExpenses:
+    """Newly written expenses, see `record_new_expenses`.
+
+    Once more than `MAX_NEW_EXPENSES` are added none are kept, so that large imports take
+    bounded memory, and the stored state is dropped instead.
+    """
+
+    def __init__(self):
+        self.expenses: list[tuple] = []
+        self.overflowed = False
+
+    def add(self, values: dict) -> None:
+        """Add a transaction's column values, as inserted into the `transaction` table."""
+        if self.overflowed or values["type"] is not TransactionType.EXPENSE:
+            return
+        if len(self.expenses) >= MAX_NEW_EXPENSES:
+            self.overflowed = True
+            self.expenses = []
+            return
+        self.expenses.append(
+            (
+                values["id"],
+                values["category"],
+                values["date"],
+                values["amount"],
+                values["description"],
+            )
+        )
+
+    def __bool__(self) -> bool:
+        return self.overflowed or bool(self.expenses)
+
+
+@traced("cache")
+def record_new_expenses(user_id: str, new: NewExpenses, generation: int) -> None:
+    """Judge newly written expenses and add them to the stored statistics, call after
+    bumping the user's data generation to `generation`.
+
+    They are judged in date order against the history known when they were written, and
+    only the statistics of their categories are read and written. If the stored state isn't
+    of the previous generation, i.e. it missed other changes, or there were too many new
+    expenses to keep, it is dropped instead, and the next `get_anomalies` replays the history.
+    """
+    if not new:
+        return
+    user_id = str(user_id)
+    if not updatable_user_state(_keys(user_id), generation, dropped=new.overflowed):
+        return
+
+    stats_key, _ = _keys(user_id)
+    expenses = sorted(new.expenses, key=lambda expense: (expense[2], expense[0]))
+    names = list(dict.fromkeys(expense[1].value for expense in expenses))
+    categories = {
+        name: CategoryStats.unpack(packed)
+        for name, packed in zip(names, redis_cache.hmget(stats_key, names))
+        if packed is not None
+    }
+    anomalies = apply_expenses(categories, expenses)
+    _store(user_id, generation, categories, anomalies, replace=False)
@@ -9,12 +9,17 @@ from argon2 import PasswordHasher
 from argon2.exceptions import InvalidHashError, VerificationError, VerifyMismatchError
 from backend.extensions import logger
 from backend.queries.auth_queries import get_user_by
-from flask import g, jsonify, request
+from backend.services.revocation_services import is_jti_revoked, revoke_jti
+from flask import current_app, g, jsonify, request
 from sqlalchemy.exc import SQLAlchemyError
 
 PH: Final[PasswordHasher] = PasswordHasher()
 
 
+class TokenRevokedError(jwt.InvalidTokenError):
+    """Raised when an otherwise valid token has been revoked, e.g. by logging out."""
+
+
 def hash_password(password: str) -> str:
     """A "wrapper" function for argon2.PasswordHasher.hash().
 
@@ -71,6 +76,7 @@ def generate_token(user_id: uuid.UUID) -> tuple[str, int]:
         "user_id": str(user_id),
         "exp": expiry_time,
         "iat": datetime.datetime.now(),
+        "jti": uuid.uuid4().hex,  # identifies the token on the revocation list
     }
     token = jwt.encode(payload, os.environ["JWT_SECRET_KEY"], algorithm="HS256")
 
@@ -78,6 +84,14 @@ def generate_token(user_id: uuid.UUID) -> tuple[str, int]:
 
 
 def verify_token(token: str) -> str:
+    """Verify a JWT and return the `user_id` it was issued to.
+
+    Raises:
+        ValueError: if no token is given.
+        jwt.ExpiredSignatureError: if the token has expired.
+        TokenRevokedError: if the token has been revoked (only when `TOKEN_REVOCATION_ENABLED`).
+        jwt.InvalidTokenError: if the token is otherwise invalid.
+    """
     if not token:
         raise ValueError("JWT is missing")
 
@@ -85,12 +99,49 @@ def verify_token(token: str) -> str:
         decoded_token = jwt.decode(
             token, os.environ["JWT_SECRET_KEY"], algorithms=["HS256"]
         )
-        return decoded_token["user_id"]
     except jwt.ExpiredSignatureError:
         raise jwt.ExpiredSignatureError()
     except jwt.InvalidTokenError:
         raise jwt.InvalidTokenError()
 
+    # Tokens issued before revocation was introduced have no `jti` and can't be revoked
+    jti = decoded_token.get("jti")
+    if (
+        jti
+        and current_app.config.get("TOKEN_REVOCATION_ENABLED", True)
+        and is_jti_revoked(jti, decoded_token["exp"])
+    ):
+        raise TokenRevokedError("Token has been revoked")
+
+    return decoded_token["user_id"]
+
+
+def revoke_token(token: str) -> bool:
+    """Revoke a JWT so that it is rejected for the rest of its lifetime.
+
+    Args:
+        token, str: the encoded JWT.
+
+    Returns:
+        bool: True if the token was revoked, False if it was already expired, invalid or
+            has no `jti` to revoke it by.
+    """
+    if not os.environ.get("JWT_SECRET_KEY"):
+        raise ValueError("JWT_SECRET_KEY is missing")
+
+    try:
+        decoded_token = jwt.decode(
+            token, os.environ["JWT_SECRET_KEY"], algorithms=["HS256"]
+        )
+    except jwt.InvalidTokenError:
+        return False
+
+    if "jti" not in decoded_token:
+        return False
+
+    revoke_jti(decoded_token["jti"], decoded_token["exp"])
+    return True
+
 
 def get_token_from_header(header: str) -> str | None:
     if not header or not header.startswith("Bearer "):
@@ -121,6 +172,9 @@ def login_required(f: Callable) -> Callable:
         except jwt.ExpiredSignatureError as e:
             logger.info(e)
             return jsonify({"auth": False, "message": "Session expired."}), 401
+        except TokenRevokedError as e:
+            logger.info(e)
+            return jsonify({"auth": False, "message": "Session revoked."}), 401
         except jwt.InvalidSignatureError as e:
             logger.warning(e)
             return jsonify({"auth": False, "message": "Invalid token."}), 401
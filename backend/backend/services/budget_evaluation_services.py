@@ -0,0 +1,327 @@
+"""The nightly evaluation of every user's budgets against their spend over the current period.
+
+Users are split into `shard_count` shards by ranges of their ids, so a shard is a range scan of
+the user_id indexes rather than a list of ids. Each shard's budgets are evaluated with one
+set-based query for the spend of all of them (see `get_budget_spend_in_range`) and one for the
+recurring expenses whose occurrences in each period are added to it, then the budgets breached or
+near it are written in bulk. A shard's evaluations and its checkpoint row are written in the same
+database transaction, so a run which is interrupted, or which has shards fail, picks up from the
+shards without a checkpoint when it is run again for the same day.
+
+Shards are run across a process pool (see `backend.jobs.process_pool`), and the
+`evaluate-budgets` command reports progress as each one finishes.
+"""
+
+import datetime
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Callable, Final
+
+from backend.enums.budget_enums import BudgetStatus
+from backend.enums.frequency_enums import Frequency
+from backend.extensions import db, logger
+from backend.jobs import in_app_context, process_pool
+from backend.models.budget_evaluation_models import (
+    BudgetEvaluation,
+    BudgetEvaluationShard,
+)
+from backend.queries.budget_queries import (
+    get_budget_spend_in_range,
+    get_evaluation_shard_counts,
+    get_latest_evaluations_by,
+    get_recurring_expenses_in_range,
+)
+from backend.recurrence import count_occurrences
+from backend.tracing import traced
+from flask import Flask
+from sqlalchemy import delete, insert, select
+
+# Spend of at least this share of a budget's amount is near breaching it
+NEAR_BREACH_RATIO: Final[float] = 0.9
+DEFAULT_SHARDS: Final[int] = 64
+USER_ID_SPACE: Final[int] = 2**128
+
+
+def period_start(frequency: Frequency, on: datetime.date) -> datetime.date:
+    """The first day of a budget's current period, given the period's last day so far.
+
+    Weekly, monthly and annual periods are calendar weeks (from Monday), months and years.
+    Bi-weekly and four-weekly budgets have no calendar to follow, so their periods are the
+    14 and 28 days up to `on`.
+    """
+    if frequency is Frequency.DAILY:
+        return on
+    if frequency is Frequency.WEEKLY:
+        return on - datetime.timedelta(days=on.weekday())
+    if frequency is Frequency.BI_WEEKLY:
+        return on - datetime.timedelta(days=13)
+    if frequency is Frequency.FOUR_WEEKLY:
+        return on - datetime.timedelta(days=27)
+    if frequency is Frequency.MONTHLY:
+        return on.replace(day=1)
+    return on.replace(month=1, day=1)
+
+
+def shard_bounds(shard: int, shard_count: int) -> tuple[uuid.UUID, uuid.UUID | None]:
+    """The range of user ids in a shard, from the first up to (not including) the second.
+
+    The last shard has no upper bound. User ids are random UUIDs, so the shards are even.
+    """
+    if not 0 <= shard < shard_count:
+        raise ValueError(f"shard {shard} is not one of {shard_count}")
+    lower = uuid.UUID(int=_shard_lower(shard, shard_count))
+    if shard == shard_count - 1:
+        return lower, None
+    return lower, uuid.UUID(int=_shard_lower(shard + 1, shard_count))
+
+
+def _shard_lower(shard: int, shard_count: int) -> int:
+    # Rounded up, so a user's shard is their id's share of the id space rounded down
+    return -(-shard * USER_ID_SPACE // shard_count)
+
+
+def shard_of(user_id: str | uuid.UUID, shard_count: int) -> int:
+    """The shard a user is in, see `shard_bounds`."""
+    return uuid.UUID(str(user_id)).int * shard_count // USER_ID_SPACE
+
+
+def budget_status(amount: int, spent: int) -> BudgetStatus | None:
+    """Whether spend breaches a budget's amount or nears it, None if neither."""
+    if spent > amount:
+        return BudgetStatus.BREACHED
+    if spent and spent >= amount * NEAR_BREACH_RATIO:
+        return BudgetStatus.NEAR_BREACH
+    return None
+
+
+@dataclass
+class ShardResult:
+    """What evaluating one shard found."""
+
+    shard: int
+    budgets: int
+    flagged: int
+
+
+@traced("service")
+def evaluate_shard(run_date: str, shard: int, shard_count: int) -> ShardResult:
+    """Evaluate the budgets of one shard's users and write those breached or near it.
+
+    The shard's previous evaluations for the day are replaced, and its checkpoint written, in
+    the same commit, so running a shard again is harmless.
+
+    Args:
+        run_date, str: the ISO date of the run, the last day of every period.
+        shard, int: the index of the shard.
+        shard_count, int: how many shards the users are split into.
+
+    Returns:
+        ShardResult: how many budgets were evaluated and flagged.
+    """
+    on = datetime.date.fromisoformat(run_date)
+    lower, upper = shard_bounds(shard, shard_count)
+    starts = {frequency: period_start(frequency, on) for frequency in Frequency}
+
+    recurring = defaultdict(list)
+    for row in get_recurring_expenses_in_range(lower, upper, on):
+        recurring[(row.user_id, row.category)].append(row)
+
+    rows = []
+    budgets = get_budget_spend_in_range(lower, upper, starts, on)
+    for budget in budgets:
+        start = starts[budget.frequency]
+        spent = budget.spent + sum(
+            count_occurrences(expense.date, expense.frequency, start, on)
+            * expense._amount
+            for expense in recurring.get((budget.user_id, budget.category), ())
+        )
+        status = budget_status(budget._amount, spent)
+        if status is not None:
+            rows.append(
+                {
+                    "run_date": on,
+                    "budget_id": budget.id,
+                    "user_id": budget.user_id,
+                    "category": budget.category,
+                    "frequency": budget.frequency,
+                    "period_start": start,
+                    "amount": budget._amount,
+                    "spent": spent,
+                    "status": status,
+                }
+            )
+
+    replaced = delete(BudgetEvaluation).where(BudgetEvaluation.run_date == on)
+    replaced = replaced.where(BudgetEvaluation.user_id >= lower)
+    if upper is not None:
+        replaced = replaced.where(BudgetEvaluation.user_id < upper)
+    db.session.execute(replaced)
+    if rows:
+        db.session.execute(insert(BudgetEvaluation), rows)
+    db.session.merge(
+        BudgetEvaluationShard(
+            run_date=on,
+            shard=shard,
+            shard_count=shard_count,
+            budgets=len(budgets),
+            flagged=len(rows),
+            finished_at=datetime.datetime.now(datetime.timezone.utc),
+        )
+    )
+    db.session.commit()
+    return ShardResult(shard, len(budgets), len(rows))
+
+
+@dataclass
+class EvaluationProgress:
+    """The progress of an evaluation run, as reported after each shard."""
+
+    run_date: datetime.date
+    shard_count: int
+    # Shards checkpointed by an earlier run of the same day, not run again
+    skipped: int
+    shards: int = 0
+    failed: int = 0
+    budgets: int = 0
+    flagged: int = 0
+    started: float = 0.0
+
+    @property
+    def remaining(self) -> int:
+        return self.shard_count - self.skipped - self.shards - self.failed
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def budgets_per_second(self) -> float:
+        return self.budgets / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def eta_seconds(self) -> float | None:
+        """The time left at the rate of the shards run so far, None before the first."""
+        if not self.shards:
+            return None
+        return self.elapsed / self.shards * self.remaining
+
+
+def _checkpointed(run_date: datetime.date) -> dict[int, int]:
+    """The checkpointed shards of a day's run, with the shard count they were run with."""
+    return dict(
+        db.session.execute(
+            select(
+                BudgetEvaluationShard.shard, BudgetEvaluationShard.shard_count
+            ).where(BudgetEvaluationShard.run_date == run_date)
+        ).all()
+    )
+
+
+def run_evaluation(
+    app: Flask,
+    run_date: datetime.date,
+    shard_count: int | None = None,
+    processes: int = 0,
+    on_progress: Callable[[EvaluationProgress], None] | None = None,
+) -> EvaluationProgress:
+    """Evaluate every user's budgets, resuming the day's run if it has already been started.
+
+    Shards which fail are logged and left without a checkpoint, to be run again by the next
+    run for the day. Must be called in an app context.
+
+    Args:
+        app, Flask: the app, which the pool processes are forked with.
+        run_date, date: the day to evaluate budgets up to.
+        shard_count, int | None: how many shards to split users into, by default the day's
+            earlier run's or `DEFAULT_SHARDS`.
+        processes, int: the size of the process pool, 0 to run the shards in this process.
+        on_progress, Callable | None: called with the progress after each shard.
+
+    Returns:
+        EvaluationProgress: the run's totals.
+
+    Raises:
+        ValueError: if `shard_count` isn't the shard count the day's run was started with.
+    """
+    checkpointed = _checkpointed(run_date)
+    started_with = set(checkpointed.values())
+    if shard_count is None:
+        shard_count = started_with.pop() if started_with else DEFAULT_SHARDS
+    elif started_with and started_with != {shard_count}:
+        raise ValueError(
+            f"The run for {run_date} was started with {started_with.pop()} shards"
+        )
+
+    progress = EvaluationProgress(
+        run_date, shard_count, skipped=len(checkpointed), started=time.perf_counter()
+    )
+    pending = [shard for shard in range(shard_count) if shard not in checkpointed]
+    # Pool processes open their own connections
+    db.session.remove()
+    running: dict[Future, int] = {}
+    with process_pool(app, processes) as executor:
+        while pending or running:
+            # Submitted a few at a time, so the inline executor reports progress as it goes
+            while pending and len(running) < max(processes, 1):
+                try:
+                    future = executor.submit(
+                        in_app_context,
+                        evaluate_shard,
+                        run_date.isoformat(),
+                        pending[0],
+                        shard_count,
+                    )
+                except BrokenProcessPool as e:
+                    # A pool process died, the rest are left to the next run
+                    logger.error(
+                        f"budget_evaluation_services.run_evaluation : {str(e)}, "
+                        f"{len(pending)} shards of {run_date} not run"
+                    )
+                    progress.failed += len(pending)
+                    pending = []
+                    break
+                running[future] = pending.pop(0)
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                shard = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    progress.failed += 1
+                    logger.error(
+                        f"budget_evaluation_services.run_evaluation : Shard {shard} "
+                        f"of {run_date} failed: {str(e)}"
+                    )
+                else:
+                    progress.shards += 1
+                    progress.budgets += result.budgets
+                    progress.flagged += result.flagged
+                if on_progress is not None:
+                    on_progress(progress)
+    return progress
+
+
+@traced("service")
+def get_budget_evaluations(user_id: str) -> list[dict]:
+    """Get the user's budgets flagged by the latest evaluation run to evaluate them.
+
+    Returns:
+        list[dict]: the evaluations, see `BudgetEvaluation.to_dict`, empty if none of the
+            user's budgets were flagged.
+    """
+    shards = {
+        shard_count: shard_of(user_id, shard_count)
+        for shard_count in get_evaluation_shard_counts()
+    }
+    if not shards:
+        return []
+    return [
+        evaluation.to_dict()
+        for evaluation in get_latest_evaluations_by(user_id, shards)
+    ]
@@ -1,7 +1,9 @@
 from backend.queries.budget_queries import get_budgets_by
 from backend.queries.transactions_queries import get_category_totals_by
+from backend.tracing import traced
 
 
+@traced("service")
 def create_budget_summary(user_id: str) -> list[dict]:
     """Create a summary of the user's budgets.
 
@@ -1,13 +1,24 @@
-import json
-from typing import Final
+from contextlib import contextmanager
+from typing import Final, Iterator, Sequence
 
 from backend.extensions import redis_cache
+from backend.json_codec import dumps, loads
 from backend.models.user_models import User
 from backend.services.users_services import serialise_user_associations
+from backend.tracing import traced
+from redis.client import Pipeline
 
 CACHE_EXPIRATION: Final[int] = 60 * 30
+GENERATION_KEY_PREFIX: Final[str] = "user_gen:"
+RULES_VERSION_KEY_PREFIX: Final[str] = "category_rules_version:"
+FORECAST_KEY_PREFIX: Final[str] = "forecast:"
+ROLLUP_KEY_PREFIX: Final[str] = "rollup:"
+ROLLUP_EXPIRATION: Final[int] = 60 * 60 * 24
+STATE_GENERATION_FIELD: Final[str] = "generation"
+STATE_EXPIRATION: Final[int] = 60 * 60 * 24
 
 
+@traced("cache")
 def cache_user_with_associations(user: User) -> None:
     """Cache user and their associated data in Redis as a hash.
 
@@ -21,22 +32,20 @@ def cache_user_with_associations(user: User) -> None:
     """
     serialised_user = serialise_user_associations(user)
 
-    print(f"{__name__} - serialised_user = {serialised_user}")
-
     user_data = {
-        "meta": json.dumps(
-            {"id": serialised_user["id"], "alias": serialised_user["alias"]}
-        ),
-        "transactions": json.dumps(serialised_user["transactions"]),
-        "budgets": json.dumps(serialised_user["budgets"]),
+        "meta": dumps({"id": serialised_user["id"], "alias": serialised_user["alias"]}),
+        "transactions": dumps(serialised_user["transactions"]),
+        "budgets": dumps(serialised_user["budgets"]),
     }
 
-    # print(f"{__name__} - caching user_data = {user_data}")
-
-    redis_cache.hset(f"user:{user.id}", mapping=user_data)
-    redis_cache.expire(f"user:{user.id}", CACHE_EXPIRATION)
+    # One round trip for both commands
+    pipeline = redis_cache.pipeline(transaction=False)
+    pipeline.hset(f"user:{user.id}", mapping=user_data)
+    pipeline.expire(f"user:{user.id}", CACHE_EXPIRATION)
+    pipeline.execute()
 
 
+@traced("cache")
 def get_user_cache(user_id: str) -> dict | None:
     """Retrieve user data from Redis and deserialize it."""
     cached_data = redis_cache.hgetall(f"user:{user_id}")
@@ -45,13 +54,198 @@ def get_user_cache(user_id: str) -> dict | None:
         return None
 
     return {
-        "meta": json.loads(cached_data.get("meta", "{}")),
-        "transactions": json.loads(cached_data.get("transactions", "[]")),
-        "budgets": json.loads(cached_data.get("budgets", "[]")),
+        "meta": loads(cached_data.get("meta", "{}")),
+        "transactions": loads(cached_data.get("transactions", "[]")),
+        "budgets": loads(cached_data.get("budgets", "[]")),
     }
 
 
+@traced("cache")
+def get_user_cache_raw(user_id: str) -> dict[str, str] | None:
+    """Retrieve the user's cached hash fields as the JSON they were stored as, undecoded."""
+    return redis_cache.hgetall(f"user:{user_id}") or None
+
+
+@traced("cache")
 def get_user_cache_field(user_id: str, field: str):
     """Fetches a specific field (e.g. transaction, budget) from a user's cached Redis hash."""
     cache_field_data = redis_cache.hget(f"user:{user_id}", field)
-    return json.loads(cache_field_data) if cache_field_data else None
+    return loads(cache_field_data) if cache_field_data else None
+
+
+@traced("cache")
+def get_user_generation(user_id: str) -> int:
+    """Get the generation of a user's data, which changes whenever their data changes.
+
+    Returns:
+        int: The generation, 0 if the user's data has never changed.
+    """
+    return int(redis_cache.get(f"{GENERATION_KEY_PREFIX}{user_id}") or 0)
+
+
+@traced("cache")
+def bump_user_generation(user_id: str) -> int:
+    """Record a change to a user's data, call after committing it.
+
+    Drops the user's cached data and moves their generation on, so every ETag issued for the
+    old data stops matching.
+
+    Returns:
+        int: The new generation.
+    """
+    pipeline = redis_cache.pipeline(transaction=True)
+    pipeline.incr(f"{GENERATION_KEY_PREFIX}{user_id}")
+    pipeline.delete(f"user:{user_id}")
+    generation, _ = pipeline.execute()
+    return generation
+
+
+@traced("cache")
+def get_rules_version(user_id: str) -> int:
+    """Get the version of a user's categorisation rules, which changes whenever they change."""
+    return int(redis_cache.get(f"{RULES_VERSION_KEY_PREFIX}{user_id}") or 0)
+
+
+@traced("cache")
+def bump_rules_version(user_id: str) -> int:
+    """Record a change to a user's categorisation rules, call after committing it.
+
+    Returns:
+        int: The new version.
+    """
+    return redis_cache.incr(f"{RULES_VERSION_KEY_PREFIX}{user_id}")
+
+
+def _forecast_key(user_id: str, generation: int, variant: str) -> str:
+    return f"{FORECAST_KEY_PREFIX}{user_id}:{generation}:{variant}"
+
+
+@traced("cache")
+def get_forecast_cache(user_id: str, generation: int, variant: str) -> dict | None:
+    """Get a forecast cached for a generation of the user's data, None if there isn't one.
+
+    Args:
+        user_id, str: the UUID of the user.
+        generation, int: the user's data generation, see `get_user_generation`.
+        variant, str: what else the forecast depends on, e.g. its start date and length.
+    """
+    cached = redis_cache.get(_forecast_key(user_id, generation, variant))
+    return loads(cached) if cached else None
+
+
+@traced("cache")
+def cache_forecast(user_id: str, generation: int, variant: str, forecast: dict) -> None:
+    """Cache a forecast, see `get_forecast_cache`.
+
+    Later generations use other keys, so forecasts of stale data are never read again and just
+    expire.
+    """
+    redis_cache.set(
+        _forecast_key(user_id, generation, variant),
+        dumps(forecast),
+        ex=CACHE_EXPIRATION,
+    )
+
+
+def _rollup_key(user_id: str, generation: int, month: str) -> str:
+    return f"{ROLLUP_KEY_PREFIX}{user_id}:{generation}:{month}"
+
+
+@traced("cache")
+def get_rollup_cache(user_id: str, generation: int, month: str) -> dict | None:
+    """Get a month's rollup cached for a generation of the user's data, None if there isn't one.
+
+    Args:
+        user_id, str: the UUID of the user.
+        generation, int: the user's data generation, see `get_user_generation`.
+        month, str: the month, YYYY-MM.
+    """
+    cached = redis_cache.get(_rollup_key(user_id, generation, month))
+    return loads(cached) if cached else None
+
+
+@traced("cache")
+def cache_rollup(user_id: str, generation: int, month: str, rollup: dict) -> None:
+    """Cache a month's rollup, see `get_rollup_cache`.
+
+    Rollups are computed by a background job rather than on request, so they are kept longer
+    than other caches.
+    """
+    redis_cache.set(
+        _rollup_key(user_id, generation, month), dumps(rollup), ex=ROLLUP_EXPIRATION
+    )
+
+
+@traced("cache")
+def get_user_state(key: str, generation: int) -> dict[str, str] | None:
+    """Get a hash of state derived from a user's data, see `user_state_pipeline`.
+
+    Returns:
+        dict[str, str] | None: the hash's fields but the generation, None unless it is of
+            `generation`.
+    """
+    stored = redis_cache.hgetall(key)
+    if not stored or stored.pop(STATE_GENERATION_FIELD, None) != str(generation):
+        return None
+    return stored
+
+
+@contextmanager
+def user_state_pipeline(
+    keys: Sequence[str],
+    generation: int,
+    hashes: dict[str, dict[str, str]],
+    replace: bool,
+) -> Iterator[Pipeline]:
+    """Write state derived from a generation of a user's data, in one transaction.
+
+    Such state is updated as the user's data changes rather than derived again, and is only
+    valid for the generation it was written for, see `updatable_user_state`.
+
+    Args:
+        keys, Sequence[str]: every key of the state, the first a hash. They are deleted first
+            if `replace`, and expire after `STATE_EXPIRATION`.
+        generation, int: the user's data generation, see `get_user_generation`.
+        hashes, dict[str, dict[str, str]]: fields to set by key, each hash is also tagged
+            with the generation.
+        replace, bool: whether the state replaces what is stored, rather than updating it.
+
+    Yields:
+        Pipeline: for the caller's own commands, executed after them.
+    """
+    pipeline = redis_cache.pipeline(transaction=True)
+    if replace:
+        pipeline.delete(*keys)
+    for key, fields in hashes.items():
+        pipeline.hset(key, mapping={STATE_GENERATION_FIELD: generation, **fields})
+    yield pipeline
+    for key in keys:
+        pipeline.expire(key, STATE_EXPIRATION)
+    pipeline.execute()
+
+
+@traced("cache")
+def updatable_user_state(keys: Sequence[str], generation: int, dropped: bool) -> bool:
+    """Whether stored state can be updated with the writes which moved the user's data on to
+    `generation`, call after bumping it.
+
+    Only state of the previous generation can, state of an older one missed other changes. It
+    is deleted instead, as it is if the writes were `dropped` by the caller, e.g. for being too
+    many to keep in memory, and derived again from scratch when next read.
+
+    Args:
+        keys, Sequence[str]: every key of the state, the first the hash tagged with its
+            generation, see `user_state_pipeline`.
+        generation, int: the user's data generation after the writes.
+        dropped, bool: whether the caller didn't keep the writes.
+
+    Returns:
+        bool: False if there is no state to update, or it was deleted.
+    """
+    stored = redis_cache.hget(keys[0], STATE_GENERATION_FIELD)
+    if stored is None:
+        return False
+    if dropped or int(stored) != generation - 1:
+        redis_cache.delete(*keys)
+        return False
+    return True
@@ -0,0 +1,226 @@
+"""Categorising transactions by their description with a user's `CategoryRule`s.
+
+Rather than trying every rule against every description, a user's rules are compiled once into
+a `CategoryMatcher` per transaction type:
+
+- keyword rules are merged into a single trie-shaped pattern, scanned with a lookahead so it
+  reports the keyword matching at every position of the description, at a cost set by the
+  keyword length rather than the number of keywords;
+- regex rules are tried one by one in priority order, only while they could still beat the best
+  keyword match.
+
+The rule with the lowest priority among all matches wins.
+
+Compiled matchers are kept per process and rebuilt when the user's rules version (see
+`bump_rules_version`) moves on, so a rule change in one worker reaches every worker.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Final, Iterable, Protocol, Sequence
+
+import redis
+from backend.enums.transaction_enums import TransactionCategory, TransactionType
+from backend.extensions import logger
+from backend.models.category_rule_models import PATTERN_MAX_LENGTH
+from backend.queries.category_rule_queries import get_category_rules_by
+from backend.services.cache_services import get_rules_version
+from backend.tracing import traced
+
+MATCHER_CACHE_SIZE: Final[int] = 256  # users whose compiled rules are kept per process
+
+
+class Rule(Protocol):
+    """The attributes of a `CategoryRule` the matcher is built from."""
+
+    pattern: str
+    is_regex: bool
+    category: TransactionCategory
+    type: TransactionType | None
+
+
+def validate_pattern(pattern: str, is_regex: bool) -> None:
+    """Check a rule's pattern can be compiled into a matcher.
+
+    Raises:
+        ValueError: if it can't, with a message for the user.
+    """
+    if not pattern or not pattern.strip():
+        raise ValueError("pattern is empty")
+    if len(pattern) > PATTERN_MAX_LENGTH:
+        raise ValueError(f"pattern is longer than {PATTERN_MAX_LENGTH} characters")
+    if not is_regex:
+        return
+    try:
+        re.compile(pattern)
+    except re.error as e:
+        raise ValueError(f"invalid regular expression: {e}") from None
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """A regex matching any of `words`, longest first, with shared prefixes factored out."""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def pattern(node: dict) -> str:
+        ends_here = "" in node
+        branches = [
+            re.escape(char) + pattern(child)
+            for char, child in sorted(node.items())
+            if char
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        # Greedy, so the longest keyword at a position is the one matched
+        if ends_here:
+            return f"(?:{body})?"
+        return body
+
+    return pattern(trie)
+
+
+class _TypeMatcher:
+    """The rules applying to one transaction type, compiled.
+
+    Rule indices are positions in priority order, a lower index wins.
+    """
+
+    def __init__(self, rules: Sequence[tuple[int, str, bool]]):
+        keywords: dict[str, int] = {}
+        regexes: list[tuple[int, str]] = []
+        for index, pattern, is_regex in rules:
+            if is_regex:
+                regexes.append((index, pattern))
+            else:
+                keyword = pattern.strip().lower()
+                keywords.setdefault(keyword, index)
+
+        # The keyword pattern only reports the longest keyword at each position, the keywords
+        # which are its prefixes matched there too, so it stands for the best of them
+        self._keyword_rule = {
+            keyword: min(
+                keywords[keyword[:end]]
+                for end in range(1, len(keyword) + 1)
+                if keyword[:end] in keywords
+            )
+            for keyword in keywords
+        }
+        self._keywords = (
+            re.compile(f"(?=({_trie_pattern(keywords)}))") if keywords else None
+        )
+
+        # In priority order, so the first match wins and the rest needn't be tried
+        self._regexes = [
+            (index, re.compile(pattern, re.IGNORECASE))
+            for index, pattern in sorted(regexes)
+        ]
+
+    def best_rule(self, description: str, worst: int) -> int:
+        """The lowest index of the rules matching the lowercased description, else `worst`."""
+        best = worst
+        if self._keywords is not None:
+            for keyword in self._keywords.findall(description):
+                index = self._keyword_rule[keyword]
+                if index < best:
+                    best = index
+        for index, regex in self._regexes:
+            if index >= best:
+                break
+            if regex.search(description):
+                return index
+        return best
+
+
+class CategoryMatcher:
+    """A user's categorisation rules compiled for matching many descriptions.
+
+    Args:
+        rules, Sequence[Rule]: the rules in priority order, e.g. from `get_category_rules_by`.
+            Their patterns must have passed `validate_pattern`.
+    """
+
+    def __init__(self, rules: Sequence[Rule]):
+        self._categories = [rule.category for rule in rules]
+        self._matchers = {
+            type_: _TypeMatcher(
+                [
+                    (index, rule.pattern, rule.is_regex)
+                    for index, rule in enumerate(rules)
+                    if rule.type is None or rule.type == type_
+                ]
+            )
+            for type_ in TransactionType
+        }
+
+    def __len__(self) -> int:
+        return len(self._categories)
+
+    def categorise(
+        self,
+        descriptions: Sequence[str | None],
+        types: Sequence[TransactionType],
+    ) -> list[TransactionCategory | None]:
+        """Categorise a batch of transactions.
+
+        Each distinct (description, type) pair in the batch is only matched once.
+
+        Args:
+            descriptions, Sequence[str | None]: the transactions' descriptions.
+            types, Sequence[TransactionType]: the transactions' types.
+
+        Returns:
+            list[TransactionCategory | None]: the category of the winning rule for each
+                transaction, None where no rule matches.
+        """
+        if not self._categories:
+            return [None] * len(descriptions)
+
+        worst = len(self._categories)
+        seen: dict[tuple[str, TransactionType], TransactionCategory | None] = {}
+        categories = []
+        for description, type_ in zip(descriptions, types):
+            key = ((description or "").lower(), type_)
+            if key not in seen:
+                index = self._matchers[type_].best_rule(key[0], worst)
+                seen[key] = self._categories[index] if index < worst else None
+            categories.append(seen[key])
+        return categories
+
+
+_matchers: "OrderedDict[str, tuple[int, CategoryMatcher]]" = OrderedDict()
+_matchers_lock = threading.Lock()
+
+
+@traced("service")
+def get_matcher(user_id: str) -> CategoryMatcher:
+    """Get the compiled matcher for a user's current rules.
+
+    Compiled matchers are reused while the user's rules version is unchanged. If the version
+    can't be read the rules are loaded and compiled afresh, and not kept.
+    """
+    user_id = str(user_id)
+    try:
+        version = get_rules_version(user_id)
+    except redis.RedisError as e:
+        logger.warning(f"categorisation_services.get_matcher : No rules version: {e}")
+        return CategoryMatcher(get_category_rules_by(user_id))
+
+    with _matchers_lock:
+        cached = _matchers.get(user_id)
+        if cached is not None and cached[0] == version:
+            _matchers.move_to_end(user_id)
+            return cached[1]
+
+    matcher = CategoryMatcher(get_category_rules_by(user_id))
+    with _matchers_lock:
+        _matchers[user_id] = (version, matcher)
+        _matchers.move_to_end(user_id)
+        while len(_matchers) > MATCHER_CACHE_SIZE:
+            _matchers.popitem(last=False)
+    return matcher
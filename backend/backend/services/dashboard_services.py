@@ -1,28 +1,44 @@
-from typing import Dict
+import heapq
+from typing import Dict, Final
 
-from backend.queries.transactions_queries import get_n_user_transactions_ordered
-from backend.services.budget_services import create_budget_summary
-from flask import g
+from backend.tracing import traced
 
+LATEST_TRANSACTIONS_COUNT: Final[int] = 10
+BUDGET_SUMMARY_KEYS: Final[tuple[str, ...]] = (
+    "category",
+    "frequency",
+    "amount",
+    "spent",
+    "remaining",
+)
 
+
+@traced("service")
 def compute_dashboard(user_data: Dict) -> Dict:
-    """Compute and return the required data for displaying on the /dashboard page in a JSON serialisable format."""
-    user_id = g.user_id
+    """Compute and return the required data for displaying on the /dashboard page in a JSON serialisable format.
 
-    latest_transactions = [
-        tx.to_dict() for tx in get_n_user_transactions_ordered(user_id=user_id, N=10)
-    ]
-    incomes_total = sum(
-        income["amount"]
-        for income in user_data["transactions"]
-        if income["type"] == "income"
-    )
-    expenses_total = sum(
-        expense["amount"]
-        for expense in user_data["transactions"]
-        if expense["type"] == "expense"
+    Everything is derived from `user_data` (the cached, or freshly serialised, user with associations)
+    so that a warm dashboard load doesn't touch the database.
+    """
+    transactions = user_data["transactions"]
+
+    latest_transactions = heapq.nlargest(
+        LATEST_TRANSACTIONS_COUNT, transactions, key=lambda tx: tx["date"]
     )
-    budget_summary = create_budget_summary(user_data["meta"]["id"])
+
+    incomes_total = 0
+    expenses_total = 0
+    for transaction in transactions:
+        if transaction["type"] == "income":
+            incomes_total += transaction["amount"]
+        elif transaction["type"] == "expense":
+            expenses_total += transaction["amount"]
+
+    # Serialised budgets already carry their spend, see User.expense_totals()
+    budget_summary = [
+        {key: budget[key] for key in BUDGET_SUMMARY_KEYS}
+        for budget in user_data["budgets"]
+    ]
 
     return {
         "user_alias": user_data["meta"]["alias"],
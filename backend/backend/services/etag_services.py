@@ -0,0 +1,98 @@
+import functools
+import hashlib
+from typing import Callable, Final
+
+import redis
+from backend.compression import (
+    available_encodings,
+    encoded_etag,
+    get_precompressed,
+    negotiate_encoding,
+    precompressed_response,
+)
+from backend.extensions import logger
+from backend.services.cache_services import get_user_generation
+from flask import current_app, g, make_response, request
+
+CACHE_CONTROL: Final[str] = "private, no-cache"
+
+
+def make_etag(user_id: str, generation: int, path: str) -> str:
+    """Derive a strong ETag for a representation of a user's data.
+
+    Args:
+        user_id, str: the UUID of the user.
+        generation, int: the user's data generation, see `get_user_generation`.
+        path, str: the request path and query string, each URL is its own representation.
+
+    Returns:
+        str: the (unquoted) ETag.
+    """
+    return hashlib.blake2b(
+        f"{user_id}:{generation}:{path}".encode(), digest_size=12
+    ).hexdigest()
+
+
+def matching_etag(etag: str) -> str | None:
+    """The tag in the request's If-None-Match matching `etag` in any encoding, if any."""
+    if_none_match = request.if_none_match
+    if if_none_match.star_tag:
+        return etag
+    for tag in [etag] + [encoded_etag(etag, e) for e in available_encodings()]:
+        if if_none_match.contains_weak(tag):
+            return tag
+    return None
+
+
+def conditional_get(f: Callable) -> Callable:
+    """Decorator adding an ETag to a route's responses and answering `If-None-Match`.
+
+    The ETag comes from the user's data generation, so a request whose ETag still matches gets
+    a 304 after a single cache lookup, before the route loads, aggregates or serialises
+    anything. Otherwise a compressed body stored for the ETag (see `backend.compression`) is
+    served if there is one. Must be applied after (below) `@login_required`. If the generation
+    can't be read the route runs as if the request wasn't conditional.
+    """
+
+    @functools.wraps(f)
+    def decorated_function(*args, **kwargs):
+        user_id = g.get("user_id")
+        if user_id is None:
+            return f(*args, **kwargs)
+
+        try:
+            generation = get_user_generation(user_id)
+        except redis.RedisError as e:
+            logger.warning(f"etag_services.conditional_get : No generation: {e}")
+            return f(*args, **kwargs)
+
+        etag = make_etag(str(user_id), generation, request.full_path)
+        matched = matching_etag(etag)
+        if matched is not None:
+            response = current_app.response_class(status=304)
+            response.set_etag(matched)
+            response.headers["Cache-Control"] = CACHE_CONTROL
+            return response
+
+        encoding = negotiate_encoding(request)
+        if encoding is not None:
+            try:
+                body = get_precompressed(etag, encoding)
+            except redis.RedisError as e:
+                logger.warning(f"etag_services.conditional_get : No lookup: {e}")
+                body = None
+            if body is not None:
+                response = precompressed_response(etag, encoding, body)
+                response.headers["Cache-Control"] = CACHE_CONTROL
+                return response
+
+        response = make_response(f(*args, **kwargs))
+        if response.status_code != 200:
+            return response
+
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = CACHE_CONTROL
+        g.precompress_etag = etag
+        return response
+
+    return decorated_function
@@ -0,0 +1,117 @@
+"""Exporting a user's transactions as CSV or JSON Lines, streamed.
+
+Transactions are read in keyset pages (see `get_transactions_after`) and each page is encoded and
+sent before the next is read, so memory use is bounded by the page size however many
+transactions are exported. The session is closed after every page, which returns its
+connection to the pool while the page is being sent: a slow client never holds a database
+connection, and no statement runs for longer than one page takes to read.
+"""
+
+import csv
+import datetime
+import io
+from typing import Callable, Final, Iterator, Sequence
+
+from backend.enums.transaction_enums import TransactionCategory
+from backend.extensions import db
+from backend.json_codec import dumps
+from backend.queries.transactions_queries import get_transactions_after
+
+EXPORT_BATCH_SIZE: Final[int] = 1000
+EXPORT_COLUMNS: Final[tuple[str, ...]] = (
+    "id",
+    "date",
+    "type",
+    "category",
+    "frequency",
+    "amount",
+    "description",
+)
+
+
+def iter_export_batches(
+    user_id: str,
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+    categories: Sequence[TransactionCategory] | None = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[list]:
+    """Yield pages of a user's transaction rows, oldest first, releasing the connection between them.
+
+    Args:
+        user_id, str: the UUID of the user.
+        start, date | None: the earliest date to include.
+        end, date | None: the latest date to include.
+        categories, Sequence[TransactionCategory] | None: only include these categories.
+        batch_size, int: rows per page.
+    """
+    after = None
+    while True:
+        rows = get_transactions_after(
+            user_id,
+            after=after,
+            limit=batch_size,
+            start=start,
+            end=end,
+            categories=categories,
+        )
+        db.session.close()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch_size:
+            return
+        after = (rows[-1].date, rows[-1].id)
+
+
+def _csv_values(row) -> tuple:
+    return (
+        row.id,
+        row.date.isoformat(),
+        row.type.value,
+        row.category.value,
+        row.frequency.value if row.frequency is not None else "",
+        f"{row._amount / 100:.2f}",
+        row.description or "",
+    )
+
+
+def _json_values(row) -> tuple:
+    return (
+        row.id,
+        row.date,
+        row.type,
+        row.category,
+        row.frequency,
+        row._amount / 100,
+        row.description,
+    )
+
+
+def encode_csv(batches: Iterator[list]) -> Iterator[bytes]:
+    """Encode pages of rows as CSV with a header line, one chunk per page."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue().encode()
+
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(_csv_values(row) for row in rows)
+        yield buffer.getvalue().encode()
+
+
+def encode_jsonl(batches: Iterator[list]) -> Iterator[bytes]:
+    """Encode pages of rows as JSON Lines, one object per transaction and one chunk per page."""
+    for rows in batches:
+        yield b"".join(
+            dumps(dict(zip(EXPORT_COLUMNS, _json_values(row)))) + b"\n" for row in rows
+        )
+
+
+# format: (encoder, mimetype, file extension)
+EXPORT_FORMATS: Final[dict[str, tuple[Callable, str, str]]] = {
+    "csv": (encode_csv, "text/csv", "csv"),
+    "jsonl": (encode_jsonl, "application/x-ndjson", "jsonl"),
+}
@@ -0,0 +1,210 @@
+"""Day by day balance forecasts.
+
+A forecast starts from the user's balance today and, for each following day, adds:
+
+- the occurrences of their recurring transactions (those with a `Frequency`, see
+  `backend.recurrence` for the rules), and
+- their average daily discretionary spend, from expenses without a frequency over the last
+  `HISTORY_DAYS`, per category.
+
+The calculation runs on NumPy arrays in integer pence over the forecast's days. The history is
+only read as aggregates computed in SQL, so the cost hardly depends on how many transactions
+the user has.
+"""
+
+import datetime
+from typing import Final, Sequence
+
+import numpy as np
+import redis
+from backend.enums.frequency_enums import Frequency
+from backend.enums.transaction_enums import TransactionType
+from backend.extensions import logger
+from backend.queries.transactions_queries import (
+    get_balance_by,
+    get_discretionary_totals_by,
+    get_recurring_transactions_by,
+)
+from backend.recurrence import DAY_STEPS, MONTH_STEPS, Amounted, nth_occurrence
+from backend.services.cache_services import (
+    cache_forecast,
+    get_forecast_cache,
+    get_user_generation,
+)
+from backend.tracing import traced
+
+FORECAST_DEFAULT_MONTHS: Final[int] = 12
+FORECAST_MAX_MONTHS: Final[int] = 60
+HISTORY_DAYS: Final[int] = 365  # of discretionary spend averaged
+
+
+def _repeat_ranges(first: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """For each item, `counts` consecutive integers from `first`, concatenated."""
+    total = int(counts.sum())
+    offsets = np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(first, counts) + np.arange(total) - offsets
+
+
+def _day_step_deltas(
+    offsets: np.ndarray, amounts: np.ndarray, step: int, days: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """(day, pence) of every occurrence in the forecast of items recurring every `step` days.
+
+    Args:
+        offsets: days from the forecast's first day to each item's first occurrence.
+        amounts: each item's amount in pence.
+    """
+    first = np.maximum(0, -(offsets // step))
+    counts = np.maximum(0, (days - 1 - offsets) // step - first + 1)
+    n = _repeat_ranges(first, counts)
+    return np.repeat(offsets, counts) + n * step, np.repeat(amounts, counts)
+
+
+def _month_step_deltas(
+    dates: np.ndarray, amounts: np.ndarray, step: int, start: np.datetime64, days: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """(day, pence) of every occurrence in the forecast of items recurring every `step` months.
+
+    Each occurrence keeps the first one's day of the month, clamped to the month's length.
+    """
+    months = dates.astype("datetime64[M]")
+    anchor_days = (dates - months.astype("datetime64[D]")).astype(np.int64)
+    anchor_months = months.astype(np.int64)
+    first_month = start.astype("datetime64[M]").astype(np.int64)
+    last_month = (
+        (start + np.timedelta64(days - 1, "D")).astype("datetime64[M]").astype(np.int64)
+    )
+
+    first = np.maximum(0, -((anchor_months - first_month) // step))
+    counts = np.maximum(0, (last_month - anchor_months) // step - first + 1)
+    n = _repeat_ranges(first, counts)
+    occurrence_months = (np.repeat(anchor_months, counts) + n * step).astype(
+        "datetime64[M]"
+    )
+    month_starts = occurrence_months.astype("datetime64[D]")
+    month_lengths = (
+        (occurrence_months + np.timedelta64(1, "M")).astype("datetime64[D]")
+        - month_starts
+    ).astype(np.int64)
+    occurrences = month_starts + np.minimum(
+        np.repeat(anchor_days, counts), month_lengths - 1
+    )
+    positions = (occurrences - start).astype(np.int64)
+    # The first and last months are only partly in the forecast
+    inside = (positions >= 0) & (positions < days)
+    return positions[inside], np.repeat(amounts, counts)[inside]
+
+
+def recurring_deltas(
+    transactions: Sequence[Amounted], start: datetime.date, days: int
+) -> np.ndarray:
+    """The pence of recurring transactions falling on each day of the forecast.
+
+    Args:
+        transactions, Sequence[Amounted]: rows from `get_recurring_transactions_by`.
+        start, date: the forecast's first day.
+        days, int: the number of days forecast.
+
+    Returns:
+        np.ndarray: int64 pence per day, the total of the amounts (unsigned) that day.
+    """
+    by_frequency: dict[Frequency, list[Amounted]] = {}
+    for row in transactions:
+        by_frequency.setdefault(row.frequency, []).append(row)
+
+    deltas = np.zeros(days, dtype=np.int64)
+    start64 = np.datetime64(start, "D")
+    for frequency, rows in by_frequency.items():
+        dates = np.array([row.date for row in rows], dtype="datetime64[D]")
+        amounts = np.array([row._amount for row in rows], dtype=np.int64)
+        if frequency in DAY_STEPS:
+            positions, pence = _day_step_deltas(
+                (dates - start64).astype(np.int64), amounts, DAY_STEPS[frequency], days
+            )
+        else:
+            positions, pence = _month_step_deltas(
+                dates, amounts, MONTH_STEPS[frequency], start64, days
+            )
+        np.add.at(deltas, positions, pence)
+    return deltas
+
+
+@traced("service")
+def compute_forecast(user_id: str, months: int, today: datetime.date) -> dict:
+    """Forecast a user's balance for each day of the `months` after `today`.
+
+    Returns:
+        dict: the forecast, amounts in pounds:
+            - start, end: the first and last days forecast;
+            - opening_balance: the balance at the end of `today`;
+            - balance: the balance at the end of each day from `start` to `end`;
+            - recurring: {"income": total, "expense": total} of recurring transactions;
+            - discretionary: {category: total} of the projected discretionary spend.
+    """
+    start = today + datetime.timedelta(days=1)
+    end = nth_occurrence(today, Frequency.MONTHLY, months)
+    days = (end - today).days
+
+    opening_balance = get_balance_by(user_id, today)
+    recurring = get_recurring_transactions_by(user_id)
+    incomes = recurring_deltas(
+        [row for row in recurring if row.type == TransactionType.INCOME], start, days
+    )
+    expenses = recurring_deltas(
+        [row for row in recurring if row.type == TransactionType.EXPENSE], start, days
+    )
+
+    history_start = today - datetime.timedelta(days=HISTORY_DAYS - 1)
+    discretionary = get_discretionary_totals_by(user_id, history_start, today)
+    spend = {category: total for category, total, _ in discretionary}
+    # Average over the history there is, for users with less than HISTORY_DAYS of it
+    history_days = (
+        (today - min(earliest for _, _, earliest in discretionary)).days + 1
+        if discretionary
+        else HISTORY_DAYS
+    )
+    # Cumulative, in whole pence, so the rounding doesn't drift over long forecasts
+    discretionary_spend = (
+        np.arange(1, days + 1, dtype=np.int64) * sum(spend.values()) // history_days
+    )
+
+    balance = opening_balance + np.cumsum(incomes - expenses) - discretionary_spend
+    return {
+        "start": start,
+        "end": end,
+        "opening_balance": opening_balance / 100,
+        "balance": (balance / 100).tolist(),
+        "recurring": {
+            "income": int(incomes.sum()) / 100,
+            "expense": int(expenses.sum()) / 100,
+        },
+        "discretionary": {
+            category.value: total * days // history_days / 100
+            for category, total in sorted(spend.items(), key=lambda item: item[0].value)
+        },
+    }
+
+
+@traced("service")
+def get_forecast(user_id: str, months: int, today: datetime.date | None = None) -> dict:
+    """Get a user's balance forecast, see `compute_forecast`, cached per data generation.
+
+    If the cache is unavailable the forecast is computed without it.
+    """
+    today = today or datetime.date.today()
+    variant = f"{today.isoformat()}:{months}"
+    try:
+        generation = get_user_generation(user_id)
+        cached = get_forecast_cache(user_id, generation, variant)
+    except redis.RedisError as e:
+        logger.warning(f"forecast_services.get_forecast : No cache: {e}")
+        return compute_forecast(user_id, months, today)
+    if cached is not None:
+        return cached
+
+    forecast = compute_forecast(user_id, months, today)
+    try:
+        cache_forecast(user_id, generation, variant, forecast)
+    except redis.RedisError as e:
+        logger.warning(f"forecast_services.get_forecast : Not cached: {e}")
+    return forecast
@@ -0,0 +1,320 @@
+import datetime
+import uuid
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import Final, Iterator, TextIO
+
+import redis
+from backend.enums.frequency_enums import Frequency
+from backend.enums.transaction_enums import TransactionCategory, TransactionType
+from backend.extensions import db, logger
+from backend.models.transaction_models import Fingerprinter, Transaction
+from backend.services.anomaly_services import NewExpenses, record_new_expenses
+from backend.services.cache_services import bump_user_generation
+from backend.services.categorisation_services import CategoryMatcher, get_matcher
+from backend.services.recurring_services import (
+    NewTransactions,
+    record_new_transactions,
+)
+from backend.statement_parsers import PARSERS, StatementRow
+from backend.tracing import traced
+from sqlalchemy import Insert
+from sqlalchemy.dialects import postgresql, sqlite
+
+IMPORT_BATCH_SIZE: Final[int] = 5000
+MAX_REPORTED_ERRORS: Final[int] = 50
+DESCRIPTION_MAX_LENGTH: Final[int] = 100  # Transaction.description is String(100)
+# Tried in order after ISO dates, statements from UK banks are day first
+DATE_FORMATS: Final[tuple[str, ...]] = ("%d/%m/%Y", "%d/%m/%y", "%d-%m-%Y", "%d %b %Y")
+OFX_DATE_FORMAT: Final[str] = "%Y%m%d"
+
+_CATEGORIES: Final[dict[str, TransactionCategory]] = {
+    key.lower(): category
+    for category in TransactionCategory
+    for key in (category.name, category.value)
+}
+_TYPES: Final[dict[str, TransactionType]] = {
+    key.lower(): type_ for type_ in TransactionType for key in (type_.name, type_.value)
+}
+_FREQUENCIES: Final[dict[str, Frequency]] = {
+    key.lower(): frequency
+    for frequency in Frequency
+    for key in (frequency.name, frequency.value)
+}
+
+
+@dataclass
+class ImportResult:
+    """The outcome of an import.
+
+    Attributes:
+        imported: Transactions inserted.
+        duplicates: Rows skipped because the user already has the transaction.
+        invalid: Rows skipped because they failed validation.
+        errors: (row, message) for the first `MAX_REPORTED_ERRORS` invalid rows.
+    """
+
+    imported: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    errors: list[tuple[int, str]] = field(default_factory=list)
+
+    def record_error(self, row: int, message: str) -> None:
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row, message))
+
+    def to_dict(self) -> dict:
+        return {
+            "imported": self.imported,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "errors": [
+                {"row": row, "message": message} for row, message in self.errors
+            ],
+        }
+
+
+def parse_category(value: str) -> TransactionCategory:
+    """A category from its value or name, in any case, e.g. "Rent" or "RENT"."""
+    try:
+        return _CATEGORIES[value.strip().lower()]
+    except KeyError:
+        raise ValueError(f"unknown category {value!r}") from None
+
+
+def _parse_date(value: str) -> datetime.date:
+    value = value.strip()
+    formats = (OFX_DATE_FORMAT,) if value.isdigit() else DATE_FORMATS
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        pass
+    for date_format in formats:
+        try:
+            return datetime.datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f"invalid date {value!r}")
+
+
+def _parse_pence(value: str) -> int:
+    """Signed pence from an amount such as "-1,234.50", "£12" or "(3.20)"."""
+    text = value.strip().replace(",", "").replace("£", "").replace(" ", "")
+    if text.startswith("(") and text.endswith(")"):
+        text = "-" + text[1:-1]
+    try:
+        pence = Decimal(text) * 100
+    except InvalidOperation:
+        raise ValueError(f"invalid amount {value!r}") from None
+    if not pence.is_finite() or pence != pence.to_integral_value():
+        raise ValueError(f"invalid amount {value!r}")
+    return int(pence)
+
+
+def validate_row(row: StatementRow) -> dict:
+    """Convert a statement row into `Transaction` column values.
+
+    The type is taken from the row if it has one, otherwise from the sign of the amount.
+
+    Args:
+        row, StatementRow: the row as parsed.
+
+    Returns:
+        dict: the `transaction` table's columns, without `user_id`. `amount` is in pence, and
+            `category` is None if the row has none.
+
+    Raises:
+        ValueError: if the row is invalid, with a message for the user.
+    """
+    date = _parse_date(row.date)
+    pence = _parse_pence(row.amount)
+    if pence == 0:
+        raise ValueError("amount is zero")
+
+    if row.type:
+        try:
+            type_ = _TYPES[row.type.strip().lower()]
+        except KeyError:
+            raise ValueError(f"unknown type {row.type!r}") from None
+    else:
+        type_ = TransactionType.EXPENSE if pence < 0 else TransactionType.INCOME
+
+    category = parse_category(row.category) if row.category else None
+
+    frequency = None
+    if row.frequency:
+        try:
+            frequency = _FREQUENCIES[row.frequency.strip().lower()]
+        except KeyError:
+            raise ValueError(f"unknown frequency {row.frequency!r}") from None
+
+    description = (row.description or "").strip()[:DESCRIPTION_MAX_LENGTH] or None
+    return {
+        "id": uuid.uuid4(),
+        "type": type_,
+        "category": category,
+        "date": date,
+        "frequency": frequency,
+        "amount": abs(pence),
+        "description": description,
+    }
+
+
+def _categorise(
+    pending: list[tuple[int, dict]],
+    matcher: CategoryMatcher,
+    default_categories: dict[TransactionType, TransactionCategory],
+    result: ImportResult,
+) -> list[dict]:
+    """Fill in the categories of a batch, from the user's rules and then the defaults.
+
+    Rows left without a category are dropped and reported.
+    """
+    uncategorised = [values for _, values in pending if values["category"] is None]
+    if uncategorised and len(matcher):
+        categories = matcher.categorise(
+            [values["description"] for values in uncategorised],
+            [values["type"] for values in uncategorised],
+        )
+        for values, category in zip(uncategorised, categories):
+            values["category"] = category
+
+    batch = []
+    for row, values in pending:
+        if values["category"] is None:
+            values["category"] = default_categories.get(values["type"])
+        if values["category"] is None:
+            result.record_error(
+                row, f"no category, and no default for {values['type'].value}"
+            )
+            continue
+        batch.append(values)
+    return batch
+
+
+def _batches(
+    rows: Iterator[StatementRow],
+    user_id: uuid.UUID,
+    matcher: CategoryMatcher,
+    default_categories: dict[TransactionType, TransactionCategory],
+    result: ImportResult,
+    batch_size: int,
+) -> Iterator[list[dict]]:
+    pending: list[tuple[int, dict]] = []
+    fingerprint = Fingerprinter(user_id)
+    for row in rows:
+        try:
+            values = validate_row(row)
+        except ValueError as e:
+            result.record_error(row.row, str(e))
+            continue
+
+        values["user_id"] = user_id
+        values["fingerprint"] = fingerprint(
+            values["type"], values["date"], values["amount"], values["description"]
+        )
+        pending.append((row.row, values))
+        if len(pending) >= batch_size:
+            yield _categorise(pending, matcher, default_categories, result)
+            pending = []
+    if pending:
+        yield _categorise(pending, matcher, default_categories, result)
+
+
+def _insert_skipping_duplicates(dialect_name: str) -> Insert:
+    """INSERT into `transaction` which skips rows whose fingerprint the user already has.
+
+    Duplicates are left to the unique (user_id, fingerprint) index, rather than checked for
+    row by row. The inserted ids are returned, to count them.
+    """
+    table = Transaction.__table__
+    dialect_insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}[
+        dialect_name
+    ]
+    return (
+        dialect_insert(table)
+        .on_conflict_do_nothing(
+            index_elements=[table.c.user_id, table.c.fingerprint],
+            index_where=table.c.fingerprint.isnot(None),
+        )
+        .returning(table.c.id)
+    )
+
+
+@traced("service")
+def import_transactions(
+    user_id: str,
+    stream: TextIO,
+    statement_format: str,
+    default_categories: dict[TransactionType, TransactionCategory] | None = None,
+    batch_size: int = IMPORT_BATCH_SIZE,
+) -> ImportResult:
+    """Import the transactions in a bank statement for a user.
+
+    The statement is parsed as it is read, and valid rows are inserted `batch_size` at a time,
+    all in one database transaction: either every valid row is imported or none are. Invalid
+    rows are skipped and reported in the result, as are transactions the user already has,
+    e.g. from an overlapping statement (see `transaction_fingerprint`). The user's data
+    generation is bumped once, after the commit, and the imported transactions are added to
+    their stored recurring payment groups and category statistics (see
+    `record_new_transactions` and `record_new_expenses`).
+
+    Args:
+        user_id, str: the UUID of the user.
+        stream, TextIO: the statement.
+        statement_format, str: a key of `backend.statement_parsers.PARSERS`, e.g. "csv".
+        default_categories, dict | None: categories by type for rows without one which none
+            of the user's `CategoryRule`s match.
+        batch_size, int: rows per INSERT.
+
+    Returns:
+        ImportResult: counts of imported and invalid rows.
+
+    Raises:
+        ValueError: if the format is unknown or the file can't be parsed at all.
+        SQLAlchemyError: if the insert fails, nothing is imported.
+    """
+    parser = PARSERS.get(statement_format)
+    if parser is None:
+        raise ValueError(f"Unsupported statement format {statement_format!r}")
+
+    user_uuid = user_id if isinstance(user_id, uuid.UUID) else uuid.UUID(user_id)
+    result = ImportResult()
+    new_transactions, new_expenses = NewTransactions(), NewExpenses()
+    try:
+        statement = _insert_skipping_duplicates(db.session.get_bind().dialect.name)
+        matcher = get_matcher(str(user_uuid))
+        for batch in _batches(
+            parser(stream),
+            user_uuid,
+            matcher,
+            default_categories or {},
+            result,
+            batch_size,
+        ):
+            if not batch:
+                continue
+            # Core rather than ORM bulk insert, the rows are already column values
+            inserted = {row.id for row in db.session.execute(statement, batch)}
+            result.imported += len(inserted)
+            result.duplicates += len(batch) - len(inserted)
+            for values in batch:
+                if values["id"] in inserted:
+                    new_transactions.add(values)
+                    new_expenses.add(values)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if result.imported:
+        try:
+            generation = bump_user_generation(str(user_uuid))
+            record_new_transactions(str(user_uuid), new_transactions, generation)
+            record_new_expenses(str(user_uuid), new_expenses, generation)
+        except redis.RedisError as e:
+            logger.warning(
+                f"import_services.import_transactions : Caches not updated: {e}"
+            )
+    return result
@@ -0,0 +1,26 @@
+"""The background jobs, queued with `backend.jobs.enqueue` and run by workers."""
+
+from backend.jobs import job
+from backend.services.cache_services import (
+    cache_rollup,
+    cache_user_with_associations,
+    get_user_generation,
+)
+from backend.services.rollup_services import compute_rollup
+from backend.services.users_services import get_user_with_associations
+
+
+@job
+def rebuild_user_cache(user_id: str) -> None:
+    """Cache a user and their associated data, so the next request doesn't have to."""
+    user = get_user_with_associations(user_id)
+    if user is not None:
+        cache_user_with_associations(user)
+
+
+@job
+def recompute_rollup(user_id: str, month: str) -> None:
+    """Compute and cache a user's rollup of a YYYY-MM month, see `rollup_services`."""
+    # Read first, so a rollup of data changed meanwhile is cached for the old generation
+    generation = get_user_generation(user_id)
+    cache_rollup(user_id, generation, month, compute_rollup(user_id, month))
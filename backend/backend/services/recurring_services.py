@@ -0,0 +1,322 @@
+"""Detecting likely subscriptions and bills in a user's transaction history.
+
+Transactions without a frequency are grouped by type and description, ignoring the card and
+reference numbers which change from one payment to the next (see `group_description`). A group
+recurs when its dates are evenly spaced at one of the `Frequency` intervals and its amounts are
+similar. A full scan ranks each description's transactions by date in SQL, one sort,
+O(n log n), then looks at each group's consecutive intervals.
+
+Only the last `GROUP_POINTS` (date, amount) points of each group are needed to judge it, so
+they are all that is kept, in Redis, along with the detections (see
+`cache_services.user_state_pipeline`). When transactions are imported just the groups they fall
+in are updated (see `record_new_transactions`), and the whole history is only scanned again if
+that state is missing, behind the user's data generation, or dropped by an import touching more
+than `MAX_NEW_GROUPS` groups.
+"""
+
+import bisect
+import datetime
+import operator
+import re
+import statistics
+from typing import Final, Iterable
+
+import redis
+from backend.enums.frequency_enums import Frequency
+from backend.enums.transaction_enums import TransactionType
+from backend.extensions import logger, redis_cache
+from backend.json_codec import dumps, loads
+from backend.queries.transactions_queries import get_latest_by_description
+from backend.recurrence import nth_occurrence
+from backend.services.cache_services import (
+    get_user_generation,
+    get_user_state,
+    updatable_user_state,
+    user_state_pipeline,
+)
+from backend.tracing import traced
+
+GROUP_POINTS: Final[int] = 12
+MIN_OCCURRENCES: Final[int] = 3
+# Share of a group's intervals, and of its amounts, which must fit the pattern
+MIN_REGULARITY: Final[float] = 0.75
+AMOUNT_TOLERANCE: Final[float] = 0.2  # relative to the median amount
+# Accepted gaps in days between occurrences, first match wins
+INTERVALS: Final[tuple[tuple[Frequency, int, int], ...]] = (
+    (Frequency.DAILY, 1, 1),
+    (Frequency.WEEKLY, 6, 8),
+    (Frequency.BI_WEEKLY, 13, 15),
+    (Frequency.FOUR_WEEKLY, 28, 28),
+    (Frequency.MONTHLY, 27, 33),
+    (Frequency.ANNUALLY, 358, 372),
+)
+GROUPS_KEY_PREFIX: Final[str] = "recurring_groups:"
+FOUND_KEY_PREFIX: Final[str] = "recurring_found:"
+# Groups a write may touch and still update the stored state, see `NewTransactions`
+MAX_NEW_GROUPS: Final[int] = 1000
+_TOKENS: Final[re.Pattern] = re.compile(r"[^\W_]+")
+_DIGITS: Final[re.Pattern] = re.compile(r"\d+")
+
+
+def group_description(description: str | None) -> str:
+    """Casefold and drop punctuation, spacing and words with digits in them, which are
+    usually card or reference numbers, e.g. "NETFLIX.COM 8231" -> "netflixcom".
+
+    Payments whose references change each time still fall in one group, whereas
+    `normalise_description` keeps the numbers for fingerprints. A description with nothing
+    but such words has just its digits dropped, "O2" -> "o".
+    """
+    tokens = _TOKENS.findall((description or "").casefold())
+    words = [token for token in tokens if not _DIGITS.search(token)]
+    return "".join(words) if words else _DIGITS.sub("", "".join(tokens))
+
+
+def group_key(transaction_type: TransactionType, description: str | None) -> str | None:
+    """The group of a transaction, None if its description can't be grouped."""
+    normalised = group_description(description)
+    if not normalised:
+        return None
+    return f"{transaction_type.value}|{normalised}"
+
+
+def new_group(transaction_type: str, description: str, category: str) -> dict:
+    """An empty group's state, `merge_points` adds to it."""
+    return {
+        "type": transaction_type,
+        "description": description,
+        "category": category,
+        "count": 0,
+        "points": [],
+    }
+
+
+def merge_points(
+    group: dict, points: Iterable[tuple[str, int]], description: str, category: str
+) -> None:
+    """Add (ISO date, pence) points to a group, keeping its latest `GROUP_POINTS`.
+
+    The description and category shown for the group follow its latest transaction.
+    """
+    points = list(points)
+    latest = group["points"][-1][0] if group["points"] else ""
+    for point in points:
+        bisect.insort(group["points"], list(point))
+    del group["points"][:-GROUP_POINTS]
+    group["count"] += len(points)
+    if max(point[0] for point in points) >= latest:
+        group["description"], group["category"] = description, category
+
+
+def _classify(dates: list[datetime.date]) -> Frequency | None:
+    """The frequency most of the gaps between distinct, sorted dates fit, if any."""
+    intervals = [(b - a).days for a, b in zip(dates, dates[1:])]
+    if len(intervals) < MIN_OCCURRENCES - 1:
+        return None
+    median = statistics.median(intervals)
+    for frequency, shortest, longest in INTERVALS:
+        if not shortest <= median <= longest:
+            continue
+        regular = sum(shortest <= interval <= longest for interval in intervals)
+        if regular >= MIN_REGULARITY * len(intervals):
+            return frequency
+    return None
+
+
+def detect(group: dict) -> dict | None:
+    """The recurring payment a group's points suggest, None if they don't look recurring.
+
+    Returns:
+        dict: description, type, category, the suggested frequency, the typical amount in
+            pounds, the number of occurrences seen, and the last and next expected dates.
+    """
+    dates = sorted({datetime.date.fromisoformat(date) for date, _ in group["points"]})
+    frequency = _classify(dates)
+    if frequency is None:
+        return None
+
+    amounts = [pence for _, pence in group["points"]]
+    median = statistics.median(amounts)
+    similar = sum(abs(pence - median) <= AMOUNT_TOLERANCE * median for pence in amounts)
+    if similar < MIN_REGULARITY * len(amounts):
+        return None
+
+    return {
+        "description": group["description"],
+        "type": group["type"],
+        "category": group["category"],
+        "frequency": frequency.value,
+        "amount": round(median) / 100,
+        "occurrences": group["count"],
+        "last_date": dates[-1].isoformat(),
+        "next_date": nth_occurrence(dates[-1], frequency, 1).isoformat(),
+    }
+
+
+def scan_history(rows: Iterable) -> dict[str, dict]:
+    """Group a history from scratch.
+
+    Descriptions normalising to the same group are merged, the latest `GROUP_POINTS` of a
+    group being among the latest `GROUP_POINTS` of its descriptions.
+
+    Args:
+        rows, Iterable: rows from `get_latest_by_description`.
+
+    Returns:
+        dict[str, dict]: each group's state by `group_key`.
+    """
+    buckets: dict[str, list] = {}
+    counts: dict[str, int] = {}
+    for row in rows:
+        key = group_key(row.type, row.description)
+        if key is None:
+            continue
+        buckets.setdefault(key, []).append(row)
+        if row.rank == 1:
+            counts[key] = counts.get(key, 0) + row.total
+
+    groups: dict[str, dict] = {}
+    for key, bucket in buckets.items():
+        bucket.sort(key=operator.attrgetter("date"))
+        latest = bucket[-1]
+        group = groups[key] = new_group(
+            latest.type.value, latest.description, latest.category.value
+        )
+        group["count"] = counts[key]
+        group["points"] = [
+            [row.date.isoformat(), row._amount] for row in bucket[-GROUP_POINTS:]
+        ]
+    return groups
+
+
+def _scan(user_id: str) -> dict[str, dict]:
+    return scan_history(get_latest_by_description(user_id, GROUP_POINTS))
+
+
+def _keys(user_id: str) -> tuple[str, str]:
+    return f"{GROUPS_KEY_PREFIX}{user_id}", f"{FOUND_KEY_PREFIX}{user_id}"
+
+
+@traced("cache")
+def _store(
+    user_id: str,
+    generation: int,
+    groups: dict[str, dict],
+    found: dict[str, dict | None],
+    replace: bool,
+) -> None:
+    """Write groups' states and detections for a generation, in one transaction."""
+    groups_key, found_key = keys = _keys(user_id)
+    hashes = {
+        groups_key: {key: dumps(group) for key, group in groups.items()},
+        found_key: {
+            key: dumps(value) for key, value in found.items() if value is not None
+        },
+    }
+    with user_state_pipeline(keys, generation, hashes, replace) as pipeline:
+        lost = [key for key, value in found.items() if value is None]
+        if lost and not replace:
+            pipeline.hdel(found_key, *lost)
+
+
+def _sorted(found: Iterable[dict]) -> list[dict]:
+    return sorted(found, key=lambda item: (-item["amount"], item["description"]))
+
+
+@traced("service")
+def get_recurring_payments(user_id: str) -> list[dict]:
+    """Get the likely recurring payments in a user's history, see `detect`, largest first.
+
+    Served from the stored detections while they are of the user's current data generation,
+    otherwise the history is scanned again and they are replaced.
+    """
+    user_id = str(user_id)
+    _, found_key = _keys(user_id)
+    try:
+        generation = get_user_generation(user_id)
+        found = get_user_state(found_key, generation)
+    except redis.RedisError as e:
+        logger.warning(f"recurring_services.get_recurring_payments : No cache: {e}")
+        groups = _scan(user_id)
+        return _sorted(filter(None, map(detect, groups.values())))
+
+    if found is not None:
+        return _sorted(map(loads, found.values()))
+
+    groups = _scan(user_id)
+    found = {key: detect(group) for key, group in groups.items()}
+    try:
+        _store(user_id, generation, groups, found, replace=True)
+    except redis.RedisError as e:
+        logger.warning(f"recurring_services.get_recurring_payments : Not stored: {e}")
+    return _sorted(filter(None, found.values()))
+
+
+class NewTransactions:
+    """The points of newly written transactions per group, see `record_new_transactions`.
+
+    Only the latest `GROUP_POINTS` per group are kept, however many are added. Once more than
+    `MAX_NEW_GROUPS` groups are touched none are kept, so that large imports take bounded
+    memory, and the stored state is dropped instead.
+    """
+
+    def __init__(self):
+        self.groups: dict[str, dict] = {}
+        self.overflowed = False
+
+    def add(self, values: dict) -> None:
+        """Add a transaction's column values, as inserted into the `transaction` table."""
+        if self.overflowed or values.get("frequency") is not None:
+            return
+        key = group_key(values["type"], values["description"])
+        if key is None:
+            return
+        group = self.groups.get(key)
+        if group is None:
+            if len(self.groups) >= MAX_NEW_GROUPS:
+                self.overflowed = True
+                self.groups = {}
+                return
+            group = self.groups[key] = new_group(
+                values["type"].value, values["description"], values["category"].value
+            )
+        merge_points(
+            group,
+            [(values["date"].isoformat(), values["amount"])],
+            values["description"],
+            values["category"].value,
+        )
+
+    def __bool__(self) -> bool:
+        return self.overflowed or bool(self.groups)
+
+
+@traced("cache")
+def record_new_transactions(
+    user_id: str, new: NewTransactions, generation: int
+) -> None:
+    """Update the stored groups with newly written transactions, call after bumping the
+    user's data generation to `generation`.
+
+    Only the groups the new transactions fall in are read and written. If the stored state
+    isn't of the previous generation, i.e. it missed other changes, or the new transactions
+    touched too many groups to keep, it is dropped instead, and the next
+    `get_recurring_payments` scans the history again.
+    """
+    if not new:
+        return
+    user_id = str(user_id)
+    if not updatable_user_state(_keys(user_id), generation, dropped=new.overflowed):
+        return
+
+    groups_key, _ = _keys(user_id)
+    keys = list(new.groups)
+    updated = {}
+    for key, state in zip(keys, redis_cache.hmget(groups_key, keys)):
+        delta = new.groups[key]
+        group = loads(state) if state else new_group(delta["type"], "", "")
+        merge_points(group, delta["points"], delta["description"], delta["category"])
+        # Points beyond the delta's own latest GROUP_POINTS weren't kept, count them too
+        group["count"] += delta["count"] - len(delta["points"])
+        updated[key] = group
+    found = {key: detect(group) for key, group in updated.items()}
+    _store(user_id, generation, updated, found, replace=False)
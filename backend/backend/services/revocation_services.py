@@ -0,0 +1,119 @@
+"""Revocation list for issued JWTs, keyed by the token's `jti` claim.
+
+Revoked `jti`s are stored in Redis with a TTL equal to the remaining lifetime of the token, so the
+list never grows beyond the set of tokens that could still be presented. Because every authenticated
+request has to consult the list, lookups go through a small in-process cache first:
+
+- Revocations are permanent for the life of a token, so a positive answer is cached until the token
+  would have expired anyway.
+- A negative answer ("not revoked") is only cached for `NEGATIVE_CACHE_TTL` seconds. This bounds how
+  long a token revoked by *another* worker can still be used by this one, while letting the common
+  case (the same token presented repeatedly) skip the Redis round trip entirely.
+"""
+
+import time
+from typing import Final
+
+import redis
+from backend.extensions import logger, redis_cache
+from backend.tracing import traced
+
+REVOKED_KEY_PREFIX: Final[str] = "revoked:"
+NEGATIVE_CACHE_TTL: Final[float] = 2.0
+LOCAL_CACHE_MAX_ENTRIES: Final[int] = 10_000
+
+
+class RevocationList:
+    """A Redis-backed set of revoked token ids with an in-process read-through cache.
+
+    Attributes:
+        client: The Redis client holding the shared revocation list.
+        negative_ttl: Seconds for which a "not revoked" answer is trusted locally.
+        max_entries: Upper bound on each of the local caches.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        negative_ttl: float = NEGATIVE_CACHE_TTL,
+        max_entries: int = LOCAL_CACHE_MAX_ENTRIES,
+    ):
+        self.client = client
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._not_revoked: dict[str, float] = (
+            {}
+        )  # jti -> monotonic time the answer goes stale
+        self._revoked: dict[str, float] = {}  # jti -> wall clock expiry of the token
+
+    def revoke(self, jti: str, expires_at: int) -> None:
+        """Revoke a token id until `expires_at` (a unix timestamp, i.e. the token's `exp`).
+
+        Tokens which have already expired are ignored as they are rejected by signature
+        verification anyway.
+        """
+        ttl = int(expires_at - time.time())
+        if ttl <= 0:
+            return
+
+        self.client.set(f"{REVOKED_KEY_PREFIX}{jti}", 1, ex=ttl)
+        self._not_revoked.pop(jti, None)
+        self._remember(self._revoked, jti, expires_at)
+
+    def is_revoked(self, jti: str, expires_at: int) -> bool:
+        """True if the token id has been revoked.
+
+        `expires_at` is the token's `exp`, used to cache a positive answer for as long as it can
+        matter.
+
+        Fails open if Redis is unavailable: the token has already passed signature and expiry
+        checks, and refusing every authenticated request during a cache outage is worse than
+        briefly honouring a logged out token. The failure is logged and not cached.
+        """
+        revoked_until = self._revoked.get(jti)
+        if revoked_until is not None:
+            if revoked_until > time.time():
+                return True
+            del self._revoked[jti]
+
+        stale_at = self._not_revoked.get(jti)
+        now = time.monotonic()
+        if stale_at is not None and stale_at > now:
+            return False
+
+        try:
+            revoked = bool(self.client.exists(f"{REVOKED_KEY_PREFIX}{jti}"))
+        except redis.RedisError as e:
+            logger.warning(f"revocation_services.is_revoked : Redis unavailable: {e}")
+            return False
+
+        if revoked:
+            self._remember(self._revoked, jti, expires_at)
+        else:
+            self._remember(self._not_revoked, jti, now + self.negative_ttl)
+        return revoked
+
+    def clear_local_cache(self) -> None:
+        """Drop everything cached in-process, e.g. after forking a worker."""
+        self._not_revoked.clear()
+        self._revoked.clear()
+
+    def _remember(self, cache: dict[str, float], jti: str, until: float) -> None:
+        if len(cache) >= self.max_entries:
+            # Dicts keep insertion order, so this evicts the oldest entry
+            del cache[next(iter(cache))]
+        cache[jti] = until
+
+
+revocation_list = RevocationList(redis_cache)
+
+
+def revoke_jti(jti: str, expires_at: int) -> None:
+    """Revoke a token id on the shared revocation list until it expires."""
+    revocation_list.revoke(jti, expires_at)
+
+
+@traced("cache")
+def is_jti_revoked(jti: str, expires_at: int) -> bool:
+    """True if the token id is on the shared revocation list."""
+    return revocation_list.is_revoked(jti, expires_at)
@@ -0,0 +1,77 @@
+"""Monthly rollups: a user's totals per type and category over one calendar month.
+
+A rollup counts the month's occurrences of recurring transactions (see `backend.recurrence`)
+as well as its other transactions. Rollups are computed by the `recompute_rollup` job and cached
+per data generation, so requests only ever read them.
+"""
+
+import datetime
+from typing import Final
+
+from backend.enums.frequency_enums import Frequency
+from backend.enums.transaction_enums import TransactionType
+from backend.queries.transactions_queries import (
+    get_recurring_transactions_by,
+    get_unscheduled_totals_by,
+)
+from backend.recurrence import nth_occurrence, occurrence_totals
+from backend.services.cache_services import get_rollup_cache, get_user_generation
+from backend.tracing import traced
+
+ROLLUP_MONTH_FORMAT: Final[str] = "%Y-%m"
+
+
+def parse_month(month: str) -> datetime.date:
+    """The first day of a YYYY-MM month.
+
+    Raises:
+        ValueError: if `month` isn't a YYYY-MM month.
+    """
+    return datetime.datetime.strptime(month, ROLLUP_MONTH_FORMAT).date()
+
+
+@traced("service")
+def compute_rollup(user_id: str, month: str) -> dict:
+    """Total a user's incomes and expenses per category over a month.
+
+    Args:
+        user_id, str: the UUID of the user.
+        month, str: the month, YYYY-MM.
+
+    Returns:
+        dict: "month", "income" and "expense" totals in pounds by category, and their overall
+            "total_income", "total_expense" and "net".
+    """
+    start = parse_month(month)
+    end = nth_occurrence(start, Frequency.MONTHLY, 1) - datetime.timedelta(days=1)
+
+    totals = occurrence_totals(get_recurring_transactions_by(user_id), start, end)
+    for transaction_type, category, pence in get_unscheduled_totals_by(
+        user_id, start, end
+    ):
+        key = (transaction_type, category)
+        totals[key] = totals.get(key, 0) + pence
+
+    by_type = {transaction_type: {} for transaction_type in TransactionType}
+    for (transaction_type, category), pence in sorted(totals.items()):
+        by_type[transaction_type][category.value] = pence / 100
+    total_income = sum(by_type[TransactionType.INCOME].values())
+    total_expense = sum(by_type[TransactionType.EXPENSE].values())
+    return {
+        "month": month,
+        "income": by_type[TransactionType.INCOME],
+        "expense": by_type[TransactionType.EXPENSE],
+        "total_income": round(total_income, 2),
+        "total_expense": round(total_expense, 2),
+        "net": round(total_income - total_expense, 2),
+    }
+
+
+@traced("service")
+def get_rollup(user_id: str, month: str) -> dict | None:
+    """Get a month's rollup of the user's current data, None if it hasn't been computed.
+
+    Raises:
+        RedisError: if the cache is unavailable.
+    """
+    return get_rollup_cache(user_id, get_user_generation(user_id), month)
@@ -0,0 +1,121 @@
+"""Time series of a user's totals, aggregated per day, week, month or year in SQL.
+
+Only one row per bucket with transactions leaves the database. The series is then made dense,
+with zeros for the buckets without any, so its size depends on the date range and bucket rather
+than on the number of transactions. Ranges which would need more than `max_points` buckets are
+downsampled to the next coarser bucket until they fit.
+"""
+
+import datetime
+from typing import Final, Sequence
+
+from backend.enums.transaction_enums import TransactionCategory, TransactionType
+from backend.queries.transactions_queries import get_bucket_totals_by
+from backend.tracing import traced
+
+SERIES_BUCKETS: Final[tuple[str, ...]] = ("day", "week", "month", "year")
+SERIES_MAX_POINTS: Final[int] = 366
+SERIES_POINTS_LIMIT: Final[int] = 5000
+SERIES_DEFAULT_DAYS: Final[int] = 365
+
+
+def bucket_start(date: datetime.date, bucket: str) -> datetime.date:
+    """The first day of the bucket `date` falls in, weeks start on Monday."""
+    if bucket == "day":
+        return date
+    if bucket == "week":
+        return date - datetime.timedelta(days=date.weekday())
+    if bucket == "month":
+        return date.replace(day=1)
+    if bucket == "year":
+        return date.replace(month=1, day=1)
+    raise ValueError(f"Unsupported bucket {bucket!r}")
+
+
+def next_bucket(start: datetime.date, bucket: str) -> datetime.date:
+    """The first day of the bucket after the one starting on `start`."""
+    if bucket == "day":
+        return start + datetime.timedelta(days=1)
+    if bucket == "week":
+        return start + datetime.timedelta(days=7)
+    if bucket == "month":
+        year, month = divmod(start.month, 12)
+        return start.replace(year=start.year + year, month=month + 1)
+    return start.replace(year=start.year + 1)
+
+
+def bucket_count(start: datetime.date, end: datetime.date, bucket: str) -> int:
+    """How many buckets the dates from `start` to `end` fall in."""
+    first, last = bucket_start(start, bucket), bucket_start(end, bucket)
+    if bucket == "day":
+        return (last - first).days + 1
+    if bucket == "week":
+        return (last - first).days // 7 + 1
+    if bucket == "month":
+        return (last.year - first.year) * 12 + last.month - first.month + 1
+    return last.year - first.year + 1
+
+
+def fit_bucket(
+    start: datetime.date, end: datetime.date, bucket: str, max_points: int
+) -> str:
+    """`bucket`, or the finest coarser one giving at most `max_points` buckets (else years).
+
+    Callers wanting at most `max_points` buckets must check that years give that few.
+    """
+    buckets = SERIES_BUCKETS[SERIES_BUCKETS.index(bucket) :]
+    for candidate in buckets:
+        if bucket_count(start, end, candidate) <= max_points:
+            return candidate
+    return buckets[-1]
+
+
+@traced("service")
+def get_series(
+    user_id: str,
+    bucket: str,
+    start: datetime.date,
+    end: datetime.date,
+    transaction_type: TransactionType = TransactionType.EXPENSE,
+    categories: Sequence[TransactionCategory] | None = None,
+    max_points: int = SERIES_MAX_POINTS,
+) -> dict:
+    """Get a dense series of a user's totals per bucket.
+
+    Args:
+        user_id, str: the UUID of the user.
+        bucket, str: one of `SERIES_BUCKETS`, the finest bucket wanted.
+        start, date: the earliest date to include.
+        end, date: the latest date to include.
+        transaction_type, TransactionType: total expenses (default) or incomes.
+        categories, Sequence[TransactionCategory] | None: only include these categories.
+        max_points, int: the most buckets to return, see `fit_bucket`.
+
+    Returns:
+        dict: "bucket" as used, which may be coarser than asked for, "buckets" holding the
+            first day of each bucket from the one containing `start` to the one containing
+            `end`, and "totals" holding each bucket's total in pounds.
+    """
+    bucket = fit_bucket(start, end, bucket, max_points)
+    totals = {
+        (
+            datetime.date.fromisoformat(bucket_date)
+            if isinstance(bucket_date, str)
+            else bucket_date
+        ): total
+        for bucket_date, total in get_bucket_totals_by(
+            user_id, bucket, start, end, transaction_type, categories
+        )
+    }
+
+    buckets, series = [], []
+    current, last = bucket_start(start, bucket), bucket_start(end, bucket)
+    while True:
+        buckets.append(current)
+        series.append(totals.get(current, 0) / 100)
+        # Not stepping past `last`, whose next bucket may be after the last date there is
+        if current == last:
+            break
+        current = next_bucket(current, bucket)
+
+    return {"bucket": bucket, "buckets": buckets, "totals": series}
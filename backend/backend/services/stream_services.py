@@ -0,0 +1,87 @@
+"""Streaming a user's data as JSON without holding all of it in memory.
+
+The body is the same document `/api/users/me` returns for a user loaded from the database, but
+written out piece by piece. From the cache the stored JSON is copied through in chunks without
+being decoded, from the database transactions are read and encoded one batch at a time.
+"""
+
+from typing import Final, Iterator
+
+from backend.enums.transaction_enums import TransactionType
+from backend.extensions import db
+from backend.json_codec import dumps, loads
+from backend.models.user_models import User
+from backend.queries.budget_queries import get_budgets_by
+from backend.queries.transactions_queries import iter_user_transactions
+from backend.services.cache_services import get_user_cache_raw
+from backend.tracing import traced
+
+STREAM_BATCH_SIZE: Final[int] = 500  # transactions per database fetch
+STREAM_CHUNK_SIZE: Final[int] = 64 * 1024  # characters per chunk copied from the cache
+
+
+def _user_prefix(user_id, alias: str) -> bytes:
+    return (
+        b'{"success":true,"user":{"id":'
+        + dumps(user_id)
+        + b',"alias":'
+        + dumps(alias)
+        + b',"transactions":'
+    )
+
+
+def _stream_cached_user(cached: dict[str, str]) -> Iterator[bytes]:
+    meta = loads(cached.get("meta", "{}"))
+    yield _user_prefix(meta.get("id"), meta.get("alias"))
+
+    transactions = cached.get("transactions", "[]")
+    for start in range(0, len(transactions), STREAM_CHUNK_SIZE):
+        yield transactions[start : start + STREAM_CHUNK_SIZE].encode()
+
+    yield b',"budgets":' + cached.get("budgets", "[]").encode() + b"}}"
+
+
+def _stream_user_from_db(user: User) -> Iterator[bytes]:
+    yield _user_prefix(user.id, user.alias) + b"["
+
+    # Summed while streaming, as in `User.expense_totals`, so budgets need no extra query
+    expense_totals: dict = {}
+    separator = b""
+    for batch in iter_user_transactions(user.id, batch_size=STREAM_BATCH_SIZE):
+        for transaction in batch:
+            if transaction.type == TransactionType.EXPENSE:
+                expense_totals[transaction.category] = (
+                    expense_totals.get(transaction.category, 0) + transaction._amount
+                )
+        yield separator + b",".join(dumps(t.to_dict()) for t in batch)
+        separator = b","
+
+    budgets = [
+        budget.to_dict(spent=expense_totals.get(budget.category, 0) / 100)
+        for budget in get_budgets_by(user.id)
+    ]
+    yield b'],"budgets":' + dumps(budgets) + b"}}"
+
+
+@traced("service")
+def stream_user_data(user_id: str) -> Iterator[bytes] | None:
+    """Get the chunks of a user's data as JSON, from the cache if it is there.
+
+    Nothing is cached when streaming from the database, as that would mean building the whole
+    document in memory.
+
+    Args:
+        user_id, str: the UUID of the user taken from the JWT token.
+
+    Returns:
+        Iterator[bytes] | None: the JSON document in chunks, None if there is no such user. The
+            iterator reads from the database, so must be consumed within the app context.
+    """
+    cached = get_user_cache_raw(user_id)
+    if cached:
+        return _stream_cached_user(cached)
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    return _stream_user_from_db(user)
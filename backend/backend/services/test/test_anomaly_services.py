@@ -0,0 +1,186 @@
+import datetime
+import io
+import uuid
+
+import pytest
+
+from ...enums.transaction_enums import TransactionCategory, TransactionType
+from ...extensions import db
+from ...models.transaction_models import Transaction
+from ...routes.test.harness import add_user_with_history, count_calls
+from .. import anomaly_services
+from ..anomaly_services import ANOMALIES_KEY_PREFIX, STATS_KEY_PREFIX, get_anomalies
+from ..cache_services import bump_user_generation
+from ..import_services import import_transactions
+
+PATH = "/api/transactions/anomalies"
+D = datetime.date
+
+
+def add_expense(user_id, date, category, amount, description=None):
+    db.session.add(
+        Transaction(
+            user_id=uuid.UUID(user_id),
+            type=TransactionType.EXPENSE,
+            category=category,
+            date=date,
+            amount=amount,
+            description=description,
+        )
+    )
+
+
+@pytest.fixture
+def user_id(app):
+    with app.app_context():
+        user_id = add_user_with_history(n_transactions=0, n_budgets=0)
+        for day in range(1, 21):
+            add_expense(
+                user_id, D(2024, 1, day), TransactionCategory.DINING, 20 + day % 5
+            )
+            add_expense(
+                user_id, D(2024, 1, day), TransactionCategory.GROCERIES, 50 + day % 7
+            )
+        add_expense(
+            user_id, D(2024, 1, 25), TransactionCategory.DINING, 180, "Tasting menu"
+        )
+        # Large, but within its category's norm
+        add_expense(user_id, D(2024, 1, 26), TransactionCategory.RENT, 1200)
+        db.session.commit()
+    return user_id
+
+
+def test_anomalies_route(client, headers):
+    response = client.get(PATH, headers=headers)
+
+    assert response.status_code == 200
+    body = response.get_json()
+    [anomaly] = body["anomalies"]
+    assert anomaly["description"] == "Tasting menu"
+    assert anomaly["amount"] == 180
+    assert anomaly["mean"] == 22
+    assert anomaly["sigma"] > 3
+    assert anomaly["percentile"] == 100
+    assert body["categories"]["Dining"]["count"] == 21
+    assert body["categories"]["Groceries"]["p50"] == pytest.approx(53, rel=0.02)
+    assert set(body["categories"]) == {"Dining", "Groceries", "Rent"}
+
+
+def test_anomalies_are_cached_per_generation(app, client, headers, fake_redis):
+    first = client.get(PATH, headers=headers).get_json()
+
+    with app.app_context():
+        engine = db.engine
+    with count_calls(engine, fake_redis) as calls:
+        assert client.get(PATH, headers=headers).get_json() == first
+    assert calls.sql == 0
+
+
+def test_import_updates_the_statistics_incrementally(app, user_id, fake_redis):
+    statement = (
+        "date,description,amount,category\n"
+        "2024-02-01,Lunch,-21,Dining\n"
+        "2024-02-02,Wedding feast,-400,Dining\n"
+        "2024-02-03,Big shop,-900,Groceries\n"
+        "2024-02-04,Salary,2000,Salary\n"
+    )
+    with app.test_request_context():
+        get_anomalies(user_id)
+        engine = db.engine
+        import_transactions(user_id, io.StringIO(statement), "csv")
+
+        with count_calls(engine, fake_redis) as calls:
+            incremental = get_anomalies(user_id)
+
+        fake_redis.delete(f"{STATS_KEY_PREFIX}{user_id}")
+        replayed = get_anomalies(user_id)
+
+    assert calls.sql == 0
+    assert [anomaly["description"] for anomaly in incremental["anomalies"]] == [
+        "Big shop",
+        "Wedding feast",
+        "Tasting menu",
+    ]
+    assert incremental["anomalies"] == replayed["anomalies"]
+    for category, summary in replayed["categories"].items():
+        assert incremental["categories"][category] == pytest.approx(summary)
+
+
+def test_state_behind_the_generation_is_replayed(app, user_id, fake_redis):
+    with app.test_request_context():
+        get_anomalies(user_id)
+        # A change which didn't record itself
+        add_expense(user_id, D(2024, 2, 1), TransactionCategory.DINING, 500, "Party")
+        db.session.commit()
+        bump_user_generation(user_id)
+        import_transactions(
+            user_id,
+            io.StringIO(
+                "date,description,amount,category\n2024-02-02,Lunch,-20,Dining\n"
+            ),
+            "csv",
+        )
+        assert not fake_redis.exists(
+            f"{STATS_KEY_PREFIX}{user_id}", f"{ANOMALIES_KEY_PREFIX}{user_id}"
+        )
+
+        anomalies = get_anomalies(user_id, limit=1)["anomalies"]
+
+    assert [anomaly["description"] for anomaly in anomalies] == ["Party"]
+
+
+def test_large_import_drops_the_state(app, user_id, fake_redis, monkeypatch):
+    monkeypatch.setattr(anomaly_services, "MAX_NEW_EXPENSES", 2)
+    statement = (
+        "date,description,amount,category\n"
+        "2024-02-01,Lunch,-21,Dining\n"
+        "2024-02-02,Wedding feast,-400,Dining\n"
+        "2024-02-03,Big shop,-900,Groceries\n"
+    )
+    with app.test_request_context():
+        get_anomalies(user_id)
+        import_transactions(user_id, io.StringIO(statement), "csv")
+        assert not fake_redis.exists(
+            f"{STATS_KEY_PREFIX}{user_id}", f"{ANOMALIES_KEY_PREFIX}{user_id}"
+        )
+
+        anomalies = get_anomalies(user_id)["anomalies"]
+
+    assert [anomaly["description"] for anomaly in anomalies] == [
+        "Big shop",
+        "Wedding feast",
+        "Tasting menu",
+    ]
+
+
+def test_constant_category_is_not_flagged_for_a_penny_more(
+    app, client, headers, user_id
+):
+    with app.app_context():
+        # With the rent of the 26th, 11 payments of exactly £1200
+        for month in range(2, 12):
+            add_expense(user_id, D(2024, month, 26), TransactionCategory.RENT, 1200)
+        add_expense(
+            user_id, D(2024, 12, 26), TransactionCategory.RENT, 1200.01, "Up 1p"
+        )
+        add_expense(user_id, D(2025, 1, 26), TransactionCategory.RENT, 2000, "New flat")
+        db.session.commit()
+        bump_user_generation(user_id)
+
+    response = client.get(PATH, headers=headers)
+
+    assert response.status_code == 200
+    anomalies = response.get_json()["anomalies"]
+    assert [anomaly["description"] for anomaly in anomalies] == [
+        "New flat",
+        "Tasting menu",
+    ]
+    # Judged by a standard deviation of 10% of the mean, not their spread of under 1p
+    assert anomalies[0]["sigma"] == pytest.approx(6.7, abs=0.1)
+
+
+@pytest.mark.parametrize("limit", ["0", "101"])
+def test_invalid_limit(client, headers, limit):
+    response = client.get(PATH, query_string={"limit": limit}, headers=headers)
+
+    assert response.status_code == 400
@@ -5,7 +5,14 @@ import pytest
 from flask import Flask, jsonify
 
 from ...routes.auth_routes import auth_blueprint
-from ..auth_services import login_required
+from .. import revocation_services
+from ..auth_services import (
+    TokenRevokedError,
+    generate_token,
+    login_required,
+    revoke_token,
+    verify_token,
+)
 
 
 # Create a simple Flask app for testing
@@ -111,3 +118,48 @@ def test_protected_route_valid_token(client, monkeypatch):
     data = response.get_json()
     assert data["auth"] == True
     assert data["message"] == "Route access authorised."
+
+
+###############################
+# verify_token / revoke_token #
+###############################
+
+
+@pytest.fixture
+def fake_revocation_list(monkeypatch):
+    import fakeredis
+
+    monkeypatch.setenv("JWT_SECRET_KEY", "test-secret")
+    monkeypatch.setattr(
+        "backend.services.revocation_services.revocation_list.client",
+        fakeredis.FakeRedis(decode_responses=True),
+    )
+    revocation_services.revocation_list.clear_local_cache()
+
+
+def test_verify_token_valid(app, fake_revocation_list):
+    token, _ = generate_token(user_id="user123")
+    with app.app_context():
+        assert verify_token(token) == "user123"
+
+
+def test_verify_token_revoked(app, fake_revocation_list):
+    token, _ = generate_token(user_id="user123")
+    assert revoke_token(token) is True
+
+    with app.app_context():
+        with pytest.raises(TokenRevokedError):
+            verify_token(token)
+
+
+def test_verify_token_revocation_disabled(app, fake_revocation_list):
+    token, _ = generate_token(user_id="user123")
+    revoke_token(token)
+
+    app.config["TOKEN_REVOCATION_ENABLED"] = False
+    with app.app_context():
+        assert verify_token(token) == "user123"
+
+
+def test_revoke_token_invalid(fake_revocation_list):
+    assert revoke_token("not-a-jwt") is False
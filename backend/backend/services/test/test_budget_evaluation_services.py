@@ -0,0 +1,259 @@
+import datetime
+import uuid
+
+import pytest
+
+from ... import app as app_module
+from ...enums.budget_enums import BudgetStatus
+from ...enums.frequency_enums import Frequency
+from ...enums.transaction_enums import TransactionCategory, TransactionType
+from ...extensions import db, redis_cache
+from ...models.budget_evaluation_models import BudgetEvaluation, BudgetEvaluationShard
+from ...models.budget_models import Budget
+from ...models.transaction_models import Transaction
+from ...models.user_models import User
+from ...routes.test.harness import login_as, use_fake_redis
+from .. import budget_evaluation_services
+from ..budget_evaluation_services import (
+    evaluate_shard,
+    period_start,
+    run_evaluation,
+    shard_bounds,
+    shard_of,
+)
+
+D = datetime.date
+RUN_DATE = D(2024, 3, 20)  # a Wednesday
+SHARDS = 4
+# In the first and last of 4 shards
+FIRST_USER = uuid.UUID(int=1)
+LAST_USER = uuid.UUID(int=3 * 2**126 + 5)
+
+
+def add_user(user_id, budgets, expenses):
+    db.session.add(
+        User(
+            id=user_id,
+            email=f"{user_id.hex}@example.com",
+            password="not-a-real-hash",
+            alias="Evaluated",
+        )
+    )
+    for category, frequency, amount in budgets:
+        db.session.add(
+            Budget(
+                user_id=user_id, category=category, frequency=frequency, amount=amount
+            )
+        )
+    for category, date, amount, *frequency in expenses:
+        db.session.add(
+            Transaction(
+                user_id=user_id,
+                type=TransactionType.EXPENSE,
+                category=category,
+                date=date,
+                amount=amount,
+                frequency=frequency[0] if frequency else None,
+            )
+        )
+
+
+@pytest.fixture
+def app(app):
+    with app.app_context():
+        add_user(
+            FIRST_USER,
+            budgets=[
+                (TransactionCategory.DINING, Frequency.MONTHLY, 100),
+                (TransactionCategory.GROCERIES, Frequency.WEEKLY, 50),
+                (TransactionCategory.RENT, Frequency.MONTHLY, 1000),
+            ],
+            expenses=[
+                (TransactionCategory.DINING, D(2024, 3, 5), 50),
+                # Before the month and after the run date
+                (TransactionCategory.DINING, D(2024, 2, 28), 500),
+                (TransactionCategory.DINING, D(2024, 3, 21), 500),
+                # Wednesdays, of which the 6th, 13th and 20th are in the month so far
+                (TransactionCategory.DINING, D(2024, 1, 3), 15, Frequency.WEEKLY),
+                (TransactionCategory.GROCERIES, D(2024, 3, 18), 60),
+                # The Sunday of the week before
+                (TransactionCategory.GROCERIES, D(2024, 3, 17), 100),
+                (TransactionCategory.RENT, D(2024, 3, 1), 100),
+            ],
+        )
+        add_user(
+            LAST_USER,
+            budgets=[(TransactionCategory.UTILITIES, Frequency.ANNUALLY, 100)],
+            expenses=[(TransactionCategory.UTILITIES, D(2024, 1, 10), 120)],
+        )
+        db.session.commit()
+    return app
+
+
+def evaluations(app):
+    with app.app_context():
+        return {
+            (evaluation.user_id, evaluation.category): (
+                evaluation.spent,
+                evaluation.status,
+            )
+            for evaluation in db.session.query(BudgetEvaluation)
+        }
+
+
+EXPECTED = {
+    (FIRST_USER, TransactionCategory.DINING): (9500, BudgetStatus.NEAR_BREACH),
+    (FIRST_USER, TransactionCategory.GROCERIES): (6000, BudgetStatus.BREACHED),
+    (LAST_USER, TransactionCategory.UTILITIES): (12000, BudgetStatus.BREACHED),
+}
+
+
+@pytest.mark.parametrize(
+    "frequency, expected",
+    [
+        (Frequency.DAILY, D(2024, 3, 20)),
+        (Frequency.WEEKLY, D(2024, 3, 18)),
+        (Frequency.BI_WEEKLY, D(2024, 3, 7)),
+        (Frequency.FOUR_WEEKLY, D(2024, 2, 22)),
+        (Frequency.MONTHLY, D(2024, 3, 1)),
+        (Frequency.ANNUALLY, D(2024, 1, 1)),
+    ],
+)
+def test_period_start(frequency, expected):
+    assert period_start(frequency, RUN_DATE) == expected
+
+
+def test_shards_cover_every_user_id():
+    bounds = [shard_bounds(shard, 7) for shard in range(7)]
+
+    assert bounds[0][0] == uuid.UUID(int=0)
+    assert bounds[-1][1] is None
+    assert all(upper == lower for (_, upper), (lower, _) in zip(bounds, bounds[1:]))
+    with pytest.raises(ValueError):
+        shard_bounds(7, 7)
+    for shard, (lower, _) in enumerate(bounds):
+        assert shard_of(lower, 7) == shard
+        assert shard_of(uuid.UUID(int=max(lower.int - 1, 0)), 7) == max(shard - 1, 0)
+
+
+def test_run_flags_breached_and_near_breached_budgets(app):
+    reported = []
+
+    with app.app_context():
+        progress = run_evaluation(
+            app, RUN_DATE, SHARDS, on_progress=lambda p: reported.append(p.shards)
+        )
+
+    assert reported == [1, 2, 3, 4]
+    assert (progress.shards, progress.failed, progress.skipped) == (4, 0, 0)
+    assert (progress.budgets, progress.flagged) == (4, 3)
+    assert evaluations(app) == EXPECTED
+
+
+def test_run_resumes_from_checkpointed_shards(app, monkeypatch):
+    def fail_shard_one(run_date, shard, shard_count):
+        if shard == 1:
+            raise RuntimeError("connection lost")
+        return evaluate_shard(run_date, shard, shard_count)
+
+    monkeypatch.setattr(budget_evaluation_services, "evaluate_shard", fail_shard_one)
+    with app.app_context():
+        interrupted = run_evaluation(app, RUN_DATE, SHARDS)
+        with pytest.raises(ValueError):
+            run_evaluation(app, RUN_DATE, SHARDS * 2)
+        monkeypatch.undo()
+        use_fake_redis(redis_cache)
+        resumed = run_evaluation(app, RUN_DATE)
+        checkpoints = db.session.query(BudgetEvaluationShard).count()
+
+    assert (interrupted.shards, interrupted.failed) == (3, 1)
+    assert (resumed.shard_count, resumed.skipped, resumed.shards) == (SHARDS, 3, 1)
+    assert checkpoints == SHARDS
+    assert evaluations(app) == EXPECTED
+
+
+def test_evaluating_a_shard_again_replaces_its_evaluations(app):
+    with app.app_context():
+        first = evaluate_shard(RUN_DATE.isoformat(), 0, SHARDS)
+        db.session.query(Transaction).filter(
+            Transaction.category == TransactionCategory.GROCERIES
+        ).delete()
+        db.session.commit()
+        again = evaluate_shard(RUN_DATE.isoformat(), 0, SHARDS)
+
+    assert (first.flagged, again.flagged) == (2, 1)
+    assert evaluations(app) == {
+        (FIRST_USER, TransactionCategory.DINING): EXPECTED[
+            (FIRST_USER, TransactionCategory.DINING)
+        ]
+    }
+
+
+def test_evaluate_budgets_command_runs_shards_on_a_process_pool(app, monkeypatch):
+    monkeypatch.setattr(app_module, "setup_logging", lambda: None)
+
+    result = app.test_cli_runner().invoke(
+        args=[
+            "evaluate-budgets",
+            "--date",
+            RUN_DATE.isoformat(),
+            "--shards",
+            str(SHARDS),
+            "--processes",
+            "2",
+        ]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "4/4 shards, 4 budgets" in result.output
+    assert "Evaluated 4 budgets" in result.output
+    assert "3 breached or near it." in result.output
+    assert evaluations(app) == EXPECTED
+
+
+def test_budget_evaluations_route(app):
+    with app.app_context():
+        run_evaluation(app, RUN_DATE, SHARDS)
+    client = app.test_client()
+
+    response = client.get(
+        "/api/budgets/evaluations", headers=login_as(client, str(FIRST_USER))
+    )
+
+    assert response.status_code == 200
+    assert response.get_json()["evaluations"] == [
+        {
+            "budget_id": response.get_json()["evaluations"][0]["budget_id"],
+            "run_date": "2024-03-20",
+            "category": "Dining",
+            "frequency": "Monthly",
+            "period_start": "2024-03-01",
+            "amount": 100.0,
+            "spent": 95.0,
+            "status": "near-breach",
+        },
+        {
+            "budget_id": response.get_json()["evaluations"][1]["budget_id"],
+            "run_date": "2024-03-20",
+            "category": "Groceries",
+            "frequency": "Weekly",
+            "period_start": "2024-03-18",
+            "amount": 50.0,
+            "spent": 60.0,
+            "status": "breached",
+        },
+    ]
+
+
+def test_budget_evaluations_route_drops_budgets_no_longer_flagged(app):
+    client = app.test_client()
+    headers = login_as(client, str(FIRST_USER))
+    with app.app_context():
+        run_evaluation(app, RUN_DATE, SHARDS)
+        # A new month and week, with nothing spent in either yet
+        run_evaluation(app, D(2024, 4, 2), SHARDS * 2)
+
+    response = client.get("/api/budgets/evaluations", headers=headers)
+
+    assert response.status_code == 200
+    assert response.get_json()["evaluations"] == []
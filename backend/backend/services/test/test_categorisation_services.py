@@ -0,0 +1,165 @@
+import io
+from types import SimpleNamespace
+
+import pytest
+
+from ...enums.transaction_enums import TransactionCategory as Category
+from ...enums.transaction_enums import TransactionType as Type
+from ...extensions import db, redis_cache
+from ...models.transaction_models import Transaction
+from ...routes.test.harness import add_user_with_history, count_calls
+from ..categorisation_services import CategoryMatcher, get_matcher, validate_pattern
+from ..import_services import import_transactions
+
+
+def rule(pattern, category, is_regex=False, type_=None):
+    return SimpleNamespace(
+        pattern=pattern, is_regex=is_regex, category=category, type=type_
+    )
+
+
+def categorise(matcher, *descriptions, type_=Type.EXPENSE):
+    return matcher.categorise(descriptions, [type_] * len(descriptions))
+
+
+def test_highest_priority_rule_wins_wherever_it_matches():
+    matcher = CategoryMatcher(
+        [
+            rule("express", Category.GROCERIES),
+            rule("tesco", Category.DINING),
+            rule(r"\bcafe\b", Category.LEISURE, is_regex=True),
+        ]
+    )
+
+    assert categorise(
+        matcher, "TESCO EXPRESS 1234", "Tesco Stores", "The Cafe", "Cafeteria", None
+    ) == [Category.GROCERIES, Category.DINING, Category.LEISURE, None, None]
+
+
+def test_keywords_which_are_prefixes_of_each_other():
+    matcher = CategoryMatcher(
+        [rule("tesco", Category.GROCERIES), rule("tesco petrol", Category.UTILITIES)]
+    )
+
+    # Only the longest keyword is reported at a position, but the shorter one outranks it
+    assert categorise(matcher, "tesco petrol station") == [Category.GROCERIES]
+
+
+def test_regex_rules_with_groups():
+    matcher = CategoryMatcher(
+        [
+            rule(r"(uber|bolt) (eats|food)", Category.DINING, is_regex=True),
+            rule(r"(uber|bolt)", Category.LEISURE, is_regex=True),
+            rule(r"^(sky|bt)\b", Category.UTILITIES, is_regex=True),
+        ]
+    )
+
+    assert categorise(matcher, "UBER EATS", "Uber trip", "SKY DIGITAL", "ASKY") == [
+        Category.DINING,
+        Category.LEISURE,
+        Category.UTILITIES,
+        None,
+    ]
+
+
+def test_rules_restricted_to_a_type():
+    matcher = CategoryMatcher(
+        [
+            rule("acme", Category.SALARY, type_=Type.INCOME),
+            rule("acme", Category.REFUND),
+        ]
+    )
+
+    assert categorise(matcher, "ACME LTD", type_=Type.INCOME) == [Category.SALARY]
+    assert categorise(matcher, "ACME LTD", type_=Type.EXPENSE) == [Category.REFUND]
+
+
+@pytest.mark.parametrize(
+    "pattern, is_regex",
+    [
+        ("", False),
+        ("x" * 201, False),
+        ("   ", False),
+        ("(", True),
+        ("a**", True),
+        ("[a-", True),
+    ],
+)
+def test_invalid_patterns(pattern, is_regex):
+    with pytest.raises(ValueError):
+        validate_pattern(pattern, is_regex)
+
+
+@pytest.fixture
+def user_id(app):
+    with app.app_context():
+        return add_user_with_history(n_transactions=0, n_budgets=0)
+
+
+def test_rules_api_invalidates_compiled_matcher(app, client, headers, user_id):
+    created = client.post(
+        "/api/category-rules",
+        json={"pattern": "tesco", "category": "Groceries"},
+        headers=headers,
+    )
+    assert created.status_code == 201
+
+    with app.test_request_context():
+        matcher = get_matcher(user_id)
+        with count_calls(db.engine, redis_cache) as counts:
+            assert get_matcher(user_id) is matcher
+        assert (counts.sql, counts.redis) == (0, 1)
+
+    rule_id = created.get_json()["rule"]["id"]
+    assert (
+        client.delete(f"/api/category-rules/{rule_id}", headers=headers).status_code
+        == 200
+    )
+    with app.test_request_context():
+        assert len(get_matcher(user_id)) == 0
+
+    rules = client.get("/api/category-rules", headers=headers).get_json()["rules"]
+    assert rules == []
+
+
+def test_invalid_rule_rejected(client, headers):
+    response = client.post(
+        "/api/category-rules",
+        json={"pattern": "(", "is_regex": True, "category": "Groceries"},
+        headers=headers,
+    )
+
+    assert response.status_code == 400
+
+
+def test_import_uses_rules_before_defaults(app, client, headers, user_id):
+    for pattern, category in [("tesco", "Groceries"), ("pret", "Dining")]:
+        client.post(
+            "/api/category-rules",
+            json={"pattern": pattern, "category": category},
+            headers=headers,
+        )
+    statement = "date,description,amount\n" + (
+        "2024-01-05,TESCO STORES,-20.00\n"
+        "2024-01-05,PRET A MANGER,-4.00\n"
+        "2024-01-06,Unknown shop,-1.00\n"
+    )
+
+    with app.test_request_context():
+        result = import_transactions(
+            user_id,
+            io.StringIO(statement),
+            "csv",
+            default_categories={Type.EXPENSE: Category.LEISURE},
+        )
+        categories = {
+            t.description: t.category
+            for t in db.session.query(Transaction).filter_by(user_id=user_id)
+        }
+
+    assert result.imported == 3
+    assert categories == {
+        "TESCO STORES": Category.GROCERIES,
+        "PRET A MANGER": Category.DINING,
+        "Unknown shop": Category.LEISURE,
+    }
@@ -0,0 +1,92 @@
+import pytest
+import redis
+from flask import Flask, g, jsonify
+
+from .. import etag_services
+from ..etag_services import conditional_get, make_etag
+
+
+def test_etag_depends_on_user_generation_and_path():
+    etag = make_etag("user", 1, "/api/budgets/load?")
+
+    assert etag == make_etag("user", 1, "/api/budgets/load?")
+    assert etag != make_etag("other", 1, "/api/budgets/load?")
+    assert etag != make_etag("user", 2, "/api/budgets/load?")
+    assert etag != make_etag("user", 1, "/api/dashboard/load?")
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def app(calls):
+    app = Flask(__name__)
+
+    @app.before_request
+    def set_user():
+        g.user_id = "user"
+
+    @app.route("/data")
+    @conditional_get
+    def data():
+        calls.append("data")
+        return jsonify({"value": 1}), 200
+
+    @app.route("/missing")
+    @conditional_get
+    def missing():
+        return jsonify({"success": False}), 404
+
+    return app
+
+
+@pytest.fixture
+def generation(monkeypatch):
+    state = {"generation": 3}
+    monkeypatch.setattr(
+        etag_services, "get_user_generation", lambda user_id: state["generation"]
+    )
+    return state
+
+
+def test_matching_etag_returns_304_without_running_view(app, generation, calls):
+    client = app.test_client()
+    etag = client.get("/data").headers["ETag"]
+
+    response = client.get("/data", headers={"If-None-Match": etag})
+
+    assert calls == ["data"]
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+
+def test_stale_etag_returns_200(app, generation):
+    client = app.test_client()
+    etag = client.get("/data").headers["ETag"]
+    generation["generation"] += 1
+
+    response = client.get("/data", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_errors_have_no_etag(app, generation):
+    response = app.test_client().get("/missing")
+
+    assert response.status_code == 404
+    assert "ETag" not in response.headers
+
+
+def test_cache_unavailable_runs_view_without_etag(app, monkeypatch):
+    def unavailable(user_id):
+        raise redis.ConnectionError("down")
+
+    monkeypatch.setattr(etag_services, "get_user_generation", unavailable)
+    response = app.test_client().get("/data")
+
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
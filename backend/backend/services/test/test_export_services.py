@@ -0,0 +1,98 @@
+import csv
+import datetime
+import io
+import json
+import uuid
+
+import pytest
+
+from ...enums.transaction_enums import TransactionCategory, TransactionType
+from ...extensions import db
+from ...models.transaction_models import Transaction
+from ...routes.test.harness import add_user_with_history
+from ..export_services import iter_export_batches
+
+PATH = "/api/transactions/export"
+
+
+@pytest.fixture
+def user_id(app):
+    with app.app_context():
+        user_id = add_user_with_history(n_transactions=40, n_budgets=0)
+        # Several transactions on one date, so pages split rows sharing a date
+        for i in range(7):
+            db.session.add(
+                Transaction(
+                    user_id=uuid.UUID(user_id),
+                    type=TransactionType.EXPENSE,
+                    category=TransactionCategory.DINING,
+                    date=datetime.date(2024, 1, 10),
+                    amount=1.5,
+                    description=f"Same day {i}",
+                )
+            )
+        db.session.commit()
+    return user_id
+
+
+def test_pages_cover_every_row_once_and_release_the_connection(app, user_id):
+    with app.app_context():
+        pages = []
+        for rows in iter_export_batches(user_id, batch_size=5):
+            assert db.engine.pool.checkedout() == 0
+            pages.append(rows)
+
+    rows = [row for page in pages for row in page]
+    assert len(pages) == 10
+    assert len(rows) == 47
+    assert len({row.id for row in rows}) == 47
+    assert [(r.date, r.id) for r in rows] == sorted((r.date, r.id) for r in rows)
+
+
+def test_csv_export(client, headers):
+    response = client.get(PATH, headers=headers)
+
+    assert response.is_streamed
+    assert response.mimetype == "text/csv"
+    assert "transactions.csv" in response.headers["Content-Disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == 47
+    assert rows[0]["date"] == "2024-01-01"
+    assert rows[0]["type"] == "income"
+    assert rows[0]["amount"] == "1000.00"
+
+
+def test_jsonl_export_with_filters(client, headers):
+    response = client.get(
+        PATH,
+        query_string={
+            "format": "jsonl",
+            "start": "2024-01-05",
+            "end": "2024-01-20",
+            "category": "Dining,Rent",
+        },
+        headers=headers,
+    )
+
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data().splitlines()]
+    assert lines
+    assert {line["category"] for line in lines} <= {"Dining", "Rent"}
+    assert all("2024-01-05" <= line["date"] <= "2024-01-20" for line in lines)
+    assert sum(line["description"].startswith("Same day") for line in lines) == 7
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"format": "xml"},
+        {"start": "not-a-date"},
+        {"category": "Nonsense"},
+        {"start": "2024-02-01", "end": "2024-01-01"},
+    ],
+)
+def test_invalid_parameters(client, headers, params):
+    response = client.get(PATH, query_string=params, headers=headers)
+
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
@@ -0,0 +1,123 @@
+import datetime
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from ...enums.frequency_enums import Frequency
+from ...enums.transaction_enums import TransactionCategory, TransactionType
+from ...extensions import db
+from ...models.transaction_models import Transaction
+from ...recurrence import count_occurrences, expand
+from ...routes.test.harness import add_user_with_history, count_calls
+from ..cache_services import bump_user_generation
+from ..forecast_services import recurring_deltas
+
+PATH = "/api/dashboard/forecast"
+D = datetime.date
+TODAY = datetime.date.today()
+
+
+def test_recurring_deltas_match_the_recurrence_engine():
+    rows = [
+        SimpleNamespace(date=date, frequency=frequency, _amount=pence)
+        for date, frequency, pence in [
+            (D(2023, 1, 31), Frequency.MONTHLY, 100),
+            (D(2020, 2, 29), Frequency.ANNUALLY, 200),
+            (D(2000, 1, 3), Frequency.WEEKLY, 300),
+            (D(2024, 3, 1), Frequency.FOUR_WEEKLY, 400),
+            (D(2023, 12, 30), Frequency.BI_WEEKLY, 500),
+            (D(2024, 1, 10), Frequency.DAILY, 600),
+            (D(2026, 1, 1), Frequency.MONTHLY, 700),
+        ]
+    ]
+    start, days = D(2024, 1, 15), 800
+
+    expected = [0] * days
+    for occurrence in expand(rows, start, start + datetime.timedelta(days=days - 1)):
+        expected[(occurrence.date - start).days] += occurrence.item._amount
+
+    assert recurring_deltas(rows, start, days).tolist() == expected
+
+
+def add_transaction(user_id, type_, category, days_ago, amount, frequency=None):
+    db.session.add(
+        Transaction(
+            user_id=uuid.UUID(user_id),
+            type=type_,
+            category=category,
+            date=TODAY - datetime.timedelta(days=days_ago),
+            frequency=frequency,
+            amount=amount,
+        )
+    )
+    db.session.commit()
+
+
+@pytest.fixture
+def user_id(app):
+    with app.app_context():
+        user_id = add_user_with_history(n_transactions=0, n_budgets=0)
+        add_transaction(
+            user_id, TransactionType.INCOME, TransactionCategory.GIFT, 10, 1000
+        )
+        add_transaction(
+            user_id, TransactionType.EXPENSE, TransactionCategory.DINING, 9, 100
+        )
+        add_transaction(
+            user_id,
+            TransactionType.INCOME,
+            TransactionCategory.SALARY,
+            40,
+            2000,
+            Frequency.MONTHLY,
+        )
+    return user_id
+
+
+def test_forecast(client, headers):
+    response = client.get(PATH, query_string={"months": 3}, headers=headers)
+
+    assert response.status_code == 200
+    forecast = response.get_json()["forecast"]
+    end = datetime.date.fromisoformat(forecast["end"])
+    days = (end - TODAY).days
+    start = TODAY + datetime.timedelta(days=1)
+    salary_date = TODAY - datetime.timedelta(days=40)
+    salaries = count_occurrences(salary_date, Frequency.MONTHLY, start, end)
+    assert forecast["start"] == start.isoformat()
+    assert len(forecast["balance"]) == days
+    assert forecast["opening_balance"] == 2900
+    # £100 of dining over 10 days of history is £10 a day
+    assert forecast["balance"][0] == 2890 + 2000 * count_occurrences(
+        salary_date, Frequency.MONTHLY, start, start
+    )
+    assert forecast["balance"][-1] == 2900 - 10 * days + 2000 * salaries
+    assert forecast["recurring"] == {"income": 2000 * salaries, "expense": 0}
+    assert forecast["discretionary"] == {"Dining": 10 * days}
+
+
+def test_forecast_is_cached_per_generation(app, client, headers, user_id, fake_redis):
+    first = client.get(PATH, headers=headers).get_json()
+
+    with app.app_context():
+        engine = db.engine
+    with count_calls(engine, fake_redis) as calls:
+        assert client.get(PATH, headers=headers).get_json() == first
+    assert calls.sql == 0
+
+    with app.app_context():
+        add_transaction(
+            user_id, TransactionType.INCOME, TransactionCategory.GIFT, 1, 50
+        )
+    bump_user_generation(user_id)
+
+    forecast = client.get(PATH, headers=headers).get_json()["forecast"]
+    assert forecast["opening_balance"] == first["forecast"]["opening_balance"] + 50
+
+
+@pytest.mark.parametrize("months", ["0", "61"])
+def test_invalid_months(client, headers, months):
+    response = client.get(PATH, query_string={"months": months}, headers=headers)
+
+    assert response.status_code == 400
@@ -0,0 +1,188 @@
+import io
+import uuid
+
+import pytest
+
+from ...enums.transaction_enums import TransactionCategory, TransactionType
+from ...extensions import db
+from ...models.transaction_models import Transaction
+from ...models.user_models import User
+from ...routes.test.harness import add_user_with_history
+from ..cache_services import get_user_generation
+from ..import_services import import_transactions
+
+PATH = "/api/transactions/import"
+EMAIL = "importer@example.com"
+
+CSV_STATEMENT = (
+    "date,description,amount,category\n"
+    "05/01/2024,Coffee,-2.50,Dining\n"
+    "2024-01-06,Shop,-40.10,\n"
+    "07/01/2024,Broken,abc,Dining\n"
+    "31/01/2024,Salary,2000,Salary\n"
+)
+
+
+@pytest.fixture
+def user_id(app):
+    with app.app_context():
+        user = User(id=uuid.uuid4(), email=EMAIL, password="hash", alias="Importer")
+        db.session.add(user)
+        db.session.commit()
+        return str(user.id)
+
+
+def stored(app, user_id) -> list[Transaction]:
+    with app.app_context():
+        return (
+            Transaction.query.filter_by(user_id=uuid.UUID(user_id))
+            .order_by(Transaction.date)
+            .all()
+        )
+
+
+def test_import_in_batches_bumps_generation_once(app, user_id):
+    rows = "".join(f"2024-01-01,Row {i},-1.{i % 100:02d},Dining\n" for i in range(25))
+    stream = io.StringIO("date,description,amount,category\n" + rows)
+
+    with app.test_request_context():
+        result = import_transactions(user_id, stream, "csv", batch_size=10)
+        generation = get_user_generation(user_id)
+
+    assert result.imported == 25
+    assert result.invalid == 0
+    assert generation == 1
+    assert len(stored(app, user_id)) == 25
+
+
+def test_import_route_reports_invalid_rows(app, client, headers, user_id):
+    response = client.post(
+        PATH,
+        data={
+            "file": (io.BytesIO(CSV_STATEMENT.encode()), "statement.csv"),
+            "expense_category": "Groceries",
+        },
+        headers=headers,
+    )
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body["imported"] == 3
+    assert body["invalid"] == 1
+    assert body["errors"] == [{"row": 4, "message": "invalid amount 'abc'"}]
+
+    transactions = stored(app, user_id)
+    assert [(t.type, t.category, t._amount) for t in transactions] == [
+        (TransactionType.EXPENSE, TransactionCategory.DINING, 250),
+        (TransactionType.EXPENSE, TransactionCategory.GROCERIES, 4010),
+        (TransactionType.INCOME, TransactionCategory.SALARY, 200000),
+    ]
+
+
+def test_rows_without_category_or_default_are_invalid(client, headers):
+    response = client.post(
+        PATH,
+        data={"file": (io.BytesIO(CSV_STATEMENT.encode()), "statement.csv")},
+        headers=headers,
+    )
+
+    body = response.get_json()
+    assert body["imported"] == 2
+    assert {"row": 3, "message": "no category, and no default for expense"} in body[
+        "errors"
+    ]
+
+
+def test_import_qif(app, client, headers, user_id):
+    statement = "!Type:Bank\nD05/01/2024\nT-12.50\nPCoffee\nLDining\n^\n"
+
+    response = client.post(
+        PATH,
+        data={"file": (io.BytesIO(statement.encode()), "statement.qif")},
+        headers=headers,
+    )
+
+    assert response.get_json()["imported"] == 1
+    assert stored(app, user_id)[0].description == "Coffee"
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {},
+        {"file": (io.BytesIO(b"x"), "statement.pdf")},
+        {"file": (io.BytesIO(b"x"), "statement.csv"), "income_category": "Nope"},
+        {"file": (io.BytesIO(b"date,memo\n"), "statement.csv")},
+    ],
+)
+def test_invalid_imports(client, headers, data):
+    response = client.post(PATH, data=data, headers=headers)
+
+    assert response.status_code == 400
+
+
+def test_cli(app, tmp_path, user_id):
+    path = tmp_path / "statement.csv"
+    path.write_text(CSV_STATEMENT)
+
+    result = app.test_cli_runner().invoke(
+        args=["import-transactions", EMAIL, str(path), "--expense-category", "rent"]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "Imported 3, 1 invalid rows." in result.output
+    assert stored(app, user_id)[1].category == TransactionCategory.RENT
+
+
+def test_reimport_skips_duplicates(app, user_id):
+    first = "date,description,amount,category\n" + (
+        "2024-01-05,Coffee,-2.50,Dining\n"
+        "2024-01-05,Coffee,-2.50,Dining\n"
+        "2024-01-06,Lunch,-8.00,Dining\n"
+    )
+    # Overlaps the first, with the descriptions formatted differently
+    second = "date,description,amount,category\n" + (
+        "2024-01-05,COFFEE,-2.50,Dining\n"
+        "2024-01-05,  coffee ,-2.50,Dining\n"
+        "2024-01-06,Lunch.,-8.00,Dining\n"
+        "2024-01-07,Dinner,-20.00,Dining\n"
+    )
+
+    with app.test_request_context():
+        imported = import_transactions(user_id, io.StringIO(first), "csv")
+        reimported = import_transactions(user_id, io.StringIO(second), "csv")
+        generation = get_user_generation(user_id)
+
+    assert (imported.imported, imported.duplicates) == (3, 0)
+    assert (reimported.imported, reimported.duplicates) == (1, 3)
+    assert generation == 2
+    assert len(stored(app, user_id)) == 4
+
+
+def test_import_skips_seeded_history(app):
+    with app.app_context():
+        user_id = add_user_with_history(n_transactions=3, n_budgets=0)
+    # The harness history's first two days, then one new row
+    statement = "date,description,amount,category\n" + (
+        "2024-01-01,Transaction 0,1000,Salary\n"
+        "2024-01-02,Transaction 1,-11,Groceries\n"
+        "2024-01-04,Transaction 3,-13,Dining\n"
+    )
+
+    with app.test_request_context():
+        result = import_transactions(user_id, io.StringIO(statement), "csv")
+
+    assert (result.imported, result.duplicates) == (1, 2)
+    assert len(stored(app, user_id)) == 4
+
+
+def test_duplicates_only_import_keeps_generation(app, user_id):
+    statement = "date,description,amount,category\n2024-01-05,Coffee,-2.50,Dining\n"
+
+    with app.test_request_context():
+        import_transactions(user_id, io.StringIO(statement), "csv")
+        result = import_transactions(user_id, io.StringIO(statement), "csv")
+        generation = get_user_generation(user_id)
+
+    assert (result.imported, result.duplicates) == (0, 1)
+    assert generation == 1
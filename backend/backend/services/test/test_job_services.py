@@ -0,0 +1,138 @@
+import datetime
+import io
+import uuid
+
+import pytest
+
+from ...enums.frequency_enums import Frequency
+from ...enums.transaction_enums import TransactionCategory, TransactionType
+from ...extensions import db
+from ...jobs import Worker
+from ...models.transaction_models import Transaction
+from ...routes.test.harness import add_user_with_history
+from ..cache_services import bump_user_generation, get_user_cache
+from ..rollup_services import compute_rollup
+
+PATH = "/api/dashboard/rollup"
+D = datetime.date
+
+
+@pytest.fixture
+def app_config():
+    return {"JOBS_BROKER": "memory"}
+
+
+def add_transaction(user_id, type_, category, date, amount, frequency=None):
+    db.session.add(
+        Transaction(
+            user_id=uuid.UUID(user_id),
+            type=type_,
+            category=category,
+            date=date,
+            frequency=frequency,
+            amount=amount,
+        )
+    )
+
+
+@pytest.fixture
+def user_id(app):
+    with app.app_context():
+        user_id = add_user_with_history(n_transactions=0, n_budgets=0)
+        add_transaction(
+            user_id,
+            TransactionType.INCOME,
+            TransactionCategory.SALARY,
+            D(2023, 11, 28),
+            2000,
+            Frequency.MONTHLY,
+        )
+        add_transaction(
+            user_id,
+            TransactionType.EXPENSE,
+            TransactionCategory.DINING,
+            D(2024, 1, 1),
+            25,
+            Frequency.WEEKLY,
+        )
+        add_transaction(
+            user_id,
+            TransactionType.EXPENSE,
+            TransactionCategory.DINING,
+            D(2024, 2, 10),
+            12.5,
+        )
+        add_transaction(
+            user_id,
+            TransactionType.EXPENSE,
+            TransactionCategory.RENT,
+            D(2024, 3, 1),
+            900,
+        )
+        db.session.commit()
+    return user_id
+
+
+def run_jobs(app):
+    with app.app_context():
+        return Worker(app, app.extensions["jobs"], processes=0).run(burst=True)
+
+
+def test_compute_rollup_counts_recurring_occurrences(app, user_id):
+    with app.app_context():
+        rollup = compute_rollup(user_id, "2024-02")
+
+    # Mondays in February 2024: the 5th, 12th, 19th and 26th
+    assert rollup == {
+        "month": "2024-02",
+        "income": {"Salary": 2000.0},
+        "expense": {"Dining": 112.5},
+        "total_income": 2000.0,
+        "total_expense": 112.5,
+        "net": 1887.5,
+    }
+
+
+def test_rollup_is_computed_by_a_job(app, client, headers, user_id):
+    query = {"month": "2024-02"}
+
+    pending = client.get(PATH, query_string=query, headers=headers)
+    assert pending.status_code == 202
+    assert pending.get_json() == {"success": True, "status": "pending"}
+    # Asking again before it has run doesn't queue it twice
+    client.get(PATH, query_string=query, headers=headers)
+    assert len(app.extensions["jobs"]) == 1
+
+    stats = run_jobs(app)
+    assert stats["recompute_rollup"].runs == 1
+
+    response = client.get(PATH, query_string=query, headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["rollup"]["net"] == 1887.5
+
+    bump_user_generation(user_id)
+    assert client.get(PATH, query_string=query, headers=headers).status_code == 202
+
+
+@pytest.mark.parametrize("month", ["2024-13", "2024-02-01", "Feb"])
+def test_invalid_month(client, headers, month):
+    response = client.get(PATH, query_string={"month": month}, headers=headers)
+
+    assert response.status_code == 400
+
+
+def test_import_queues_a_cache_rebuild(app, client, headers, user_id):
+    statement = io.BytesIO(
+        b"date,description,amount,category\n2024-03-02,Coffee,-2.50,Dining\n"
+    )
+
+    response = client.post(
+        "/api/transactions/import",
+        data={"file": (statement, "statement.csv")},
+        headers=headers,
+    )
+
+    assert response.status_code == 200
+    assert get_user_cache(user_id) is None
+    assert run_jobs(app)["rebuild_user_cache"].runs == 1
+    assert len(get_user_cache(user_id)["transactions"]) == 5
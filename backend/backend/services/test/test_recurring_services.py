@@ -0,0 +1,256 @@
+import datetime
+import io
+import uuid
+
+import pytest
+
+from ...enums.frequency_enums import Frequency
+from ...enums.transaction_enums import TransactionCategory, TransactionType
+from ...extensions import db
+from ...models.transaction_models import Transaction
+from ...routes.test.harness import add_user_with_history, count_calls
+from ..cache_services import bump_user_generation
+from .. import recurring_services
+from ..import_services import import_transactions
+from ..recurring_services import (
+    FOUND_KEY_PREFIX,
+    GROUPS_KEY_PREFIX,
+    detect,
+    get_recurring_payments,
+    group_description,
+    merge_points,
+    new_group,
+)
+
+PATH = "/api/transactions/recurring"
+D = datetime.date
+
+
+def group_of(points):
+    group = new_group("expense", "Netflix", "Leisure")
+    merge_points(group, points, "Netflix", "Leisure")
+    return group
+
+
+def test_detect_monthly_despite_short_months():
+    points = [
+        (f"2024-{month:02d}-{day}", 1099)
+        for month, day in [(1, 31), (2, 29), (3, 31), (4, 30)]
+    ]
+
+    found = detect(group_of(points))
+
+    assert found["frequency"] == Frequency.MONTHLY.value
+    assert found["amount"] == 10.99
+    assert found["last_date"] == "2024-04-30"
+    assert found["next_date"] == "2024-05-30"
+
+
+@pytest.mark.parametrize(
+    "points",
+    [
+        # Too few
+        [("2024-01-01", 500), ("2024-01-08", 500)],
+        # Irregular dates
+        [
+            ("2024-01-01", 500),
+            ("2024-01-04", 500),
+            ("2024-01-20", 500),
+            ("2024-03-01", 500),
+        ],
+        # Weekly, but the amounts vary too much
+        [
+            ("2024-01-01", 500),
+            ("2024-01-08", 2000),
+            ("2024-01-15", 90),
+            ("2024-01-22", 5000),
+        ],
+    ],
+)
+def test_not_recurring(points):
+    assert detect(group_of(points)) is None
+
+
+def test_groups_keep_their_latest_points():
+    group = group_of([(f"2024-01-{day:02d}", 100) for day in range(1, 31)])
+
+    assert group["count"] == 30
+    assert len(group["points"]) == 12
+    assert group["points"][-1] == ["2024-01-30", 100]
+
+
+@pytest.mark.parametrize(
+    "description, expected",
+    [
+        ("NETFLIX.COM 8231", "netflixcom"),
+        ("Netflix.com  A1B2C3", "netflixcom"),
+        ("TESCO Stores-1234", "tescostores"),
+        ("O2", "o"),
+        ("123456", ""),
+        (None, ""),
+    ],
+)
+def test_group_description_drops_references(description, expected):
+    assert group_description(description) == expected
+
+
+def add_transaction(user_id, date, description, amount, type_=TransactionType.EXPENSE):
+    db.session.add(
+        Transaction(
+            user_id=uuid.UUID(user_id),
+            type=type_,
+            category=TransactionCategory.LEISURE,
+            date=date,
+            amount=amount,
+            description=description,
+        )
+    )
+
+
+@pytest.fixture
+def user_id(app):
+    with app.app_context():
+        user_id = add_user_with_history(n_transactions=0, n_budgets=0)
+        for month in range(1, 7):
+            add_transaction(user_id, D(2024, month, 3), "NETFLIX.COM", 10.99)
+            add_transaction(user_id, D(2024, month, month * 4), "Corner shop", 7)
+        for week in range(5):
+            add_transaction(
+                user_id,
+                D(2024, 1, 5) + datetime.timedelta(weeks=week),
+                "Gym",
+                25 + week % 2,
+            )
+        # Recurring already, so not suggested
+        db.session.add(
+            Transaction(
+                user_id=uuid.UUID(user_id),
+                type=TransactionType.INCOME,
+                category=TransactionCategory.SALARY,
+                date=D(2024, 1, 25),
+                frequency=Frequency.MONTHLY,
+                amount=2000,
+                description="Salary",
+            )
+        )
+        db.session.commit()
+    return user_id
+
+
+def test_recurring_route(client, headers):
+    response = client.get(PATH, headers=headers)
+
+    assert response.status_code == 200
+    recurring = response.get_json()["recurring"]
+    assert [(item["description"], item["frequency"]) for item in recurring] == [
+        ("Gym", Frequency.WEEKLY.value),
+        ("NETFLIX.COM", Frequency.MONTHLY.value),
+    ]
+    assert recurring[1] == {
+        "description": "NETFLIX.COM",
+        "type": "expense",
+        "category": "Leisure",
+        "frequency": Frequency.MONTHLY.value,
+        "amount": 10.99,
+        "occurrences": 6,
+        "last_date": "2024-06-03",
+        "next_date": "2024-07-03",
+    }
+
+
+def test_detections_are_cached_per_generation(app, client, headers, fake_redis):
+    first = client.get(PATH, headers=headers).get_json()
+
+    with app.app_context():
+        engine = db.engine
+    with count_calls(engine, fake_redis) as calls:
+        assert client.get(PATH, headers=headers).get_json() == first
+    assert calls.sql == 0
+
+
+def test_import_updates_only_its_groups(app, user_id, fake_redis):
+    statement = (
+        "date,description,amount,category\n"
+        "2024-07-03,Netflix.com,-10.99,Leisure\n"
+        "2024-02-09,Gym,-25,Leisure\n"
+        "2024-03-01,Dentist,-60,Leisure\n"
+    )
+    with app.test_request_context():
+        get_recurring_payments(user_id)
+        engine = db.engine
+        import_transactions(user_id, io.StringIO(statement), "csv")
+
+        with count_calls(engine, fake_redis) as calls:
+            incremental = get_recurring_payments(user_id)
+        stored = fake_redis.hgetall(f"{GROUPS_KEY_PREFIX}{user_id}")
+
+        fake_redis.delete(
+            f"{GROUPS_KEY_PREFIX}{user_id}", f"{FOUND_KEY_PREFIX}{user_id}"
+        )
+        rescanned = get_recurring_payments(user_id)
+
+    assert calls.sql == 0
+    assert incremental == rescanned
+    assert stored == fake_redis.hgetall(f"{GROUPS_KEY_PREFIX}{user_id}")
+    netflix = next(
+        item for item in incremental if item["frequency"] == Frequency.MONTHLY.value
+    )
+    assert netflix["occurrences"] == 7
+    assert netflix["description"] == "Netflix.com"
+
+
+def test_state_behind_the_generation_is_rescanned(app, user_id, fake_redis):
+    with app.test_request_context():
+        get_recurring_payments(user_id)
+        # A change which didn't record itself, e.g. an edited transaction
+        add_transaction(user_id, D(2024, 7, 3), "Netflix.com", 10.99)
+        db.session.commit()
+        bump_user_generation(user_id)
+        import_transactions(
+            user_id,
+            io.StringIO("date,description,amount\n2024-03-01,Dentist,-60\n"),
+            "csv",
+            default_categories={TransactionType.EXPENSE: TransactionCategory.LEISURE},
+        )
+        assert not fake_redis.exists(f"{GROUPS_KEY_PREFIX}{user_id}")
+
+        recurring = get_recurring_payments(user_id)
+
+    netflix = next(item for item in recurring if item["description"] == "Netflix.com")
+    assert netflix["occurrences"] == 7
+
+
+def test_import_touching_too_many_groups_drops_the_state(
+    app, user_id, fake_redis, monkeypatch
+):
+    monkeypatch.setattr(recurring_services, "MAX_NEW_GROUPS", 2)
+    statement = (
+        "date,description,amount,category\n"
+        "2024-07-03,Netflix.com,-10.99,Leisure\n"
+        "2024-02-09,Gym,-25,Leisure\n"
+        "2024-03-01,Dentist,-60,Leisure\n"
+    )
+    with app.test_request_context():
+        get_recurring_payments(user_id)
+        import_transactions(user_id, io.StringIO(statement), "csv")
+        assert not fake_redis.exists(f"{GROUPS_KEY_PREFIX}{user_id}")
+
+        recurring = get_recurring_payments(user_id)
+
+    netflix = next(item for item in recurring if item["description"] == "Netflix.com")
+    assert netflix["occurrences"] == 7
+
+
+def test_payments_with_changing_references_are_grouped(app, user_id):
+    with app.app_context():
+        for month in range(1, 5):
+            add_transaction(
+                user_id, D(2024, month, 14), f"SPOTIFY P{month}A{month * 7}", 11.99
+            )
+        db.session.commit()
+        recurring = get_recurring_payments(user_id)
+
+    spotify = [item for item in recurring if item["amount"] == 11.99]
+    assert [(item["description"], item["occurrences"]) for item in spotify] == [
+        ("SPOTIFY P4A28", 4)
+    ]
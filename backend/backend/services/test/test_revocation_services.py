@@ -0,0 +1,80 @@
+import time
+
+import fakeredis
+import pytest
+import redis
+
+from ..revocation_services import REVOKED_KEY_PREFIX, RevocationList
+
+
+@pytest.fixture
+def client():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+@pytest.fixture
+def revocations(client):
+    return RevocationList(client, negative_ttl=60)
+
+
+def future(seconds: int = 3600) -> int:
+    return int(time.time()) + seconds
+
+
+def test_unknown_jti_not_revoked(revocations):
+    assert revocations.is_revoked("unknown", future()) is False
+
+
+def test_revoke_sets_key_with_token_ttl(revocations, client):
+    revocations.revoke("abc", future(600))
+
+    assert revocations.is_revoked("abc", future(600)) is True
+    assert 0 < client.ttl(f"{REVOKED_KEY_PREFIX}abc") <= 600
+
+
+def test_revoke_expired_token_is_noop(revocations, client):
+    revocations.revoke("abc", int(time.time()) - 1)
+
+    assert client.exists(f"{REVOKED_KEY_PREFIX}abc") == 0
+
+
+def test_negative_answer_served_locally(revocations, client, monkeypatch):
+    assert revocations.is_revoked("abc", future()) is False
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Redis should not be consulted")
+
+    monkeypatch.setattr(client, "exists", fail)
+    assert revocations.is_revoked("abc", future()) is False
+
+
+def test_revocation_by_another_worker_seen_after_negative_ttl(client):
+    this_worker = RevocationList(client, negative_ttl=0)
+    other_worker = RevocationList(client, negative_ttl=0)
+
+    assert this_worker.is_revoked("abc", future()) is False
+    other_worker.revoke("abc", future())
+    assert this_worker.is_revoked("abc", future()) is True
+
+
+def test_local_revoke_overrides_negative_cache(revocations):
+    assert revocations.is_revoked("abc", future()) is False
+    revocations.revoke("abc", future())
+    assert revocations.is_revoked("abc", future()) is True
+
+
+def test_fails_open_when_redis_unavailable(revocations, client, monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise redis.ConnectionError("down")
+
+    monkeypatch.setattr(client, "exists", unavailable)
+    assert revocations.is_revoked("abc", future()) is False
+
+
+def test_local_cache_is_bounded(client):
+    revocations = RevocationList(client, negative_ttl=60, max_entries=2)
+    for jti in ("a", "b", "c"):
+        revocations.is_revoked(jti, future())
+
+    assert len(revocations._not_revoked) == 2
+    assert "a" not in revocations._not_revoked
@@ -0,0 +1,139 @@
+import datetime
+import uuid
+
+import pytest
+
+from ...enums.transaction_enums import TransactionCategory, TransactionType
+from ...extensions import db
+from ...models.transaction_models import Transaction
+from ...routes.test.harness import add_user_with_history
+from ..series_services import bucket_count, bucket_start, fit_bucket
+
+PATH = "/api/transactions/series"
+D = datetime.date
+
+
+@pytest.mark.parametrize(
+    "start, end, bucket, count",
+    [
+        (D(2024, 1, 1), D(2024, 12, 31), "day", 366),
+        (D(2024, 1, 7), D(2024, 1, 8), "week", 2),  # Sunday then Monday
+        (D(2023, 11, 30), D(2024, 2, 1), "month", 4),
+        (D(2023, 12, 31), D(2024, 1, 1), "year", 2),
+    ],
+)
+def test_bucket_count(start, end, bucket, count):
+    assert bucket_count(start, end, bucket) == count
+
+
+def test_fit_bucket_downsamples_long_ranges():
+    start, end = D(2022, 1, 1), D(2024, 12, 31)
+
+    assert fit_bucket(start, end, "day", 2000) == "day"
+    assert fit_bucket(start, end, "day", 200) == "week"
+    assert fit_bucket(start, end, "day", 100) == "month"
+    assert fit_bucket(start, end, "week", 2) == "year"
+
+
+@pytest.fixture
+def user_id(app):
+    with app.app_context():
+        user_id = add_user_with_history(n_transactions=0, n_budgets=0)
+        for date, type_, category, amount in [
+            (D(2024, 1, 7), TransactionType.EXPENSE, TransactionCategory.DINING, 10),
+            (D(2024, 1, 8), TransactionType.EXPENSE, TransactionCategory.DINING, 20),
+            (D(2024, 1, 31), TransactionType.EXPENSE, TransactionCategory.RENT, 500),
+            (D(2024, 3, 3), TransactionType.EXPENSE, TransactionCategory.DINING, 5.5),
+            (D(2024, 3, 4), TransactionType.INCOME, TransactionCategory.SALARY, 1000),
+        ]:
+            db.session.add(
+                Transaction(
+                    user_id=uuid.UUID(user_id),
+                    type=type_,
+                    category=category,
+                    date=date,
+                    amount=amount,
+                )
+            )
+        db.session.commit()
+    return user_id
+
+
+def test_monthly_series_is_zero_filled(client, headers):
+    response = client.get(
+        PATH, query_string={"from": "2024-01-15", "to": "2024-04-30"}, headers=headers
+    )
+
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "success": True,
+        "bucket": "month",
+        "buckets": ["2024-01-01", "2024-02-01", "2024-03-01", "2024-04-01"],
+        "totals": [500.0, 0, 5.5, 0],
+    }
+
+
+def test_weekly_series_with_categories_and_income(client, headers):
+    query = {"bucket": "week", "from": "2024-01-01", "to": "2024-01-14"}
+
+    dining = client.get(
+        PATH, query_string={**query, "category": "Dining"}, headers=headers
+    ).get_json()
+    income = client.get(
+        PATH, query_string={**query, "type": "income"}, headers=headers
+    ).get_json()
+
+    # Weeks start on Monday, the Sunday the 7th is in the first one
+    assert dining["buckets"] == ["2024-01-01", "2024-01-08"]
+    assert dining["totals"] == [10.0, 20.0]
+    assert income["totals"] == [0, 0]
+
+
+def test_daily_series_over_years_is_downsampled(client, headers):
+    response = client.get(
+        PATH,
+        query_string={
+            "bucket": "day",
+            "from": "2022-01-01",
+            "to": "2024-12-31",
+            "max_points": 50,
+        },
+        headers=headers,
+    )
+
+    series = response.get_json()
+    assert series["bucket"] == "month"
+    assert len(series["totals"]) == 36
+    assert sum(series["totals"]) == 535.5
+    assert series["buckets"][0] == bucket_start(D(2022, 1, 1), "month").isoformat()
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"bucket": "hour"},
+        {"from": "2024-02-30"},
+        {"from": "2024-03-01", "to": "2024-02-01"},
+        {"category": "Nope"},
+        {"type": "transfer"},
+        {"max_points": 0},
+        # More years than points
+        {"from": "0001-01-01", "to": "9000-01-01", "max_points": 1},
+    ],
+)
+def test_invalid_parameters(client, headers, params):
+    response = client.get(PATH, query_string=params, headers=headers)
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("bucket", ["day", "week", "month", "year"])
+def test_series_up_to_the_last_date(client, headers, bucket):
+    response = client.get(
+        PATH,
+        query_string={"bucket": bucket, "from": "9999-12-25", "to": "9999-12-31"},
+        headers=headers,
+    )
+
+    assert response.status_code == 200
+    assert response.get_json()["totals"][-1] == 0
@@ -0,0 +1,76 @@
+import json
+import uuid
+
+import pytest
+
+from ...extensions import db, redis_cache
+from ...routes.test.harness import add_user_with_history, count_calls, login_as
+from .. import stream_services
+
+PATH = "/api/users/me?stream=true"
+
+
+@pytest.fixture
+def user_id(app):
+    with app.app_context():
+        return add_user_with_history(n_transactions=45, n_budgets=3)
+
+
+def by_id(items: list[dict]) -> list[dict]:
+    return sorted(items, key=lambda item: item["id"])
+
+
+def test_streams_from_database_in_batches(client, headers, monkeypatch):
+    monkeypatch.setattr(stream_services, "STREAM_BATCH_SIZE", 10)
+
+    response = client.get(PATH, headers=headers, buffered=False)
+    chunks = list(response.iter_encoded())
+    response.close()
+    streamed = json.loads(b"".join(chunks))
+    # Not streamed, from the database
+    expected = client.get("/api/users/me", headers=headers).get_json()
+
+    assert response.is_streamed
+    # The prefix, five batches of transactions and the budgets
+    assert len(chunks) == 7
+    dates = [t["date"] for t in streamed["user"]["transactions"]]
+    assert dates == sorted(dates, reverse=True)
+    assert streamed["user"]["id"] == expected["user"]["id"]
+    assert by_id(streamed["user"]["transactions"]) == by_id(
+        expected["user"]["transactions"]
+    )
+    assert by_id(streamed["user"]["budgets"]) == by_id(expected["user"]["budgets"])
+
+
+def test_streams_from_cache_without_querying(app, client, headers, monkeypatch):
+    monkeypatch.setattr(stream_services, "STREAM_CHUNK_SIZE", 512)
+    expected = client.get("/api/users/me", headers=headers).get_json()
+
+    with app.app_context():
+        engine = db.engine
+    with count_calls(engine, redis_cache) as counts:
+        response = client.get(PATH, headers=headers, buffered=False)
+        chunks = list(response.iter_encoded())
+        response.close()
+    streamed = json.loads(b"".join(chunks))
+
+    assert counts.sql == 0
+    assert len(chunks) > 3
+    assert streamed["user"]["id"] == expected["user"]["id"]
+    assert streamed["user"]["transactions"] == expected["user"]["transactions"]
+    assert streamed["user"]["budgets"] == expected["user"]["budgets"]
+
+
+def test_streamed_responses_are_not_compressed(client, headers):
+    response = client.get(PATH, headers={**headers, "Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in response.headers
+    assert response.get_json()["success"]
+
+
+def test_unknown_user(app, client):
+    headers = login_as(client, str(uuid.uuid4()))
+
+    response = client.get(PATH, headers=headers)
+
+    assert response.status_code == 404
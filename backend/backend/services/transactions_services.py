@@ -1,6 +1,8 @@
 from backend.extensions import logger
+from backend.tracing import traced
 
 
+@traced("service")
 def paginate_transactions(
     transactions: list, page: int = 1, per_page: int = 20
 ) -> dict | None:
@@ -2,8 +2,9 @@ from typing import Dict
 
 from backend.extensions import db
 from backend.models.user_models import User
+from backend.tracing import traced
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import selectinload
 
 
 def is_taken(email: str) -> bool:
@@ -38,6 +39,7 @@ def add_user_account_to_db(email: str, hashed_password: str, alias: str) -> None
         print(f"An unexpected error occurred: {str(e)}")
 
 
+@traced("service")
 def get_user_with_associations(user_id: str) -> User | None:
     """Get a user object with associated data.
 
@@ -50,11 +52,14 @@ def get_user_with_associations(user_id: str) -> User | None:
     Returns:
         User: the User object with associated data such as incomes, expenses, and budgets.
     """
+    # selectinload rather than joinedload, joining both collections returns
+    # len(transactions) * len(budgets) rows
     return User.query.options(
-        joinedload(User.transactions), joinedload(User.budgets)
+        selectinload(User.transactions), selectinload(User.budgets)
     ).get(user_id)
 
 
+@traced("service")
 def serialise_user_associations(user: User) -> Dict:
     """Serialise the associations of the user object.
 
@@ -64,9 +69,13 @@ def serialise_user_associations(user: User) -> Dict:
     Returns:
         dict: a dictionary containing the user ID, incomes, expenses, and budgets.
     """
+    expense_totals = user.expense_totals()
     return {
-        "id": str(user.id),
+        "id": user.id,
         "alias": user.alias,
         "transactions": [transaction.to_dict() for transaction in user.transactions],
-        "budgets": [budget.to_dict() for budget in user.budgets],
+        "budgets": [
+            budget.to_dict(spent=expense_totals.get(budget.category, 0))
+            for budget in user.budgets
+        ],
     }
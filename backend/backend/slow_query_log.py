@@ -0,0 +1,131 @@
+"""Slow query log for the SQLAlchemy engines behind `db`.
+
+Every statement is timed with engine events, and statements slower than `SLOW_QUERY_THRESHOLD_MS`
+are logged to the `backend.slow_query` logger with their parameters redacted. The records carry the
+statement, duration and parameter types as extra fields, so they come out as JSON records through
+`logconf.logger.MyJSONFormatter` (see `logconf/logging_config.json`).
+
+On PostgreSQL a sample of slow SELECTs can also have their plan captured with
+`EXPLAIN (ANALYZE, BUFFERS)`. ANALYZE runs the statement a second time, hence the sampling.
+"""
+
+import json
+import logging
+import random
+import time
+from typing import Any, Final
+
+from backend.extensions import db
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+MAX_STATEMENT_LENGTH: Final[int] = 2000
+EXPLAIN_PREFIX: Final[str] = "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) "
+
+slow_query_logger = logging.getLogger("backend.slow_query")
+
+
+def redact_parameters(parameters: Any, executemany: bool) -> Any:
+    """Replace bound parameter values with their type names.
+
+    Statements are logged in their parameterised form, so this is all that is needed to keep
+    user data (emails, descriptions, amounts) out of the logs.
+    """
+    if executemany:
+        return {"executemany_rows": len(parameters)}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def _explain(cursor, statement: str, parameters: Any) -> Any:
+    """Run EXPLAIN ANALYZE on the DBAPI connection, bypassing engine events."""
+    explain_cursor = cursor.connection.cursor()
+    try:
+        explain_cursor.execute(EXPLAIN_PREFIX + statement, parameters)
+        plan = explain_cursor.fetchone()[0]
+        return json.loads(plan) if isinstance(plan, str) else plan
+    finally:
+        explain_cursor.close()
+
+
+class SlowQueryLog:
+    """Engine event handlers logging statements slower than a threshold.
+
+    Attributes:
+        threshold: Duration in seconds above which a statement is logged.
+        explain_sample_rate: Fraction of slow SELECTs to capture a plan for (PostgreSQL only).
+    """
+
+    def __init__(self, threshold_ms: float, explain_sample_rate: float = 0.0):
+        self.threshold = threshold_ms / 1000
+        self.explain_sample_rate = explain_sample_rate
+
+    def install(self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self.after_cursor_execute)
+
+    def before_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        context._slow_query_start = time.perf_counter()
+
+    def after_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        start = getattr(context, "_slow_query_start", None)
+        if start is None:
+            return
+
+        duration = time.perf_counter() - start
+        if duration < self.threshold:
+            return
+
+        record = {
+            "duration_ms": round(duration * 1000, 3),
+            "statement": statement[:MAX_STATEMENT_LENGTH],
+            "parameters": redact_parameters(parameters, executemany),
+            "dialect": conn.dialect.name,
+        }
+
+        if (
+            self.explain_sample_rate
+            and not executemany
+            and conn.dialect.name == "postgresql"
+            and statement.lstrip()[:6].upper() in ("SELECT", "WITH")
+            and random.random() < self.explain_sample_rate
+        ):
+            try:
+                record["explain"] = _explain(cursor, statement, parameters)
+            except Exception as e:
+                record["explain_error"] = str(e)
+
+        slow_query_logger.warning(
+            f"slow_query_log : {record['duration_ms']}ms {statement[:80]!r}",
+            extra=record,
+        )
+
+
+def init_slow_query_log(app: Flask) -> None:
+    """Install the slow query log on every engine of `db` for the app.
+
+    Config:
+        SLOW_QUERY_THRESHOLD_MS, float: statements slower than this are logged, None disables
+            the log (default 100).
+        SLOW_QUERY_EXPLAIN_SAMPLE_RATE, float: fraction of slow SELECTs to EXPLAIN ANALYZE
+            (default 0).
+    """
+    threshold_ms = app.config.get("SLOW_QUERY_THRESHOLD_MS", 100)
+    if threshold_ms is None:
+        return
+
+    slow_query_log = SlowQueryLog(
+        threshold_ms=float(threshold_ms),
+        explain_sample_rate=float(app.config.get("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", 0)),
+    )
+    with app.app_context():
+        for engine in db.engines.values():
+            slow_query_log.install(engine)
@@ -0,0 +1,175 @@
+"""Streaming parsers for bank statement files: CSV, OFX and QIF.
+
+Each parser reads a text stream incrementally and yields one `StatementRow` per transaction,
+holding the fields as they appear in the file. Validating and converting them into
+`Transaction` columns is left to `backend.services.import_services`, so every format is checked
+the same way.
+
+CSV files need a header row. The columns of `/api/transactions/export` are understood, as are
+common bank aliases (see `CSV_COLUMN_ALIASES`). Amounts are signed, negative for expenses,
+unless a `type` column says otherwise.
+"""
+
+import csv
+import html
+import re
+from dataclasses import dataclass
+from typing import Callable, Final, Iterator, TextIO
+
+# Characters per read, OFX files may be a single line
+OFX_READ_SIZE: Final[int] = 64 * 1024
+OFX_TOKEN: Final[re.Pattern] = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+# Normalised header: field. The first matching column wins.
+CSV_COLUMN_ALIASES: Final[dict[str, str]] = {
+    "date": "date",
+    "transaction date": "date",
+    "posted date": "date",
+    "amount": "amount",
+    "value": "amount",
+    "description": "description",
+    "details": "description",
+    "memo": "description",
+    "payee": "description",
+    "name": "description",
+    "type": "type",
+    "category": "category",
+    "frequency": "frequency",
+}
+
+
+@dataclass
+class StatementRow:
+    """One transaction as read from a statement.
+
+    Attributes:
+        row: The row's position in the file, the line number for CSV and QIF.
+        date: The date as written in the file.
+        amount: The signed amount as written in the file.
+        description: The payee or memo, if any.
+        type: The transaction type if the file has one.
+        category: The category if the file has one.
+        frequency: The frequency if the file has one.
+    """
+
+    row: int
+    date: str
+    amount: str
+    description: str | None = None
+    type: str | None = None
+    category: str | None = None
+    frequency: str | None = None
+
+
+def parse_csv(stream: TextIO) -> Iterator[StatementRow]:
+    """Parse a CSV statement with a header row."""
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        return
+
+    columns: dict[str, int] = {}
+    for index, name in enumerate(header):
+        field = CSV_COLUMN_ALIASES.get(name.strip().lower())
+        if field is not None and field not in columns:
+            columns[field] = index
+    missing = {"date", "amount"} - columns.keys()
+    if missing:
+        raise ValueError(f"CSV header is missing {', '.join(sorted(missing))}")
+
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        fields = {
+            field: values[index].strip() if index < len(values) else ""
+            for field, index in columns.items()
+        }
+        yield StatementRow(
+            row=reader.line_num,
+            date=fields["date"],
+            amount=fields["amount"],
+            description=fields.get("description") or None,
+            type=fields.get("type") or None,
+            category=fields.get("category") or None,
+            frequency=fields.get("frequency") or None,
+        )
+
+
+def _ofx_tokens(stream: TextIO) -> Iterator[tuple[bool, str, str]]:
+    """(closing, tag, text) for each tag, reading the stream in chunks."""
+    pending = ""
+    while True:
+        chunk = stream.read(OFX_READ_SIZE)
+        text = pending + chunk
+        # Keep back the last, possibly incomplete, tag for the next read
+        cut = text.rfind("<") if chunk else len(text)
+        for match in OFX_TOKEN.finditer(text, 0, max(cut, 0)):
+            yield match.group(1) == "/", match.group(2).upper(), match.group(3)
+        if not chunk:
+            return
+        pending = text[cut:] if cut >= 0 else ""
+
+
+def parse_ofx(stream: TextIO) -> Iterator[StatementRow]:
+    """Parse the `<STMTTRN>` records of an OFX statement, SGML (1.x) or XML (2.x)."""
+    record: dict[str, str] | None = None
+    count = 0
+    for closing, tag, text in _ofx_tokens(stream):
+        if tag == "STMTTRN":
+            if not closing:
+                record = {}
+                continue
+            if record is not None:
+                count += 1
+                yield StatementRow(
+                    row=count,
+                    date=record.get("DTPOSTED", "")[:8],
+                    amount=record.get("TRNAMT", ""),
+                    description=record.get("NAME") or record.get("MEMO"),
+                )
+            record = None
+        elif record is not None and not closing:
+            value = html.unescape(text.strip())
+            if value:
+                record[tag] = value
+
+
+def parse_qif(stream: TextIO) -> Iterator[StatementRow]:
+    """Parse a QIF bank statement. Categories (`L` lines) are kept, split lines ignored."""
+    record: dict[str, str] = {}
+    start = None
+    for line_number, line in enumerate(stream, start=1):
+        line = line.rstrip("\r\n")
+        if not line or line.startswith("!"):
+            continue
+        code, value = line[0], line[1:].strip()
+        if code == "^":
+            if record:
+                yield StatementRow(
+                    row=start,
+                    date=record.get("D", ""),
+                    amount=record.get("T") or record.get("U", ""),
+                    description=record.get("P") or record.get("M"),
+                    category=record.get("L"),
+                )
+            record, start = {}, None
+            continue
+        if start is None:
+            start = line_number
+        record.setdefault(code, value)
+
+
+PARSERS: Final[dict[str, Callable[[TextIO], Iterator[StatementRow]]]] = {
+    "csv": parse_csv,
+    "ofx": parse_ofx,
+    "qfx": parse_ofx,
+    "qif": parse_qif,
+}
+
+
+def detect_format(filename: str | None) -> str | None:
+    """The statement format for a file name's extension, None if it isn't one."""
+    if not filename or "." not in filename:
+        return None
+    extension = filename.rsplit(".", 1)[1].lower()
+    return extension if extension in PARSERS else None
@@ -0,0 +1,48 @@
+import pytest
+from sqlalchemy import inspect
+
+from .. import app as app_module
+from ..app import create_app, reset_after_fork
+from ..extensions import db
+
+
+@pytest.fixture
+def app(tmp_path):
+    return create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'app.db'}",
+        }
+    )
+
+
+def test_create_app_does_not_create_tables(app):
+    with app.app_context():
+        assert inspect(db.engine).get_table_names() == []
+
+
+def test_create_app_registers_blueprints(app):
+    assert {"auth", "budgets", "dashboard", "transactions", "users"} <= set(
+        app.blueprints
+    )
+
+
+def test_create_db_command(app):
+    result = app.test_cli_runner().invoke(args=["create-db"])
+
+    assert result.exit_code == 0
+    with app.app_context():
+        assert {"user_account", "transaction", "budget"} <= set(
+            inspect(db.engine).get_table_names()
+        )
+
+
+def test_reset_after_fork_replaces_pools(app, monkeypatch):
+    monkeypatch.setattr(app_module, "setup_logging", lambda: None)
+    with app.app_context():
+        pool = db.engine.pool
+
+    reset_after_fork(app)
+
+    with app.app_context():
+        assert db.engine.pool is not pool
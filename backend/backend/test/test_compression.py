@@ -0,0 +1,78 @@
+import gzip
+import json
+
+import pytest
+
+from .. import compression
+from ..extensions import db, redis_cache
+from ..routes.test.harness import add_user_with_history, count_calls
+
+PATH = "/api/users/me"
+
+
+@pytest.fixture
+def user_id(app):
+    with app.app_context():
+        return add_user_with_history(n_transactions=50, n_budgets=3)
+
+
+@pytest.fixture
+def gzip_only(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+
+
+def test_gzip_response(client, headers, gzip_only):
+    client.get(PATH, headers=headers)  # Cache the user, so both responses come from it
+    plain = client.get(PATH, headers=headers)
+    response = client.get(PATH, headers={**headers, "Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+    assert len(response.data) < len(plain.data)
+    assert json.loads(gzip.decompress(response.data)) == plain.get_json()
+
+
+def test_brotli_preferred(client, headers):
+    if compression.brotli is None:
+        pytest.skip("brotli is not installed")
+    response = client.get(PATH, headers={**headers, "Accept-Encoding": "gzip, br"})
+
+    assert response.headers["Content-Encoding"] == "br"
+    assert json.loads(compression.brotli.decompress(response.data))["success"]
+
+
+def test_small_responses_not_compressed(app, client, headers):
+    app.extensions["compression"]["min_size"] = 1_000_000
+    response = client.get(PATH, headers={**headers, "Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in response.headers
+
+
+def test_precompressed_body_served_without_running_route(
+    app, client, headers, gzip_only
+):
+    accept = {**headers, "Accept-Encoding": "gzip"}
+    first = client.get(PATH, headers=accept)
+
+    with app.app_context():
+        engine = db.engine
+    with count_calls(engine, redis_cache) as counts:
+        second = client.get(PATH, headers=accept)
+
+    assert second.data == first.data
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert second.headers["Content-Encoding"] == "gzip"
+    # The generation and the stored body, no SQL and no user cache read
+    assert counts.sql == 0
+    assert counts.redis == 2
+
+
+def test_encoded_etag_revalidates(client, headers, gzip_only):
+    accept = {**headers, "Accept-Encoding": "gzip"}
+    etag = client.get(PATH, headers=accept).headers["ETag"]
+
+    response = client.get(PATH, headers={**accept, "If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
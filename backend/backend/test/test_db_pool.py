@@ -0,0 +1,108 @@
+import logging
+
+import pytest
+from flask import Flask, g
+from sqlalchemy import create_engine, exc
+
+from ..app import create_app
+from ..db_pool import (
+    MeteredQueuePool,
+    _set_local_statement_timeout,
+    engine_options,
+    pool_stats,
+    statement_timeout,
+)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=MeteredQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+
+
+def test_checkout_metrics_and_gauges(engine):
+    with engine.connect():
+        stats = pool_stats(engine)
+        assert stats["checked_out"] == 1
+        assert stats["checkouts"] == 1
+
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    stats = pool_stats(engine)
+    assert stats["checked_out"] == 0
+    assert stats["timeouts"] == 1
+    assert stats["wait_max_ms"] >= 50
+
+
+def test_metrics_reset_when_pool_recreated(engine):
+    with engine.connect():
+        pass
+
+    engine.dispose(close=False)
+
+    assert isinstance(engine.pool, MeteredQueuePool)
+    assert pool_stats(engine)["checkouts"] == 0
+
+
+def test_engine_options_statement_timeout_postgresql_only():
+    postgres = engine_options("postgresql://u@h/db", statement_timeout_ms=5000)
+    sqlite = engine_options("sqlite:///flow.db", statement_timeout_ms=5000)
+
+    assert postgres["connect_args"] == {"options": "-c statement_timeout=5000"}
+    assert "connect_args" not in sqlite
+    assert sqlite["poolclass"] is MeteredQueuePool
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.statements = []
+
+    def exec_driver_sql(self, statement):
+        self.statements.append(statement)
+
+
+def test_statement_timeout_override():
+    app = Flask(__name__)
+
+    @statement_timeout(120_000)
+    def slow_route():
+        conn = RecordingConnection()
+        _set_local_statement_timeout(conn)
+        return conn.statements
+
+    with app.app_context():
+        assert slow_route() == ["SET LOCAL statement_timeout = 120000"]
+        assert g.statement_timeout_ms == 120_000
+
+
+def test_no_override_without_decorator():
+    conn = RecordingConnection()
+    with Flask(__name__).app_context():
+        _set_local_statement_timeout(conn)
+    _set_local_statement_timeout(conn)
+
+    assert conn.statements == []
+
+
+def test_pool_metrics_logged(tmp_path, caplog):
+    db_uri = f"sqlite:///{tmp_path / 'app.db'}"
+    app = create_app(
+        {
+            "SQLALCHEMY_DATABASE_URI": db_uri,
+            "SQLALCHEMY_ENGINE_OPTIONS": engine_options(db_uri),
+            "DB_POOL_METRICS_LOG_INTERVAL": 0,
+        }
+    )
+
+    with caplog.at_level(logging.INFO, logger="backend.db_pool"):
+        app.test_client().get("/api/auth/verify")
+
+    records = [r for r in caplog.records if r.name == "backend.db_pool"]
+    assert records
+    assert records[0].pool_stats["pool"] == "MeteredQueuePool"
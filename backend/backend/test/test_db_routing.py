@@ -0,0 +1,119 @@
+import datetime
+import uuid
+
+import pytest
+from flask import g
+from sqlalchemy import insert
+
+from ..db_routing import REPLICA_BIND
+from ..enums.transaction_enums import TransactionCategory, TransactionType
+from ..extensions import db
+from ..models.transaction_models import Transaction
+from ..models.user_models import User
+from ..routes.test.harness import add_user_with_history, login_as
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {"SQLALCHEMY_BINDS": {REPLICA_BIND: f"sqlite:///{tmp_path / 'replica.db'}"}}
+
+
+@pytest.fixture
+def app(app):
+    """Primary and replica SQLite databases, with the replica lagging: it has the user but
+    none of their transactions."""
+    with app.app_context():
+        db.metadata.create_all(db.engines[REPLICA_BIND])
+    return app
+
+
+@pytest.fixture
+def user_id(app):
+    with app.app_context():
+        user_id = add_user_with_history(n_transactions=5, n_budgets=1)
+        user = db.session.get(User, user_id)
+        with db.engines[REPLICA_BIND].begin() as conn:
+            conn.execute(
+                insert(User).values(
+                    id=user.id,
+                    email=user.email,
+                    password=user.password,
+                    alias="Replica",
+                )
+            )
+        return user_id
+
+
+def load_transactions(client, user_id):
+    response = client.get("/api/users/me", headers=login_as(client, user_id))
+    assert response.status_code == 200
+    return response.get_json()["user"]["transactions"]
+
+
+def test_read_only_route_uses_replica(app, user_id):
+    assert load_transactions(app.test_client(), user_id) == []
+
+
+def test_reads_stay_on_primary_after_write(app, fake_redis, user_id):
+    app.extensions["db_routing"].mark_write(user_id)
+
+    assert len(load_transactions(app.test_client(), user_id)) == 5
+
+
+def test_sticky_window_expires(app, fake_redis, user_id):
+    app.extensions["db_routing"].mark_write(user_id)
+    fake_redis.delete(f"db_sticky:{user_id}")
+
+    assert load_transactions(app.test_client(), user_id) == []
+
+
+def test_commit_starts_sticky_window(app, fake_redis, user_id):
+    with app.test_request_context():
+        g.user_id = user_id
+        g.db_read_only = True
+        assert db.session.get(User, user_id).alias == "Replica"
+
+        db.session.add(
+            Transaction(
+                user_id=user_id,
+                type=TransactionType.EXPENSE,
+                category=TransactionCategory.GROCERIES,
+                date=datetime.date(2024, 1, 1),
+                amount=1,
+                description="New",
+            )
+        )
+        db.session.commit()
+
+        # Later reads in the same request go to the primary as well
+        db.session.expire_all()
+        assert db.session.get(User, user_id).alias == "Harness"
+
+    assert fake_redis.exists(f"db_sticky:{user_id}")
+
+
+def test_routes_not_marked_read_only_use_primary(app, user_id):
+    with app.test_request_context():
+        g.user_id = user_id
+        assert len(db.session.get(User, user_id).transactions) == 5
+
+
+def test_bulk_insert_starts_sticky_window(app, fake_redis, user_id):
+    with app.test_request_context():
+        g.user_id = user_id
+        db.session.execute(
+            insert(Transaction.__table__),
+            [
+                {
+                    "id": uuid.uuid4(),
+                    "user_id": uuid.UUID(user_id),
+                    "type": TransactionType.EXPENSE,
+                    "category": TransactionCategory.GROCERIES,
+                    "date": datetime.date(2024, 1, 1),
+                    "amount": 100,
+                }
+            ],
+        )
+        db.session.commit()
+
+    assert fake_redis.exists(f"db_sticky:{user_id}")
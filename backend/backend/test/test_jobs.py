@@ -0,0 +1,212 @@
+import pathlib
+import time
+
+import fakeredis
+import pytest
+import redis
+from flask import Flask
+
+from .. import app as app_module
+from ..app import create_app
+from ..jobs import (
+    BACKOFF_SECONDS,
+    MAX_BACKOFF_SECONDS,
+    PENDING_KEY_PREFIX,
+    QUEUE_KEY,
+    InMemoryBroker,
+    Job,
+    RedisBroker,
+    Worker,
+    backoff,
+    enqueue,
+    job,
+)
+
+
+@job
+def append_line(path: str, text: str) -> None:
+    with open(path, "a") as f:
+        f.write(f"{text}\n")
+
+
+@job
+def fail_until(path: str, successes_after: str) -> None:
+    """Fails until it has been run `successes_after` times before, counted in `path`."""
+    runs = pathlib.Path(path)
+    count = int(runs.read_text()) if runs.exists() else 0
+    runs.write_text(str(count + 1))
+    if count < int(successes_after):
+        raise RuntimeError(f"run {count + 1} failed")
+
+
+def not_a_job() -> None:
+    pass
+
+
+@pytest.fixture(params=["memory", "redis"])
+def broker(request):
+    if request.param == "memory":
+        return InMemoryBroker()
+    return RedisBroker(fakeredis.FakeRedis(decode_responses=True))
+
+
+@pytest.fixture
+def app(tmp_path) -> Flask:
+    return create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'jobs.db'}",
+            "JOBS_BROKER": "memory",
+        }
+    )
+
+
+def test_jobs_are_deduplicated_until_taken(broker):
+    assert broker.push(Job("append_line", ("a", "1")))
+    assert not broker.push(Job("append_line", ("a", "1")))
+    assert broker.push(Job("append_line", ("a", "2")))
+    assert len(broker) == 2
+
+    taken = broker.pop()
+    assert taken.key == "append_line:a:1"
+    assert broker.push(Job("append_line", ("a", "1")))
+    assert [broker.pop().args, broker.pop().args] == [("a", "2"), ("a", "1")]
+    assert broker.pop() is None
+
+
+def test_scheduled_jobs_wait_until_due(broker):
+    broker.schedule(Job("append_line", ("later", "1")), time.time() + 60)
+    broker.schedule(Job("append_line", ("now", "1")), time.time() - 1)
+
+    assert broker.pop().args == ("now", "1")
+    assert broker.pop() is None
+    assert len(broker) == 1
+
+
+def test_jobs_waiting_for_a_retry_are_deduplicated(broker):
+    broker.push(Job("append_line", ("a", "1")))
+    failed = broker.pop()
+    failed.attempts = 1
+    broker.schedule(failed, time.time() - 1)
+
+    assert not broker.push(Job("append_line", ("a", "1")))
+    assert broker.pop().attempts == 1
+    assert broker.pop() is None
+
+    # Queued while the retry runs, so it runs instead of another retry
+    assert broker.push(Job("append_line", ("a", "1")))
+    broker.schedule(failed, time.time() - 1)
+    assert len(broker) == 1
+    assert broker.pop().attempts == 0
+    assert broker.pop() is None
+
+
+def test_jobs_of_a_worker_which_died_are_queued_again():
+    client = fakeredis.FakeRedis(decode_responses=True)
+    broker = RedisBroker(client, "worker-1")
+    for i in range(3):
+        broker.push(Job("append_line", ("a", str(i))))
+    finished, lost = broker.pop(), broker.pop()
+    broker.done(finished)
+    other = RedisBroker(client, "worker-2")
+    other.pop()
+
+    # worker-1 starts again, worker-2's job is still its own
+    restarted = RedisBroker(client, "worker-1")
+    assert restarted.recover() == 1
+    assert restarted.recover() == 0
+    assert restarted.pop() == lost
+    assert client.llen(other.processing_key) == 1
+
+
+def test_push_queues_nothing_if_it_fails(monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    broker = RedisBroker(client)
+    queued = Job("append_line", ("a", "1"))
+
+    def lost_connection(*args, **kwargs):
+        raise redis.ConnectionError("connection lost")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(redis.client.Pipeline, "execute", lost_connection)
+        with pytest.raises(redis.ConnectionError):
+            broker.push(queued)
+
+    assert not client.exists(f"{PENDING_KEY_PREFIX}{queued.key}", QUEUE_KEY)
+    assert broker.push(queued)
+
+
+def test_backoff_doubles_up_to_a_limit():
+    assert [backoff(attempts) for attempts in (1, 2, 3)] == [
+        BACKOFF_SECONDS,
+        2 * BACKOFF_SECONDS,
+        4 * BACKOFF_SECONDS,
+    ]
+    assert backoff(100) == MAX_BACKOFF_SECONDS
+
+
+def test_enqueue(app, tmp_path):
+    with app.app_context():
+        queued = enqueue(append_line, tmp_path / "out", 1)
+        assert enqueue(append_line, tmp_path / "out", 1) is None
+        with pytest.raises(KeyError):
+            enqueue(not_a_job)
+
+    assert queued.args == (str(tmp_path / "out"), "1")
+    assert len(app.extensions["jobs"]) == 1
+
+
+def test_worker_retries_failures_with_backoff(app, broker, tmp_path):
+    runs = tmp_path / "runs"
+    broker.push(Job("fail_until", (str(runs), "2")))
+    broker.push(Job("fail_until", (str(tmp_path / "never"), "99")))
+    delays = []
+
+    def no_backoff(attempts):
+        delays.append(attempts)
+        return 0
+
+    with app.app_context():
+        stats = Worker(
+            app, broker, processes=0, max_attempts=3, backoff=no_backoff
+        ).run(burst=True)
+
+    assert runs.read_text() == "3"
+    assert (tmp_path / "never").read_text() == "3"
+    assert sorted(delays) == [1, 1, 2, 2]
+    assert stats["fail_until"].runs == 6
+    assert stats["fail_until"].failures == 5
+    assert len(broker) == 0
+    if isinstance(broker, InMemoryBroker):
+        assert [failed.attempts for failed in broker.failed] == [3]
+    else:
+        assert broker.client.llen(broker.processing_key) == 0
+
+
+def test_worker_runs_jobs_on_a_process_pool(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "setup_logging", lambda: None)
+    out = tmp_path / "out"
+    broker = InMemoryBroker()
+    for i in range(6):
+        broker.push(Job("append_line", (str(out), str(i))))
+
+    stats = Worker(app, broker, processes=2).run(burst=True)
+
+    assert sorted(out.read_text().split()) == [str(i) for i in range(6)]
+    assert stats["append_line"].runs == 6
+    assert stats["append_line"].failures == 0
+    assert stats["append_line"].max_run_ms > 0
+
+
+def test_run_worker_command(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "setup_logging", lambda: None)
+    with app.app_context():
+        enqueue(append_line, tmp_path / "out", "hello")
+
+    result = app.test_cli_runner().invoke(
+        args=["run-worker", "--processes", "0", "--burst"]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "append_line: 1 runs, 0 failed" in result.output
+    assert (tmp_path / "out").read_text() == "hello\n"
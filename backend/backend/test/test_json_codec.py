@@ -0,0 +1,69 @@
+import datetime
+import decimal
+import uuid
+
+import pytest
+from flask import Flask, jsonify
+
+from .. import json_codec
+from ..enums.frequency_enums import Frequency
+from ..enums.transaction_enums import TransactionCategory
+from ..json_codec import FastJSONProvider, dumps, loads
+
+ID = uuid.UUID("6b85a763-cb39-41a9-883e-2a41c39da7d3")
+VALUE = {
+    "id": ID,
+    "date": datetime.date(2024, 2, 29),
+    "category": TransactionCategory.GROCERIES,
+    "frequency": Frequency.MONTHLY,
+    "amount": 12.5,
+    "description": "Café",
+    "missing": None,
+}
+EXPECTED = {
+    "id": "6b85a763-cb39-41a9-883e-2a41c39da7d3",
+    "date": "2024-02-29",
+    "category": "Groceries",
+    "frequency": "Monthly",
+    "amount": 12.5,
+    "description": "Café",
+    "missing": None,
+}
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def backend(request, monkeypatch):
+    if request.param == "stdlib":
+        monkeypatch.setattr(json_codec, "orjson", None)
+    elif json_codec.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+
+def test_roundtrip_encodes_model_types(backend):
+    assert loads(dumps(VALUE)) == EXPECTED
+
+
+def test_backends_produce_the_same_bytes(monkeypatch):
+    if json_codec.orjson is None:
+        pytest.skip("orjson is not installed")
+    fast = dumps([VALUE, decimal.Decimal("1.5")])
+    monkeypatch.setattr(json_codec, "orjson", None)
+
+    assert dumps([VALUE, decimal.Decimal("1.5")]) == fast
+
+
+def test_unsupported_type_raises(backend):
+    with pytest.raises(TypeError):
+        dumps({"value": object()})
+
+
+def test_provider_response(backend):
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+
+    with app.app_context():
+        response = jsonify(VALUE)
+
+    assert response.mimetype == "application/json"
+    assert response.get_json() == EXPECTED
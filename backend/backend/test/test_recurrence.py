@@ -0,0 +1,159 @@
+import datetime
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+from ..enums.frequency_enums import Frequency
+from ..enums.transaction_enums import TransactionCategory, TransactionType
+from ..recurrence import (
+    count_occurrences,
+    expand,
+    nth_occurrence,
+    occurrence_dates,
+    occurrence_totals,
+)
+
+D = datetime.date
+
+
+def dates(start, frequency, window_start, window_end):
+    return list(occurrence_dates(start, frequency, window_start, window_end))
+
+
+def test_monthly_occurrences_are_clamped_to_month_end():
+    assert dates(D(2024, 1, 31), Frequency.MONTHLY, D(2024, 1, 1), D(2024, 5, 31)) == [
+        D(2024, 1, 31),
+        D(2024, 2, 29),
+        D(2024, 3, 31),
+        D(2024, 4, 30),
+        D(2024, 5, 31),
+    ]
+
+
+def test_annual_occurrences_on_leap_day():
+    assert dates(
+        D(2020, 2, 29), Frequency.ANNUALLY, D(2021, 1, 1), D(2024, 12, 31)
+    ) == [
+        D(2021, 2, 28),
+        D(2022, 2, 28),
+        D(2023, 2, 28),
+        D(2024, 2, 29),
+    ]
+
+
+def test_window_starting_long_after_the_first_occurrence():
+    assert dates(D(2000, 1, 3), Frequency.WEEKLY, D(2024, 1, 1), D(2024, 1, 15)) == [
+        D(2024, 1, 1),
+        D(2024, 1, 8),
+        D(2024, 1, 15),
+    ]
+    assert dates(D(2000, 1, 15), Frequency.MONTHLY, D(2024, 1, 16), D(2024, 3, 1)) == [
+        D(2024, 2, 15)
+    ]
+
+
+def test_without_a_frequency_the_date_is_the_only_occurrence():
+    assert dates(D(2024, 1, 5), None, D(2024, 1, 1), D(2024, 12, 31)) == [D(2024, 1, 5)]
+    assert dates(D(2023, 1, 5), None, D(2024, 1, 1), D(2024, 12, 31)) == []
+    assert count_occurrences(D(2024, 1, 5), None, D(2024, 1, 1), D(2024, 1, 31)) == 1
+
+
+def test_nothing_occurs_before_the_first_occurrence_or_in_an_empty_window():
+    assert dates(D(2024, 6, 1), Frequency.DAILY, D(2024, 1, 1), D(2024, 5, 31)) == []
+    assert (
+        count_occurrences(D(2024, 1, 1), Frequency.DAILY, D(2024, 3, 1), D(2024, 2, 1))
+        == 0
+    )
+
+
+@pytest.mark.parametrize("frequency", list(Frequency))
+def test_matches_stepping_through_every_occurrence(frequency):
+    starts = [D(2023, 1, 31), D(2024, 2, 29), D(2023, 12, 15), D(2024, 3, 30)]
+    windows = [
+        (D(2022, 1, 1), D(2023, 1, 30)),
+        (D(2023, 2, 28), D(2023, 3, 31)),
+        (D(2024, 2, 1), D(2025, 3, 1)),
+        (D(2024, 3, 30), D(2024, 3, 30)),
+    ]
+    for start, (window_start, window_end) in itertools.product(starts, windows):
+        expected = []
+        for n in itertools.count():
+            date = nth_occurrence(start, frequency, n)
+            if date > window_end:
+                break
+            if date >= window_start:
+                expected.append(date)
+        assert dates(start, frequency, window_start, window_end) == expected
+        assert count_occurrences(start, frequency, window_start, window_end) == len(
+            expected
+        )
+
+
+def test_expand_merges_items_in_date_order():
+    rent = SimpleNamespace(date=D(2024, 1, 1), frequency=Frequency.MONTHLY)
+    gym = SimpleNamespace(date=D(2024, 1, 10), frequency=Frequency.BI_WEEKLY)
+    once = SimpleNamespace(date=D(2024, 2, 1), frequency=None)
+
+    occurrences = list(expand([rent, gym, once], D(2024, 1, 1), D(2024, 2, 29)))
+
+    assert [(o.date, o.item) for o in occurrences] == [
+        (D(2024, 1, 1), rent),
+        (D(2024, 1, 10), gym),
+        (D(2024, 1, 24), gym),
+        (D(2024, 2, 1), rent),
+        (D(2024, 2, 1), once),
+        (D(2024, 2, 7), gym),
+        (D(2024, 2, 21), gym),
+    ]
+
+
+def test_expand_is_lazy():
+    items = (
+        SimpleNamespace(date=D(2000, 1, 1), frequency=Frequency.DAILY)
+        for _ in range(1000)
+    )
+    occurrences = expand(items, D(2000, 1, 1), D(9999, 12, 31))
+
+    assert next(occurrences).date == D(2000, 1, 1)
+
+
+def test_occurrence_totals():
+    def item(type_, category, pence, frequency):
+        return SimpleNamespace(
+            date=D(2024, 1, 1),
+            frequency=frequency,
+            type=type_,
+            category=category,
+            _amount=pence,
+        )
+
+    totals = occurrence_totals(
+        [
+            item(
+                TransactionType.INCOME,
+                TransactionCategory.SALARY,
+                200000,
+                Frequency.MONTHLY,
+            ),
+            item(
+                TransactionType.EXPENSE,
+                TransactionCategory.LEISURE,
+                1000,
+                Frequency.WEEKLY,
+            ),
+            item(
+                TransactionType.EXPENSE,
+                TransactionCategory.LEISURE,
+                500,
+                None,
+            ),
+        ],
+        D(2024, 1, 1),
+        D(2024, 3, 31),
+    )
+
+    assert totals == {
+        (TransactionType.INCOME, TransactionCategory.SALARY): 600000,
+        (TransactionType.EXPENSE, TransactionCategory.LEISURE): 13 * 1000 + 500,
+    }
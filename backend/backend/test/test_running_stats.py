@@ -0,0 +1,78 @@
+import random
+import statistics
+
+import pytest
+
+from ..running_stats import (
+    MAX_BUCKETS,
+    RELATIVE_ACCURACY,
+    QuantileSketch,
+    RunningStats,
+)
+
+
+def test_running_stats_match_statistics():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(7, 1) for _ in range(1000)]
+
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+
+    assert stats.count == 1000
+    assert stats.mean == pytest.approx(statistics.fmean(values))
+    assert stats.variance == pytest.approx(statistics.variance(values))
+    assert RunningStats.unpack(stats.pack()) == stats
+
+
+def test_zscore():
+    stats = RunningStats()
+    assert stats.zscore(10) == 0
+    for value in (10, 10, 10):
+        stats.add(value)
+    assert stats.zscore(10) == 0
+    assert stats.zscore(11) == 0
+    assert stats.zscore(11, min_std=0.5) == 2
+    stats.add(14)
+
+    assert stats.std == 2
+    assert stats.zscore(17) == 3
+    assert stats.zscore(17, min_std=1) == 3
+    assert stats.zscore(17, min_std=3) == 2
+
+
+@pytest.mark.parametrize("q", [0, 0.1, 0.5, 0.9, 0.99, 1])
+def test_quantiles_are_within_the_relative_accuracy(q):
+    rng = random.Random(11)
+    values = sorted(rng.randint(1, 500_000) for _ in range(5000))
+
+    sketch = QuantileSketch()
+    for value in values:
+        sketch.add(value)
+
+    exact = values[int(q * (len(values) - 1))]
+    assert sketch.quantile(q) == pytest.approx(exact, rel=RELATIVE_ACCURACY)
+
+
+def test_rank_and_zeros():
+    sketch = QuantileSketch()
+    for value in [0, 0, 100, 200, 300, 400, 500, 600, 700, 800]:
+        sketch.add(value)
+
+    assert sketch.count == 10
+    assert sketch.quantile(0.1) == 0
+    assert sketch.rank(0) == 0.2
+    assert sketch.rank(450) == 0.6
+    assert sketch.rank(10_000) == 1
+    assert QuantileSketch.unpack(sketch.pack()) == sketch
+
+
+def test_buckets_are_capped_by_merging_the_lowest():
+    sketch = QuantileSketch()
+    for exponent in range(MAX_BUCKETS + 50):
+        sketch.add((1 + 2 * RELATIVE_ACCURACY) ** exponent)
+
+    assert len(sketch.buckets) == MAX_BUCKETS
+    assert sketch.count == MAX_BUCKETS + 50
+    top = (1 + 2 * RELATIVE_ACCURACY) ** (MAX_BUCKETS + 49)
+    assert sketch.quantile(1) == pytest.approx(top, rel=RELATIVE_ACCURACY)
@@ -0,0 +1,65 @@
+import logging
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from ..slow_query_log import SlowQueryLog, redact_parameters
+
+
+@pytest.fixture
+def engine():
+    return create_engine("sqlite://")
+
+
+def run_query(engine):
+    with engine.connect() as conn:
+        conn.execute(
+            text("SELECT :email AS email, :amount AS amount"),
+            {"email": "someone@example.com", "amount": 1234},
+        )
+
+
+def test_slow_statement_logged_redacted(engine, caplog):
+    SlowQueryLog(threshold_ms=0).install(engine)
+
+    with caplog.at_level(logging.WARNING, logger="backend.slow_query"):
+        run_query(engine)
+
+    records = [r for r in caplog.records if r.name == "backend.slow_query"]
+    assert len(records) == 1
+    record = records[0]
+    assert record.statement.startswith("SELECT ?")
+    assert record.parameters == ["str", "int"]
+    assert record.duration_ms >= 0
+    assert "someone@example.com" not in caplog.text
+
+
+def test_fast_statement_not_logged(engine, caplog):
+    SlowQueryLog(threshold_ms=60_000).install(engine)
+
+    with caplog.at_level(logging.WARNING, logger="backend.slow_query"):
+        run_query(engine)
+
+    assert not [r for r in caplog.records if r.name == "backend.slow_query"]
+
+
+def test_explain_only_attempted_on_postgresql(engine, caplog):
+    SlowQueryLog(threshold_ms=0, explain_sample_rate=1.0).install(engine)
+
+    with caplog.at_level(logging.WARNING, logger="backend.slow_query"):
+        run_query(engine)
+
+    record = [r for r in caplog.records if r.name == "backend.slow_query"][0]
+    assert not hasattr(record, "explain")
+
+
+@pytest.mark.parametrize(
+    "parameters, executemany, expected",
+    [
+        ({"email": "a@b.c", "id": 1}, False, {"email": "str", "id": "int"}),
+        (("a@b.c", 1.5), False, ["str", "float"]),
+        ([{"a": 1}, {"a": 2}], True, {"executemany_rows": 2}),
+    ],
+)
+def test_redact_parameters(parameters, executemany, expected):
+    assert redact_parameters(parameters, executemany) == expected
@@ -0,0 +1,103 @@
+import io
+
+import pytest
+
+from .. import statement_parsers
+from ..statement_parsers import (
+    StatementRow,
+    detect_format,
+    parse_csv,
+    parse_ofx,
+    parse_qif,
+)
+
+OFX_SGML = """OFXHEADER:100
+DATA:OFXSGML
+
+<OFX>
+<BANKMSGSRSV1><STMTTRNRS><STMTRS>
+<BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20240105120000[0:GMT]
+<TRNAMT>-12.50
+<NAME>Coffee &amp; Cake
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20240131
+<TRNAMT>2000.00
+<MEMO>Salary
+</STMTTRN>
+</BANKTRANLIST>
+</STMTRS></STMTTRNRS></BANKMSGSRSV1>
+</OFX>
+"""
+
+OFX_XML = (
+    '<?xml version="1.0"?><OFX><BANKTRANLIST>'
+    "<STMTTRN><TRNTYPE>DEBIT</TRNTYPE><DTPOSTED>20240105</DTPOSTED>"
+    "<TRNAMT>-12.50</TRNAMT><NAME>Coffee &amp; Cake</NAME></STMTTRN>"
+    "<STMTTRN><TRNTYPE>CREDIT</TRNTYPE><DTPOSTED>20240131</DTPOSTED>"
+    "<TRNAMT>2000.00</TRNAMT><MEMO>Salary</MEMO></STMTTRN>"
+    "</BANKTRANLIST></OFX>"
+)
+
+EXPECTED_OFX = [
+    StatementRow(row=1, date="20240105", amount="-12.50", description="Coffee & Cake"),
+    StatementRow(row=2, date="20240131", amount="2000.00", description="Salary"),
+]
+
+
+def test_csv_with_bank_column_names():
+    stream = io.StringIO(
+        "Transaction Date,Details,Amount,Balance\n"
+        "05/01/2024,Coffee,-12.50,100.00\n"
+        "\n"
+        "31/01/2024,Salary,2000.00,2100.00\n"
+    )
+
+    assert list(parse_csv(stream)) == [
+        StatementRow(row=2, date="05/01/2024", amount="-12.50", description="Coffee"),
+        StatementRow(row=4, date="31/01/2024", amount="2000.00", description="Salary"),
+    ]
+
+
+def test_csv_without_an_amount_column():
+    with pytest.raises(ValueError, match="amount"):
+        list(parse_csv(io.StringIO("date,description\n2024-01-01,Coffee\n")))
+
+
+@pytest.mark.parametrize("document", [OFX_SGML, OFX_XML])
+@pytest.mark.parametrize("read_size", [7, 64 * 1024])
+def test_ofx(monkeypatch, document, read_size):
+    # Small reads split tags and values across chunks
+    monkeypatch.setattr(statement_parsers, "OFX_READ_SIZE", read_size)
+
+    assert list(parse_ofx(io.StringIO(document))) == EXPECTED_OFX
+
+
+def test_qif():
+    stream = io.StringIO(
+        "!Type:Bank\n"
+        "D05/01/2024\nT-12.50\nPCoffee\nLDining\n^\n"
+        "D31/01/2024\nT2,000.00\nMSalary\n^\n"
+    )
+
+    assert list(parse_qif(stream)) == [
+        StatementRow(
+            row=2,
+            date="05/01/2024",
+            amount="-12.50",
+            description="Coffee",
+            category="Dining",
+        ),
+        StatementRow(row=7, date="31/01/2024", amount="2,000.00", description="Salary"),
+    ]
+
+
+def test_detect_format():
+    assert detect_format("statement.CSV") == "csv"
+    assert detect_format("statement.qfx") == "qfx"
+    assert detect_format("statement.pdf") is None
+    assert detect_format(None) is None
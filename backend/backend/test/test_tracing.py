@@ -0,0 +1,68 @@
+from flask import Flask, jsonify
+from sqlalchemy import create_engine, text
+
+from ..tracing import current_trace, init_tracing, span, traced
+
+
+@traced("service")
+def fake_service():
+    with span("cache", "hgetall"):
+        pass
+    return {"ok": True}
+
+
+def make_app(**config) -> Flask:
+    app = Flask(__name__)
+    app.config["TESTING"] = True
+    app.config.update(config)
+    engine = create_engine("sqlite://")
+
+    @app.route("/traced")
+    def traced_route():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return jsonify(fake_service())
+
+    init_tracing(app)
+    return app
+
+
+def test_server_timing_header_has_each_phase():
+    app = make_app(TRACING_ENABLED=True, TRACING_SAMPLE_RATE=0)
+    response = app.test_client().get("/traced")
+
+    assert response.status_code == 200
+    header = response.headers["Server-Timing"]
+    for phase in ("cache", "sql", "service", "serialise", "total"):
+        assert f"{phase};dur=" in header
+
+
+def test_tracing_disabled_adds_no_header():
+    app = make_app()
+    response = app.test_client().get("/traced")
+
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers
+
+
+def test_no_trace_outside_requests():
+    assert current_trace() is None
+    with span("cache") as s:
+        assert s is not None
+    assert fake_service() == {"ok": True}
+
+
+def test_sampled_requests_are_logged(monkeypatch):
+    records = []
+    monkeypatch.setattr(
+        "backend.tracing.logger.info",
+        lambda message, extra: records.append(extra),
+    )
+
+    app = make_app(TRACING_ENABLED=True, TRACING_SAMPLE_RATE=1.0)
+    app.test_client().get("/traced")
+
+    assert len(records) == 1
+    trace = records[0]["trace"]
+    assert trace["name"] == "GET /traced"
+    assert {s["name"] for s in trace["spans"]} >= {"fake_service", "hgetall", "SELECT"}
@@ -0,0 +1,230 @@
+"""Lightweight per-request tracing.
+
+Each request gets a `Trace` recording how long was spent in each phase: cache calls, SQL statements,
+JSON serialisation and service functions. The totals are sent back in a `Server-Timing` header
+(visible in the browser's network tab) and a sample of requests is logged as a structured record.
+
+When `TRACING_ENABLED` is off no hooks are registered at all, and the `span()`/`traced()` helpers
+reduce to a single context variable lookup.
+
+Usage:
+    @traced("service")
+    def compute_dashboard(...): ...
+
+    with span("cache", "hgetall"):
+        ...
+"""
+
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Final
+
+from backend.extensions import logger
+from flask import Flask, Response, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# The order phases are reported in the Server-Timing header
+PHASES: Final[tuple[str, ...]] = ("cache", "sql", "service", "serialise")
+
+_current_trace: ContextVar["Trace | None"] = ContextVar("current_trace", default=None)
+
+
+class Trace:
+    """The spans recorded while handling a single request."""
+
+    __slots__ = ("name", "start", "duration", "spans")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+        self.duration: float | None = None
+        self.spans: list[tuple[str, str, float, float]] = []
+
+    def add(self, phase: str, name: str, start: float, duration: float) -> None:
+        self.spans.append((phase, name, start - self.start, duration))
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self.start
+
+    def phase_totals(self) -> dict[str, tuple[float, int]]:
+        """Total duration (seconds) and number of spans for each phase."""
+        totals: dict[str, tuple[float, int]] = {}
+        for phase, _, _, duration in self.spans:
+            total, count = totals.get(phase, (0.0, 0))
+            totals[phase] = (total + duration, count + 1)
+        return totals
+
+    def server_timing(self) -> str:
+        """Format the trace as a `Server-Timing` header value, durations in milliseconds."""
+        totals = self.phase_totals()
+        metrics = [
+            f'{phase};dur={totals[phase][0] * 1000:.2f};desc="{totals[phase][1]}"'
+            for phase in PHASES
+            if phase in totals
+        ]
+        if self.duration is not None:
+            metrics.append(f"total;dur={self.duration * 1000:.2f}")
+        return ", ".join(metrics)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "phases": {
+                phase: {"duration_ms": round(total * 1000, 3), "count": count}
+                for phase, (total, count) in self.phase_totals().items()
+            },
+            "spans": [
+                {
+                    "phase": phase,
+                    "name": name,
+                    "offset_ms": round(offset * 1000, 3),
+                    "duration_ms": round(duration * 1000, 3),
+                }
+                for phase, name, offset, duration in self.spans
+            ],
+        }
+
+
+class _Span:
+    __slots__ = ("trace", "phase", "name", "start")
+
+    def __init__(self, trace: Trace, phase: str, name: str):
+        self.trace = trace
+        self.phase = phase
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.add(
+            self.phase, self.name, self.start, time.perf_counter() - self.start
+        )
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN: Final[_NoopSpan] = _NoopSpan()
+
+
+def current_trace() -> Trace | None:
+    """The trace of the request being handled, or None if it isn't being traced."""
+    return _current_trace.get()
+
+
+def span(phase: str, name: str | None = None) -> _Span | _NoopSpan:
+    """Context manager recording a span on the current trace, a no-op if there isn't one."""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return _Span(trace, phase, name or phase)
+
+
+def traced(phase: str, name: str | None = None) -> Callable:
+    """Decorator recording each call of the function as a span in `phase`.
+
+    The span is named after the function unless `name` is given.
+    """
+
+    def decorator(f: Callable) -> Callable:
+        span_name = name or f.__name__
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            trace = _current_trace.get()
+            if trace is None:
+                return f(*args, **kwargs)
+            with _Span(trace, phase, span_name):
+                return f(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_trace.get() is not None:
+        context._trace_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = _current_trace.get()
+    start = getattr(context, "_trace_start", None)
+    if trace is not None and start is not None:
+        # Only the statement's verb, the full SQL belongs in the slow query log
+        trace.add(
+            "sql",
+            statement.lstrip().split(None, 1)[0].upper(),
+            start,
+            time.perf_counter() - start,
+        )
+
+
+def _start_request_trace():
+    g._trace_token = _current_trace.set(Trace(f"{request.method} {request.path}"))
+
+
+def _finish_request_trace(response: Response) -> Response:
+    trace = _current_trace.get()
+    if trace is None:
+        return response
+
+    trace.finish()
+    response.headers["Server-Timing"] = trace.server_timing()
+
+    sample_rate = g.get("_trace_sample_rate", 0.0)
+    if sample_rate and random.random() < sample_rate:
+        logger.info(
+            f"tracing : {trace.name} {response.status_code} in {trace.duration * 1000:.2f}ms",
+            extra={"trace": trace.to_dict(), "status": response.status_code},
+        )
+    return response
+
+
+def _end_request_trace(exc: BaseException | None = None):
+    token = g.pop("_trace_token", None)
+    if token is not None:
+        _current_trace.reset(token)
+
+
+def init_tracing(app: Flask) -> None:
+    """Register request tracing on the app if `TRACING_ENABLED` is set.
+
+    Config:
+        TRACING_ENABLED, bool: turn tracing on (default False).
+        TRACING_SAMPLE_RATE, float: fraction of traced requests to log (default 0.01).
+    """
+    if not app.config.get("TRACING_ENABLED", False):
+        return
+
+    sample_rate = float(app.config.get("TRACING_SAMPLE_RATE", 0.01))
+
+    def start():
+        _start_request_trace()
+        g._trace_sample_rate = sample_rate
+
+    app.before_request(start)
+    app.after_request(_finish_request_trace)
+    app.teardown_request(_end_request_trace)
+
+    # Engine-level listeners apply to every engine, including ones created lazily after this
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    # jsonify() goes through app.json.response()
+    app.json.response = traced("serialise", "json")(app.json.response)
@@ -6,9 +6,11 @@ import pathlib
 
 
 def setup_logging():
-    config_file = pathlib.Path(
-        "/app/logconf/logging_config.json"
-    )  # preprend /app for Docker
+    config_file = (
+        pathlib.Path(__file__).resolve().parent.parent
+        / "logconf"
+        / "logging_config.json"
+    )
     with open(config_file) as f_in:
         config = json.load(f_in)
 
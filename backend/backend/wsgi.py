@@ -0,0 +1,12 @@
+"""WSGI entry point for a pre-fork server, e.g. `gunicorn -c gunicorn.conf.py backend.wsgi:app`.
+
+With `preload_app` the app is imported once in the master and workers are forked from it, so
+any connection opened before the fork must not be shared: `backend.app.reset_after_fork` is
+called from the gunicorn `post_fork` hook in every worker.
+"""
+
+from backend.app import create_app
+from backend.utils import setup_logging
+
+setup_logging()
+app = create_app()
@@ -0,0 +1,6 @@
+"""Micro and endpoint benchmarks for the backend.
+
+Run from the `backend` directory: `python -m benchmarks run` for the endpoint and service suite
+(see `benchmarks/__main__.py`), or a single micro-benchmark such as
+`python -m benchmarks.bench_login_required`.
+"""
@@ -0,0 +1,75 @@
+"""Run the benchmark suite, or compare two result files.
+
+Usage (from the `backend` directory):
+    python -m benchmarks run [--sizes 100,10000,100000] [--filter dashboard] [--out FILE]
+    python -m benchmarks compare BASELINE CURRENT [--threshold 0.1]
+
+`run` writes its results to `benchmarks/results/latest.json` by default. Keep a result file as a
+baseline (e.g. under `benchmarks/baselines/`), then `compare` it against a later run: any
+benchmark whose median is slower by more than the threshold is flagged and the exit status is 1.
+"""
+
+import argparse
+import pathlib
+import sys
+
+from benchmarks import bench_categorisation, bench_endpoints, bench_services
+from benchmarks.runner import MIN_TIME, compare, load_results, run, save_results
+from benchmarks.standins import create_standin
+
+DEFAULT_OUT = pathlib.Path(__file__).parent / "results" / "latest.json"
+
+
+def run_command(args: argparse.Namespace) -> int:
+    sizes = [int(size) for size in args.sizes.split(",")]
+    print(f"Loading users with {sizes} transactions...")
+    standin = create_standin(sizes)
+
+    with standin.app.app_context():
+        benchmarks = [
+            *bench_endpoints.benchmarks(standin),
+            *bench_services.benchmarks(standin),
+            *bench_categorisation.benchmarks(),
+        ]
+        if args.filter:
+            benchmarks = [b for b in benchmarks if args.filter in b.name]
+        results = run(benchmarks, min_time=args.min_time)
+
+    save_results(args.out, results, sizes=sizes)
+    print(f"Results written to {args.out}")
+    return 0
+
+
+def compare_command(args: argparse.Namespace) -> int:
+    regressions = compare(
+        load_results(args.baseline), load_results(args.current), args.threshold
+    )
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmark suite")
+    run_parser.add_argument("--sizes", default="100,10000,100000")
+    run_parser.add_argument("--filter", help="only run benchmarks containing this")
+    run_parser.add_argument("--min-time", type=float, default=MIN_TIME)
+    run_parser.add_argument("--out", type=pathlib.Path, default=DEFAULT_OUT)
+    run_parser.set_defaults(handler=run_command)
+
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline", type=pathlib.Path)
+    compare_parser.add_argument("current", type=pathlib.Path)
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+    compare_parser.set_defaults(handler=compare_command)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""Benchmarks of the categorisation engine, against trying each rule in turn.
+
+Descriptions look like bank statement lines: a merchant name, which a rule may match, followed
+by a location and a unique reference, so repeats within a batch don't make it cheaper.
+"""
+
+import random
+import re
+from types import SimpleNamespace
+from typing import Final, Iterator
+
+from backend.enums.transaction_enums import TransactionCategory, TransactionType
+from backend.services.categorisation_services import CategoryMatcher
+from benchmarks.runner import Benchmark
+
+KEYWORD_RULES: Final[int] = 300
+REGEX_RULES: Final[int] = 20
+SIZES: Final[tuple[int, ...]] = (10_000, 1_000_000)
+NAIVE_SIZE: Final[int] = 10_000  # the loop is too slow to time at a million
+SEED: Final[int] = 7
+
+_SYLLABLES: Final[tuple[str, ...]] = (
+    "ka", "lo", "mi", "ra", "to", "ve", "ni", "sa", "po", "du", "fe", "gri", "bo", "zen",
+)  # fmt: skip
+_TOWNS: Final[tuple[str, ...]] = ("LONDON", "LEEDS", "BRISTOL", "YORK", "BATH", "HULL")
+
+
+def make_rules(rng: random.Random) -> list[SimpleNamespace]:
+    """Keyword rules for made up merchants, and regex rules for their branches in some towns."""
+    categories = list(TransactionCategory)
+    rules = []
+    merchants = set()
+    while len(merchants) < KEYWORD_RULES:
+        merchants.add("".join(rng.choices(_SYLLABLES, k=rng.randint(2, 4))))
+    for merchant in sorted(merchants):
+        rules.append(
+            SimpleNamespace(
+                pattern=merchant,
+                is_regex=False,
+                category=rng.choice(categories),
+                type=None,
+            )
+        )
+    for i in range(REGEX_RULES):
+        # e.g. "^kalo (?:leeds|york)\b", a merchant's branches in some towns
+        merchant = rng.choice(sorted(merchants))
+        towns = "|".join(town.lower() for town in rng.sample(_TOWNS, 2))
+        rules.append(
+            SimpleNamespace(
+                pattern=rf"^{merchant} (?:{towns})\b",
+                is_regex=True,
+                category=rng.choice(categories),
+                type=TransactionType.EXPENSE,
+            )
+        )
+    rng.shuffle(rules)
+    return rules
+
+
+def make_descriptions(rng: random.Random, rules: list, n: int) -> list[str]:
+    merchants = [rule.pattern for rule in rules if not rule.is_regex]
+    descriptions = []
+    for i in range(n):
+        # A third of the descriptions match no keyword
+        name = (
+            rng.choice(merchants)
+            if i % 3
+            else "".join(rng.choices(_SYLLABLES, k=5)) + "x"
+        )
+        descriptions.append(
+            f"{name.upper()} {rng.choice(_TOWNS)} REF {rng.randrange(10**6):06d}"
+        )
+    return descriptions
+
+
+def naive_categorise(rules: list, descriptions: list[str]) -> list:
+    """Every rule tried against every description until one matches, in priority order."""
+    compiled = [
+        (
+            re.compile(
+                rule.pattern if rule.is_regex else re.escape(rule.pattern), re.I
+            ),
+            rule,
+        )
+        for rule in rules
+    ]
+    categories = []
+    for description in descriptions:
+        for pattern, rule in compiled:
+            if pattern.search(description):
+                categories.append(rule.category)
+                break
+        else:
+            categories.append(None)
+    return categories
+
+
+def benchmarks() -> Iterator[Benchmark]:
+    rng = random.Random(SEED)
+    rules = make_rules(rng)
+    matcher = CategoryMatcher(rules)
+    types = [TransactionType.EXPENSE] * max(SIZES)
+
+    yield Benchmark(
+        f"categorise.compile[rules={len(rules)}]", lambda: CategoryMatcher(rules)
+    )
+    for size in SIZES:
+        descriptions = make_descriptions(rng, rules, size)
+        yield Benchmark(
+            f"categorise.matcher[rules={len(rules)},n={size}]",
+            lambda descriptions=descriptions: matcher.categorise(
+                descriptions, types[: len(descriptions)]
+            ),
+        )
+    descriptions = make_descriptions(rng, rules, NAIVE_SIZE)
+    yield Benchmark(
+        f"categorise.naive[rules={len(rules)},n={NAIVE_SIZE}]",
+        lambda: naive_categorise(rules, descriptions),
+    )
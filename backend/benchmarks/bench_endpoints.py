@@ -0,0 +1,69 @@
+"""Benchmarks of the hot endpoints, with a warm and a cold cache."""
+
+from typing import Final, Iterator
+
+from benchmarks.runner import Benchmark
+from benchmarks.standins import BenchUser, StandIn
+from scripts.populate import PASSWORD
+
+ENDPOINTS: Final[dict[str, str]] = {
+    "dashboard": "/api/dashboard/load",
+    "budgets": "/api/budgets/load",
+    "transactions_list": "/api/transactions/list?page=1&limit=20",
+    "users_me": "/api/users/me",
+    "users_me_stream": "/api/users/me?stream=true",
+}
+
+
+def _consume(response) -> None:
+    """Read the whole body, so streamed responses are timed to their end, then close it."""
+    with response:
+        assert response.status_code == 200, response.status_code
+        response.get_data()
+
+
+def _get(standin: StandIn, user: BenchUser, path: str):
+    def call():
+        _consume(user.client.get(path, headers=user.headers))
+
+    return call
+
+
+def _warm(standin: StandIn, user: BenchUser):
+    def setup():
+        # /transactions/list reads the cache but doesn't fill it on a miss
+        if not standin.redis.exists(f"user:{user.user_id}"):
+            _consume(user.client.get(ENDPOINTS["users_me"], headers=user.headers))
+
+    return setup
+
+
+def _cold(standin: StandIn, user: BenchUser):
+    return lambda: standin.redis.delete(f"user:{user.user_id}")
+
+
+def benchmarks(standin: StandIn) -> Iterator[Benchmark]:
+    for size, user in standin.users.items():
+        for name, path in ENDPOINTS.items():
+            yield Benchmark(
+                f"endpoint.{name}.warm[n={size}]",
+                _get(standin, user, path),
+                _warm(standin, user),
+            )
+            yield Benchmark(
+                f"endpoint.{name}.cold[n={size}]",
+                _get(standin, user, path),
+                _cold(standin, user),
+            )
+
+    # Login cost doesn't depend on history size, it's dominated by password hashing
+    user = next(iter(standin.users.values()))
+
+    def login():
+        _consume(
+            user.client.post(
+                "/api/auth/login", json={"email": user.email, "password": PASSWORD}
+            )
+        )
+
+    yield Benchmark("endpoint.login", login)
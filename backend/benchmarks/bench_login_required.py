@@ -0,0 +1,87 @@
+"""Benchmark the per-request overhead of `@login_required`, with and without the revocation check.
+
+Usage:
+    python -m benchmarks.bench_login_required [--iterations N] [--redis-url URL]
+
+Without `--redis-url` an in-memory fakeredis instance stands in for Redis, so the "cold" numbers
+exclude the network round trip; point it at a local Redis to include it.
+"""
+
+import argparse
+import os
+import statistics
+import time
+from typing import Callable
+
+import fakeredis
+import redis
+from flask import Flask
+
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+
+from backend.services import revocation_services  # noqa: E402
+from backend.services.auth_services import generate_token, login_required  # noqa: E402
+
+
+def time_calls(app: Flask, token: str, view: Callable, iterations: int) -> list[float]:
+    """Time `iterations` calls of `view` inside a request carrying `token`, in microseconds."""
+    timings = []
+    with app.test_request_context(headers={"Cookie": f"jwt={token}"}):
+        for _ in range(iterations):
+            start = time.perf_counter_ns()
+            view()
+            timings.append((time.perf_counter_ns() - start) / 1000)
+    return timings
+
+
+def report(name: str, timings: list[float], baseline: float | None = None) -> float:
+    median = statistics.median(timings)
+    p99 = statistics.quantiles(timings, n=100)[98]
+    overhead = f"  (+{median - baseline:.2f} us)" if baseline is not None else ""
+    print(f"{name:<40} median {median:8.2f} us  p99 {p99:8.2f} us{overhead}")
+    return median
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20_000)
+    parser.add_argument("--redis-url", default=None)
+    args = parser.parse_args()
+
+    client = (
+        redis.Redis.from_url(args.redis_url, decode_responses=True)
+        if args.redis_url
+        else fakeredis.FakeRedis(decode_responses=True)
+    )
+    revocations = revocation_services.revocation_list
+    revocations.client = client
+
+    app = Flask(__name__)
+    view = login_required(lambda: None)
+    token, _ = generate_token(user_id="00000000-0000-0000-0000-000000000000")
+
+    app.config["TOKEN_REVOCATION_ENABLED"] = False
+    baseline = report(
+        "login_required, revocation disabled",
+        time_calls(app, token, view, args.iterations),
+    )
+
+    app.config["TOKEN_REVOCATION_ENABLED"] = True
+    revocations.clear_local_cache()
+    report(
+        "login_required, negative cache warm",
+        time_calls(app, token, view, args.iterations),
+        baseline,
+    )
+
+    revocations.negative_ttl = 0  # every lookup goes to Redis
+    revocations.clear_local_cache()
+    report(
+        "login_required, negative cache cold",
+        time_calls(app, token, view, args.iterations),
+        baseline,
+    )
+
+
+if __name__ == "__main__":
+    main()
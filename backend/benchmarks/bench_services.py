@@ -0,0 +1,74 @@
+"""Benchmarks of the service functions behind the hot endpoints."""
+
+import datetime
+from typing import Final, Iterator
+
+from backend.extensions import db
+from backend.queries.transactions_queries import get_latest_by_description
+from backend.services.anomaly_services import get_anomalies
+from backend.services.budget_services import create_budget_summary
+from backend.services.dashboard_services import compute_dashboard
+from backend.services.forecast_services import FORECAST_MAX_MONTHS, compute_forecast
+from backend.services.recurring_services import GROUP_POINTS, detect, scan_history
+from backend.services.transactions_services import paginate_transactions
+from backend.services.users_services import (
+    get_user_with_associations,
+    serialise_user_associations,
+)
+from benchmarks.runner import Benchmark
+from benchmarks.standins import StandIn
+
+# The end of the stand-in histories, see `scripts.populate.PopulateConfig`
+FORECAST_TODAY: Final[datetime.date] = datetime.date(2024, 12, 31)
+
+
+def benchmarks(standin: StandIn) -> Iterator[Benchmark]:
+    """Must be run inside an app context, the ORM objects are loaded up front."""
+    for size, bench_user in standin.users.items():
+        user = get_user_with_associations(bench_user.user_id)
+        user_data = user.to_dict()
+        transactions = user_data["transactions"]
+        middle_page = max(1, len(transactions) // 40)
+
+        yield Benchmark(
+            f"service.compute_dashboard[n={size}]",
+            lambda user_data=user_data: compute_dashboard(user_data),
+        )
+        yield Benchmark(
+            f"service.create_budget_summary[n={size}]",
+            lambda user_id=bench_user.user_id: create_budget_summary(user_id),
+        )
+        yield Benchmark(
+            f"service.compute_forecast[n={size},months={FORECAST_MAX_MONTHS}]",
+            lambda user_id=bench_user.user_id: compute_forecast(
+                user_id, FORECAST_MAX_MONTHS, FORECAST_TODAY
+            ),
+            # A fresh transaction per call like a request, one held open across thousands of
+            # calls slows SQLite's reads down
+            setup=db.session.rollback,
+        )
+        yield Benchmark(
+            f"service.scan_history[n={size}]",
+            lambda user_id=bench_user.user_id: [
+                detect(group)
+                for group in scan_history(
+                    get_latest_by_description(user_id, GROUP_POINTS)
+                ).values()
+            ],
+            setup=db.session.rollback,
+        )
+        yield Benchmark(
+            f"service.get_anomalies[n={size}]",
+            lambda user_id=bench_user.user_id: get_anomalies(user_id),
+            setup=db.session.rollback,
+        )
+        yield Benchmark(
+            f"service.paginate_transactions[n={size}]",
+            lambda transactions=transactions, page=middle_page: paginate_transactions(
+                transactions, page, 20
+            ),
+        )
+        yield Benchmark(
+            f"service.serialise_user_associations[n={size}]",
+            lambda user=user: serialise_user_associations(user),
+        )
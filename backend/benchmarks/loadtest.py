@@ -0,0 +1,342 @@
+"""Load test a running backend with many synthetic users.
+
+Logs in users created by `scripts.populate`, then replays a weighted mix of the hot endpoints from
+concurrent workers and reports latency percentiles, throughput and error rates per endpoint.
+Run from the `backend` directory against a locally running app, e.g.:
+
+    python -m benchmarks.loadtest --url https://localhost:5000 --insecure \\
+        --users 200 --concurrency 1,8,32,64 --duration 30 \\
+        --mix dashboard=5,budgets=2,transactions_list=3
+
+Each comma-separated concurrency level is run as its own stage, so one run shows where latency
+starts to climb and throughput stops growing. Pass `--populate` to reset the database at
+`--db-uri` and seed it first, `--seed` choosing the users' histories. The users logged in are
+the first `--users` of `scripts.populate`, whose emails don't depend on the seed.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import ssl
+import sys
+import threading
+import time
+import urllib.parse
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Final
+
+from benchmarks.bench_endpoints import ENDPOINTS
+from scripts.populate import (
+    PASSWORD,
+    PopulateConfig,
+    populate,
+    reset_database,
+    user_email,
+)
+from sqlalchemy import create_engine
+
+DEFAULT_MIX: Final[str] = "dashboard=5,budgets=2,transactions_list=3"
+LOGIN_PATH: Final[str] = "/api/auth/login"
+TIMEOUT: Final[float] = 30.0  # seconds
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    """Parse "name=weight,..." into endpoint weights, e.g. "dashboard=5,budgets=2"."""
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(
+                f"Unknown endpoint {name!r}, expected one of {', '.join(ENDPOINTS)}"
+            )
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise ValueError("At least one endpoint needs a positive weight")
+    return mix
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+class Connection:
+    """A keep-alive HTTP(S) connection to the app, reopened after errors."""
+
+    def __init__(self, url: str, insecure: bool = False):
+        parsed = urllib.parse.urlsplit(url)
+        self.https = parsed.scheme == "https"
+        self.host = parsed.netloc
+        self.context = ssl._create_unverified_context() if insecure else None
+        self.conn = None
+
+    def request(
+        self, method: str, path: str, headers: dict, body: bytes | None = None
+    ) -> http.client.HTTPResponse:
+        if self.conn is None:
+            if self.https:
+                self.conn = http.client.HTTPSConnection(
+                    self.host, timeout=TIMEOUT, context=self.context
+                )
+            else:
+                self.conn = http.client.HTTPConnection(self.host, timeout=TIMEOUT)
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            response.read()
+            return response
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def login(conn: Connection, email: str) -> str:
+    """Log in as `email`, returning the Cookie header value for the session."""
+    body = json.dumps({"email": email, "password": PASSWORD}).encode()
+    response = conn.request(
+        "POST", LOGIN_PATH, {"Content-Type": "application/json"}, body
+    )
+    if response.status != 200:
+        raise RuntimeError(f"Login failed for {email}: HTTP {response.status}")
+    # The cookie is marked Secure, so it is forwarded by hand rather than via a cookie jar
+    for header in response.headers.get_all("Set-Cookie") or []:
+        cookie = header.split(";", 1)[0]
+        if cookie.startswith("jwt="):
+            return cookie
+    raise RuntimeError(f"Login for {email} didn't set a session cookie")
+
+
+def login_all(
+    url: str, insecure: bool, emails: list[str], concurrency: int
+) -> list[str]:
+    """Log every user in, `concurrency` at a time. Password hashing makes this slow."""
+    cookies: list[str | None] = [None] * len(emails)
+    indices = iter(range(len(emails)))
+    lock = threading.Lock()
+
+    def worker():
+        conn = Connection(url, insecure)
+        while True:
+            with lock:
+                i = next(indices, None)
+            if i is None:
+                break
+            cookies[i] = login(conn, emails[i])
+        conn.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if None in cookies:
+        raise RuntimeError("Not every user could be logged in")
+    return cookies
+
+
+@dataclass
+class StageResult:
+    """Latencies in milliseconds and outcomes per endpoint for one concurrency level."""
+
+    concurrency: int
+    duration: float = 0.0
+    latencies: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    statuses: dict[str, Counter] = field(default_factory=lambda: defaultdict(Counter))
+    errors: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    def summary(self) -> dict[str, dict]:
+        summary = {}
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            ordered = sorted(self.latencies[name])
+            requests = len(ordered) + self.errors[name]
+            failed = self.errors[name] + sum(
+                n for status, n in self.statuses[name].items() if status >= 400
+            )
+            summary[name] = {
+                "requests": requests,
+                "throughput_rps": requests / self.duration if self.duration else 0.0,
+                "error_rate": failed / requests if requests else 0.0,
+                "p50_ms": percentile(ordered, 50),
+                "p95_ms": percentile(ordered, 95),
+                "p99_ms": percentile(ordered, 99),
+                "max_ms": ordered[-1] if ordered else 0.0,
+                "statuses": {str(k): v for k, v in sorted(self.statuses[name].items())},
+            }
+        return summary
+
+
+def run_stage(
+    url: str,
+    insecure: bool,
+    cookies: list[str],
+    mix: dict[str, float],
+    concurrency: int,
+    duration: float,
+    think_time: float,
+    seed: int,
+) -> StageResult:
+    """Replay the mix from `concurrency` workers for `duration` seconds.
+
+    Worker `i` acts as users i, i + concurrency, ... in turn, so every user is exercised. With
+    fewer users than workers, some users are shared.
+    """
+    result = StageResult(concurrency=concurrency)
+    lock = threading.Lock()
+    names, weights = list(mix), list(mix.values())
+    deadline = time.perf_counter() + duration
+
+    def worker(index: int):
+        rng = random.Random(seed * 1_000_003 + index)
+        conn = Connection(url, insecure)
+        own_cookies = cookies[index::concurrency] or [cookies[index % len(cookies)]]
+        latencies, statuses, errors = defaultdict(list), defaultdict(Counter), Counter()
+        turn = 0
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            headers = {"Cookie": own_cookies[turn % len(own_cookies)]}
+            turn += 1
+            start = time.perf_counter()
+            try:
+                response = conn.request("GET", ENDPOINTS[name], headers)
+            except (OSError, http.client.HTTPException):
+                errors[name] += 1
+                continue
+            latencies[name].append((time.perf_counter() - start) * 1000)
+            statuses[name][response.status] += 1
+            if think_time:
+                time.sleep(rng.expovariate(1 / think_time))
+        conn.close()
+
+        with lock:
+            for name in latencies:
+                result.latencies[name].extend(latencies[name])
+                result.statuses[name].update(statuses[name])
+            for name, n in errors.items():
+                result.errors[name] += n
+
+    threads = [
+        threading.Thread(target=worker, args=(i,), daemon=True)
+        for i in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result.duration = time.perf_counter() - started
+    return result
+
+
+def print_stage(result: StageResult):
+    print(f"\nconcurrency {result.concurrency} ({result.duration:.1f}s)")
+    print(
+        f"{'endpoint':<20} {'requests':>9} {'req/s':>8} {'errors':>7} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    )
+    total = 0
+    for name, stats in result.summary().items():
+        total += stats["requests"]
+        print(
+            f"{name:<20} {stats['requests']:>9} {stats['throughput_rps']:>8.1f} "
+            f"{stats['error_rate']:>7.1%} {stats['p50_ms']:>9.1f} "
+            f"{stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}"
+        )
+    print(f"{'total':<20} {total:>9} {total / result.duration:>8.1f}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument(
+        "--insecure", action="store_true", help="don't verify TLS certificates"
+    )
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=PopulateConfig.seed)
+    parser.add_argument(
+        "--concurrency", default="1,8,32", help="comma-separated worker counts"
+    )
+    parser.add_argument("--duration", type=float, default=30, help="seconds per stage")
+    parser.add_argument(
+        "--think-time", type=float, default=0, help="mean seconds between requests"
+    )
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--login-concurrency", type=int, default=8)
+    parser.add_argument("--out", help="write the per-stage summaries as JSON")
+    parser.add_argument(
+        "--populate",
+        action="store_true",
+        help="reset and seed the database at --db-uri first",
+    )
+    parser.add_argument("--db-uri", default=os.environ.get("FLOW_DB_URI"))
+    parser.add_argument(
+        "--transactions-per-user",
+        type=int,
+        default=PopulateConfig.transactions_per_user,
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    if args.populate:
+        if not args.db_uri:
+            raise SystemExit("Set FLOW_DB_URI or pass --db-uri to populate")
+        config = PopulateConfig(
+            users=args.users,
+            seed=args.seed,
+            transactions_per_user=args.transactions_per_user,
+        )
+        # Users are generated from their index, so a second run would clash with the first's
+        reset_database(create_engine(args.db_uri))
+        populate(args.db_uri, config, workers=os.cpu_count() or 1)
+
+    print(f"Logging in {args.users} users...")
+    emails = [user_email(i) for i in range(args.users)]
+    cookies = login_all(args.url, args.insecure, emails, args.login_concurrency)
+
+    summaries = []
+    for level in levels:
+        result = run_stage(
+            args.url,
+            args.insecure,
+            cookies,
+            mix,
+            level,
+            args.duration,
+            args.think_time,
+            args.seed,
+        )
+        print_stage(result)
+        summaries.append(
+            {
+                "concurrency": level,
+                "duration_s": result.duration,
+                "endpoints": result.summary(),
+            }
+        )
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"url": args.url, "mix": mix, "stages": summaries}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""Timing, baseline storage and comparison for the benchmark suite."""
+
+import datetime
+import json
+import pathlib
+import platform
+import statistics
+import subprocess
+import time
+from dataclasses import dataclass
+from typing import Callable, Final, Iterable
+
+MIN_ITERATIONS: Final[int] = 3
+MAX_ITERATIONS: Final[int] = 1000
+MIN_TIME: Final[float] = 1.0  # seconds spent measuring each benchmark
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    """A named function to time, with optional untimed setup run before every call.
+
+    Attributes:
+        name: Unique name, e.g. "endpoint.dashboard.warm[n=10000]".
+        func: The code being measured.
+        setup: Run before each call of `func`, outside the timed region.
+    """
+
+    name: str
+    func: Callable[[], object]
+    setup: Callable[[], object] | None = None
+
+
+def measure(benchmark: Benchmark, min_time: float = MIN_TIME) -> dict:
+    """Time a benchmark for at least `min_time` seconds and MIN_ITERATIONS calls.
+
+    Returns:
+        dict: median, mean, p95, min and max in milliseconds, plus the iteration count.
+    """
+    # One untimed call to warm caches, imports and connection pools
+    if benchmark.setup:
+        benchmark.setup()
+    benchmark.func()
+
+    timings: list[float] = []
+    started = time.perf_counter()
+    while len(timings) < MAX_ITERATIONS and (
+        len(timings) < MIN_ITERATIONS or time.perf_counter() - started < min_time
+    ):
+        if benchmark.setup:
+            benchmark.setup()
+        start = time.perf_counter()
+        benchmark.func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    return {
+        "median_ms": round(statistics.median(timings), 4),
+        "mean_ms": round(statistics.fmean(timings), 4),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 4),
+        "min_ms": round(timings[0], 4),
+        "max_ms": round(timings[-1], 4),
+        "iterations": len(timings),
+    }
+
+
+def run(benchmarks: Iterable[Benchmark], min_time: float = MIN_TIME) -> dict:
+    """Measure each benchmark, printing results as they complete."""
+    results = {}
+    for benchmark in benchmarks:
+        results[benchmark.name] = stats = measure(benchmark, min_time)
+        print(
+            f"{benchmark.name:<60} median {stats['median_ms']:10.3f} ms  "
+            f"p95 {stats['p95_ms']:10.3f} ms  ({stats['iterations']} runs)"
+        )
+    return results
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(path: pathlib.Path, results: dict, **meta) -> None:
+    """Write results to a JSON file, along with what they were measured on."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    document = {
+        "meta": {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            **meta,
+        },
+        "results": results,
+    }
+    path.write_text(json.dumps(document, indent=2, sort_keys=True))
+
+
+def load_results(path: pathlib.Path) -> dict:
+    return json.loads(path.read_text())["results"]
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """Compare medians of two result sets, printing a table of changes.
+
+    Args:
+        baseline, dict: results of a previous run.
+        current, dict: results of this run.
+        threshold, float: relative slowdown counted as a regression, e.g. 0.1 for 10%.
+
+    Returns:
+        list[str]: names of the benchmarks which regressed.
+    """
+    regressions = []
+    for name in sorted(set(baseline) | set(current)):
+        if name not in current or name not in baseline:
+            status = "missing" if name not in current else "new"
+            print(f"{name:<60} {status}")
+            continue
+
+        before, after = baseline[name]["median_ms"], current[name]["median_ms"]
+        change = (after - before) / before if before else 0.0
+        status = ""
+        if change > threshold:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            status = "improved"
+        print(
+            f"{name:<60} {before:10.3f} -> {after:10.3f} ms  {change:+7.1%}  {status}".rstrip()
+        )
+    return regressions
@@ -0,0 +1,90 @@
+"""A local stand-in environment for the benchmarks.
+
+The app runs against an SQLite database in a temporary directory (or the database at
+`BENCH_DB_URI`, e.g. a local PostgreSQL) and an in-memory fakeredis server. Users are generated
+with the seeded generator from `scripts.populate`, one per history size.
+"""
+
+import os
+import pathlib
+import tempfile
+from dataclasses import dataclass
+
+import fakeredis
+from backend.extensions import db, redis_cache
+from backend.routes.test.harness import create_harness_app, login_as, use_fake_redis
+from flask import Flask
+from flask.testing import FlaskClient
+from scripts.populate import (
+    BUDGET_COLUMNS,
+    TRANSACTION_COLUMNS,
+    PopulateConfig,
+    bulk_insert,
+    generate_user,
+    user_email,
+)
+
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+
+BENCH_SEED = 1234
+
+
+@dataclass
+class BenchUser:
+    """A generated user with a history of `size` transactions, and a client logged in as them.
+
+    Each user gets their own client since the session cookie lives on the client.
+    """
+
+    size: int
+    user_id: str
+    email: str
+    client: FlaskClient
+    headers: dict[str, str]
+
+
+@dataclass
+class StandIn:
+    app: Flask
+    redis: fakeredis.FakeRedis
+    users: dict[int, BenchUser]
+
+
+def create_standin(sizes: list[int]) -> StandIn:
+    """Build the app and load one user per history size."""
+    tmp = pathlib.Path(tempfile.mkdtemp(prefix="flow-bench-"))
+    fake_redis = use_fake_redis(redis_cache)
+    app = create_harness_app(os.getenv("BENCH_DB_URI", f"sqlite:///{tmp / 'bench.db'}"))
+    app.config["TESTING"] = False
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        engine = db.engine
+
+    # The password is hashed once, with the same parameters as real accounts
+    from backend.services.auth_services import hash_password
+    from scripts.populate import PASSWORD
+
+    password_hash = hash_password(PASSWORD)
+    users = {}
+    for index, size in enumerate(sizes, start=1):
+        config = PopulateConfig(
+            seed=BENCH_SEED, transactions_per_user=size, size_distribution="fixed"
+        )
+        user, transactions, budgets = generate_user(index, config, password_hash)
+        bulk_insert(
+            engine, "user_account", ("id", "email", "password", "alias"), [user]
+        )
+        bulk_insert(engine, "transaction", TRANSACTION_COLUMNS, transactions)
+        bulk_insert(engine, "budget", BUDGET_COLUMNS, budgets)
+        client = app.test_client()
+        users[size] = BenchUser(
+            size=size,
+            user_id=user[0],
+            email=user_email(index),
+            client=client,
+            headers=login_as(client, user[0]),
+        )
+
+    return StandIn(app=app, redis=fake_redis, users=users)
@@ -0,0 +1,37 @@
+"""Gunicorn settings, see https://docs.gunicorn.org/en/stable/settings.html."""
+
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", "1"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+
+# Import the app once in the master so workers share its memory copy-on-write
+preload_app = True
+
+if os.path.exists("certs/localhost.pem"):
+    certfile = "certs/localhost.pem"
+    keyfile = "certs/localhost-key.pem"
+
+# No collections while the app is imported, so preloaded objects aren't moved between
+# generations (which writes to their pages) before the fork
+gc.disable()
+
+
+def when_ready(server):
+    # Move everything allocated so far out of the collector's reach, so collections in the
+    # workers don't touch, and copy, the shared pages
+    gc.freeze()
+    gc.enable()
+
+
+def post_fork(server, worker):
+    from backend.app import reset_after_fork
+    from backend.wsgi import app
+
+    reset_after_fork(app)
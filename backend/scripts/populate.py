@@ -1,179 +1,556 @@
+"""Populate the database with seeded, synthetic users, transactions and budgets.
+
+Generates N users with realistic histories: a handful of recurring items (salary, rent, bills) stored
+as single rows with a `Frequency`, monthly payments as they'd appear on a bank statement, and
+discretionary spending spread across the expense `TransactionCategory`s. History sizes follow a
+configurable distribution, so a few heavy users sit alongside many light ones.
+
+Every user is generated from `(seed, user index)` alone, so the same arguments always produce the
+same database regardless of the number of workers, and benchmarks can be reproduced. Users are split
+into shards which are generated and bulk loaded in parallel, with `COPY` on PostgreSQL and batched
+`executemany` elsewhere.
+
+Usage (from the `backend` directory):
+    python -m scripts.populate --reset --users 20000 --transactions-per-user 500 --workers 8
+
+All users have the password `password`. User 0 is the demo account `example@mail.com`.
+"""
+
+import argparse
+import csv
+import datetime
+import io
+import math
 import os
-from datetime import timedelta
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from multiprocessing import Pool
+from typing import Final, Iterator
 
-from backend.app import app
-from backend.enums.transaction_enums import Frequency, TransactionCategory
+from backend.enums.frequency_enums import Frequency
+from backend.enums.transaction_enums import TransactionCategory, TransactionType
 from backend.extensions import db
+
+# Imported for their tables, so `--reset` drops and creates every one
+from backend.models import (  # noqa: F401
+    budget_evaluation_models,
+    category_rule_models,
+)
 from backend.models.budget_models import Budget
-from backend.models.transaction_models import Transaction, TransactionType
+from backend.models.transaction_models import Fingerprinter, Transaction
 from backend.models.user_models import User
 from backend.services.auth_services import hash_password
-from sqlalchemy import select, text
+from sqlalchemy import Engine, create_engine, text
 
-"""A script to populate the database with test data."""
+DEMO_EMAIL: Final[str] = "example@mail.com"
+PASSWORD: Final[str] = "password"
 
-# Flask app configuration
-app.config["SECRET_KEY"] = os.environ["FLASK_SECRET_KEY"]  # for session
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ["FLOW_DB_URI"]  # for PSQL
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["PERMANENT_SESSION_LIFETIME"] = timedelta(minutes=30)
+TRANSACTION_COLUMNS: Final[tuple[str, ...]] = (
+    "id",
+    "user_id",
+    "type",
+    "category",
+    "date",
+    "frequency",
+    "amount",
+    "description",
+    "fingerprint",
+)
+BUDGET_COLUMNS: Final[tuple[str, ...]] = (
+    "id",
+    "user_id",
+    "category",
+    "frequency",
+    "amount",
+)
 
+# Discretionary spending: (relative frequency, median amount in pounds, lognormal sigma, merchants)
+DISCRETIONARY: Final[dict[TransactionCategory, tuple[float, float, float, tuple]]] = {
+    TransactionCategory.GROCERIES: (
+        0.30,
+        28.0,
+        0.6,
+        ("Tesco", "Sainsbury's", "Aldi", "Lidl", "Co-op", "Waitrose"),
+    ),
+    TransactionCategory.DINING: (
+        0.20,
+        18.0,
+        0.7,
+        ("Pret A Manger", "Nando's", "Wagamama", "Greggs", "Local Cafe"),
+    ),
+    TransactionCategory.ALCOHOL: (
+        0.10,
+        22.0,
+        0.6,
+        ("The Crown", "Red Lion", "BrewDog", "Majestic Wine"),
+    ),
+    TransactionCategory.LEISURE: (
+        0.12,
+        25.0,
+        0.9,
+        ("Odeon", "Waterstones", "Steam", "Amazon"),
+    ),
+    TransactionCategory.HEALTH: (0.06, 15.0, 0.8, ("Boots", "Superdrug", "Dentist")),
+    TransactionCategory.SPORT: (0.08, 12.0, 0.7, ("Decathlon", "Sports Direct")),
+    TransactionCategory.GIGS: (
+        0.05,
+        45.0,
+        0.5,
+        ("Ticketmaster", "Dice", "See Tickets"),
+    ),
+    TransactionCategory.EVENT: (
+        0.04,
+        60.0,
+        0.8,
+        ("Eventbrite", "Wedding Gift", "Party"),
+    ),
+    TransactionCategory.UTILITIES: (0.05, 40.0, 0.5, ("Thames Water", "EE", "Octopus")),
+}
 
-def reset_database():
-    """Drops all tables in the database and recreates them."""
+# Items stored once with a frequency: (type, category, frequency, median pounds, sigma, description)
+RECURRING: Final[tuple[tuple, ...]] = (
+    (
+        TransactionType.INCOME,
+        TransactionCategory.SALARY,
+        Frequency.MONTHLY,
+        2400.0,
+        0.35,
+        "Salary",
+    ),
+    (
+        TransactionType.EXPENSE,
+        TransactionCategory.RENT,
+        Frequency.MONTHLY,
+        950.0,
+        0.3,
+        "Rent",
+    ),
+    (
+        TransactionType.EXPENSE,
+        TransactionCategory.UTILITIES,
+        Frequency.MONTHLY,
+        120.0,
+        0.3,
+        "Energy bill",
+    ),
+    (
+        TransactionType.INCOME,
+        TransactionCategory.INTEREST,
+        Frequency.ANNUALLY,
+        80.0,
+        0.8,
+        "Savings interest",
+    ),
+)
 
-    def _drop_all():
-        """SQLAlchemy doesn't provide a CASCADE drop_all method, so we have to do it manually."""
-        for table in db.metadata.sorted_tables:
-            db.session.execute(text(f"DROP TABLE IF EXISTS {table.name} CASCADE"))
-            db.session.commit()
+# Payments which repeat on a statement as separate rows: (category, pounds, description)
+STATEMENT_SUBSCRIPTIONS: Final[tuple[tuple, ...]] = (
+    (TransactionCategory.SUBSCRIPTION, 10.99, "Netflix"),
+    (TransactionCategory.SUBSCRIPTION, 11.99, "Spotify"),
+    (TransactionCategory.SUBSCRIPTION, 8.99, "Amazon Prime"),
+    (TransactionCategory.SPORT, 34.99, "PureGym"),
+)
 
-    with app.app_context():
-        _drop_all()
-        db.create_all()
-    print("Database reset.")
+OCCASIONAL_INCOME: Final[tuple[tuple, ...]] = (
+    (TransactionCategory.REFUND, 25.0, "Refund"),
+    (TransactionCategory.GIFT, 50.0, "Gift"),
+    (TransactionCategory.BONUS, 500.0, "Bonus"),
+    (TransactionCategory.DIVIDEND, 40.0, "Dividend"),
+)
+OCCASIONAL_INCOME_SHARE: Final[float] = 0.02
 
 
-def add_test_user():
-    """Adds a test user to the database."""
-    print("Adding test user...")
-    h_password = hash_password("password")
-    test_user = User(
-        email="example@mail.com", password=h_password, alias="Captain Test"
-    )
-    db.session.add(test_user)
-    db.session.commit()
-    print("Test user added.")
-
-
-def get_test_user_id():
-    """Gets the user_id of the test user."""
-    print("Getting test user_id...")
-    return db.session.execute(
-        select(User.id).where(User.email == "example@mail.com")
-    ).first()
-
-
-def add_test_income(test_user_id):
-    print("Adding test income data...")
-    test_income_1 = Transaction(
-        user_id=test_user_id,
-        type=TransactionType.INCOME,
-        category=TransactionCategory.SALARY,
-        date="2021-01-01",
-        frequency=Frequency.MONTHLY,
-        amount=2000,
-        description="An example of some income",
-    )
-    test_income_2 = Transaction(
-        user_id=test_user_id,
-        type=TransactionType.INCOME,
-        category=TransactionCategory.INTEREST,
-        date="2021-01-01",
-        frequency=Frequency.ANNUALLY,
-        amount=100,
-        description="An example of some interest",
+@dataclass(frozen=True)
+class PopulateConfig:
+    """What to generate.
+
+    Attributes:
+        users: Number of users.
+        seed: Seed from which every user is derived.
+        start, end: The date range transactions fall in.
+        transactions_per_user: Median transactions per user (the exact count for "fixed").
+        size_distribution: "fixed", "lognormal" or "pareto" spread of history sizes.
+        size_sigma: Spread of the lognormal distribution / shape of the pareto one.
+        max_transactions_per_user: Upper bound on any user's history.
+        budgets_per_user: Budgets per user, on distinct expense categories.
+    """
+
+    users: int = 100
+    seed: int = 42
+    start: datetime.date = datetime.date(2020, 1, 1)
+    end: datetime.date = datetime.date(2024, 12, 31)
+    transactions_per_user: int = 200
+    size_distribution: str = "lognormal"
+    size_sigma: float = 1.0
+    max_transactions_per_user: int = 1_000_000
+    budgets_per_user: int = 3
+    category_weights: dict = field(
+        default_factory=lambda: {c: w[0] for c, w in DISCRETIONARY.items()}
     )
-    db.session.add(test_income_1)
-    db.session.add(test_income_2)
-    db.session.commit()
-    print("Test income data added.")
-
-
-def add_test_expense(test_user_id):
-    print("Adding test expense data...")
-    test_expense_1 = Transaction(
-        user_id=test_user_id,
-        type=TransactionType.EXPENSE,
-        amount=100,
-        description="Test transaction 1",
-        date="2021-01-01",
-        category=TransactionCategory.RENT,
+
+
+def user_email(index: int) -> str:
+    """The email of the `index`th generated user, e.g. for logging in during load tests."""
+    return DEMO_EMAIL if index == 0 else f"user{index}@flow.test"
+
+
+def user_rng(seed: int, index: int) -> random.Random:
+    """The random generator for one user, independent of every other user."""
+    return random.Random(f"{seed}:{index}")
+
+
+def random_uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def transaction_count(rng: random.Random, config: PopulateConfig) -> int:
+    """Draw the size of a user's history from the configured distribution."""
+    median = config.transactions_per_user
+    if config.size_distribution == "fixed":
+        count = median
+    elif config.size_distribution == "lognormal":
+        count = rng.lognormvariate(math.log(median), config.size_sigma)
+    elif config.size_distribution == "pareto":
+        # Scale so the median of the distribution is `median`
+        alpha = max(config.size_sigma, 0.1)
+        count = median / 2 ** (1 / alpha) * rng.paretovariate(alpha)
+    else:
+        raise ValueError(f"Unknown size distribution {config.size_distribution!r}")
+    return max(1, min(int(count), config.max_transactions_per_user))
+
+
+def pence(rng: random.Random, median: float, sigma: float) -> int:
+    return max(1, int(rng.lognormvariate(math.log(median), sigma) * 100))
+
+
+def generate_user(
+    index: int, config: PopulateConfig, password_hash: str
+) -> tuple[tuple, list[tuple], list[tuple]]:
+    """Generate one user, their transactions and budgets as rows ready for bulk loading.
+
+    Enums are given by name, as that is how SQLAlchemy's `Enum` type stores them.
+
+    Returns:
+        tuple: (user row, transaction rows, budget rows).
+    """
+    rng = user_rng(config.seed, index)
+    user_id = random_uuid(rng)
+    alias = "Captain Test" if index == 0 else f"User {index}"
+    user = (str(user_id), user_email(index), password_hash, alias)
+
+    n_transactions = transaction_count(rng, config)
+    days = (config.end - config.start).days + 1
+    transactions: list[tuple] = []
+    # Rows like statement lines are fingerprinted as an import would, so that importing a
+    # statement overlapping them doesn't add them again
+    fingerprint = Fingerprinter(user_id)
+
+    def add(ttype, category, date, frequency, amount, description):
+        transactions.append(
+            (
+                str(random_uuid(rng)),
+                str(user_id),
+                ttype.name,
+                category.name,
+                date.isoformat(),
+                frequency.name if frequency else None,
+                amount,
+                description,
+                (
+                    fingerprint(ttype, date, amount, description)
+                    if frequency is None
+                    else None
+                ),
+            )
+        )
+
+    # Recurring items, a single row each dated at their first occurrence
+    for ttype, category, frequency, median, sigma, description in RECURRING:
+        if len(transactions) >= n_transactions:
+            break
+        first = config.start + datetime.timedelta(days=rng.randrange(min(days, 28)))
+        add(ttype, category, first, frequency, pence(rng, median, sigma), description)
+
+    # Statement style monthly payments, one row per month
+    subscriptions = rng.sample(STATEMENT_SUBSCRIPTIONS, rng.randint(0, 3))
+    for category, pounds, description in subscriptions:
+        day = rng.randint(1, 28)
+        year, month = config.start.year, config.start.month
+        while len(transactions) < n_transactions // 4:
+            date = datetime.date(year, month, day)
+            if date > config.end:
+                break
+            if date >= config.start:
+                add(
+                    TransactionType.EXPENSE,
+                    category,
+                    date,
+                    None,
+                    int(pounds * 100),
+                    description,
+                )
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    # Discretionary spending and the odd one-off income fill the rest
+    categories = list(config.category_weights)
+    weights = list(config.category_weights.values())
+    remaining = n_transactions - len(transactions)
+    for category in rng.choices(categories, weights=weights, k=max(remaining, 0)):
+        date = config.start + datetime.timedelta(days=rng.randrange(days))
+        if rng.random() < OCCASIONAL_INCOME_SHARE:
+            income_category, median, description = rng.choice(OCCASIONAL_INCOME)
+            add(
+                TransactionType.INCOME,
+                income_category,
+                date,
+                None,
+                pence(rng, median, 0.6),
+                description,
+            )
+            continue
+        _, median, sigma, merchants = DISCRETIONARY[category]
+        add(
+            TransactionType.EXPENSE,
+            category,
+            date,
+            None,
+            pence(rng, median, sigma),
+            rng.choice(merchants),
+        )
+
+    budget_categories = rng.sample(
+        list(DISCRETIONARY), min(config.budgets_per_user, len(DISCRETIONARY))
     )
-    test_expense_2 = Transaction(
-        user_id=test_user_id,
-        type=TransactionType.EXPENSE,
-        amount=50,
-        description="Test transaction 2",
-        date="2021-01-02",
-        category=TransactionCategory.MORTGAGE,
+    budgets = [
+        (
+            str(random_uuid(rng)),
+            str(user_id),
+            category.name,
+            Frequency.MONTHLY.name,
+            pence(rng, DISCRETIONARY[category][1] * 8, 0.4),
+        )
+        for category in budget_categories
+    ]
+
+    return user, transactions, budgets
+
+
+def bulk_insert(engine: Engine, table: str, columns: tuple, rows: list[tuple]) -> None:
+    """Insert rows with COPY on PostgreSQL, or a batched executemany elsewhere."""
+    if not rows:
+        return
+
+    if engine.dialect.name == "postgresql":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        connection = engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.copy_expert(
+                    f'COPY "{table}" ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)',
+                    buffer,
+                )
+            connection.commit()
+        finally:
+            connection.close()
+        return
+
+    # SQLite etc. store UUIDs as 32 character hex strings
+    uuid_columns = [
+        i for i, column in enumerate(columns) if column in ("id", "user_id")
+    ]
+    rows = [
+        tuple(
+            uuid.UUID(value).hex if i in uuid_columns else value
+            for i, value in enumerate(row)
+        )
+        for row in rows
+    ]
+    placeholders = ", ".join("?" for _ in columns)
+    connection = engine.raw_connection()
+    try:
+        connection.cursor().executemany(
+            f'INSERT INTO "{table}" ({", ".join(columns)}) VALUES ({placeholders})',
+            rows,
+        )
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def load_shard(args: tuple) -> tuple[int, int, int]:
+    """Generate and load users [first, last) in batches. Runs in a worker process.
+
+    Returns:
+        tuple: (users, transactions, budgets) loaded.
+    """
+    db_uri, config, password_hash, first, last, batch_size = args
+    engine = create_engine(db_uri)
+
+    users: list[tuple] = []
+    transactions: list[tuple] = []
+    budgets: list[tuple] = []
+    totals = [0, 0, 0]
+
+    def flush():
+        # Users first, transactions and budgets reference them
+        bulk_insert(
+            engine, User.__tablename__, ("id", "email", "password", "alias"), users
+        )
+        bulk_insert(
+            engine, Transaction.__tablename__, TRANSACTION_COLUMNS, transactions
+        )
+        bulk_insert(engine, Budget.__tablename__, BUDGET_COLUMNS, budgets)
+        totals[0] += len(users)
+        totals[1] += len(transactions)
+        totals[2] += len(budgets)
+        users.clear()
+        transactions.clear()
+        budgets.clear()
+
+    for index in range(first, last):
+        user, user_transactions, user_budgets = generate_user(
+            index, config, password_hash
+        )
+        users.append(user)
+        transactions.extend(user_transactions)
+        budgets.extend(user_budgets)
+        if len(transactions) >= batch_size:
+            flush()
+    flush()
+
+    engine.dispose()
+    return tuple(totals)
+
+
+def shards(n_users: int, n_shards: int) -> Iterator[tuple[int, int]]:
+    """Split user indexes [0, n_users) into contiguous ranges."""
+    size = math.ceil(n_users / n_shards)
+    for first in range(0, n_users, size):
+        yield first, min(first + size, n_users)
+
+
+def reset_database(engine: Engine) -> None:
+    """Drops all tables in the database and recreates them."""
+    with engine.begin() as conn:
+        for table in reversed(db.metadata.sorted_tables):
+            cascade = " CASCADE" if engine.dialect.name == "postgresql" else ""
+            conn.execute(text(f'DROP TABLE IF EXISTS "{table.name}"{cascade}'))
+    db.metadata.create_all(engine)
+    print("Database reset.")
+
+
+def populate(
+    db_uri: str, config: PopulateConfig, workers: int = 1, batch_size: int = 50_000
+) -> tuple[int, int, int]:
+    """Generate and load the dataset described by `config`.
+
+    Returns:
+        tuple: (users, transactions, budgets) loaded.
+    """
+    engine = create_engine(db_uri)
+    if engine.dialect.name == "sqlite":
+        workers = 1  # SQLite allows a single writer
+    engine.dispose()
+
+    # Hashing is deliberately slow, every synthetic user shares the one password
+    password_hash = hash_password(PASSWORD)
+    # More shards than workers keeps every worker busy despite uneven history sizes
+    tasks = [
+        (db_uri, config, password_hash, first, last, batch_size)
+        for first, last in shards(config.users, workers * 4)
+    ]
+
+    totals = [0, 0, 0]
+    started = time.perf_counter()
+
+    def report(loaded):
+        for i, n in enumerate(loaded):
+            totals[i] += n
+        elapsed = time.perf_counter() - started
+        print(
+            f"{totals[0]}/{config.users} users, {totals[1]} transactions "
+            f"({totals[1] / elapsed:,.0f} rows/s)"
+        )
+
+    if workers == 1:
+        for task in tasks:
+            report(load_shard(task))
+    else:
+        with Pool(workers) as pool:
+            for loaded in pool.imap_unordered(load_shard, tasks):
+                report(loaded)
+
+    return tuple(totals)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-uri", default=os.environ.get("FLOW_DB_URI"))
+    parser.add_argument("--reset", action="store_true", help="drop and recreate tables")
+    parser.add_argument("--users", type=int, default=PopulateConfig.users)
+    parser.add_argument("--seed", type=int, default=PopulateConfig.seed)
+    parser.add_argument(
+        "--start", type=datetime.date.fromisoformat, default=PopulateConfig.start
     )
-    test_expense_3 = Transaction(
-        user_id=test_user_id,
-        type=TransactionType.EXPENSE,
-        amount=75.25,
-        description="Test transaction 3",
-        date="2021-01-03",
-        category=TransactionCategory.UTILITIES,
+    parser.add_argument(
+        "--end", type=datetime.date.fromisoformat, default=PopulateConfig.end
     )
-    test_expense_4 = Transaction(
-        user_id=test_user_id,
-        type=TransactionType.EXPENSE,
-        amount=33,
-        description="Test transaction 4",
-        date="2021-01-04",
-        category=TransactionCategory.UTILITIES,
+    parser.add_argument(
+        "--transactions-per-user",
+        type=int,
+        default=PopulateConfig.transactions_per_user,
     )
-    db.session.add(test_expense_1)
-    db.session.add(test_expense_2)
-    db.session.add(test_expense_3)
-    db.session.add(test_expense_4)
-    db.session.commit()
-    print("Test expense data added.")
-
-
-def add_test_budgets(test_user_id):
-    print("Adding test budget data...")
-    test_budget_1 = Budget(
-        user_id=test_user_id,
-        category=TransactionCategory.RENT,
-        frequency=Frequency.MONTHLY,
-        amount=500.50,
+    parser.add_argument(
+        "--size-distribution",
+        choices=("fixed", "lognormal", "pareto"),
+        default=PopulateConfig.size_distribution,
     )
-    test_budget_2 = Budget(
-        user_id=test_user_id,
-        category=TransactionCategory.MORTGAGE,
-        frequency=Frequency.MONTHLY,
-        amount=300.33,
+    parser.add_argument("--size-sigma", type=float, default=PopulateConfig.size_sigma)
+    parser.add_argument(
+        "--max-transactions-per-user",
+        type=int,
+        default=PopulateConfig.max_transactions_per_user,
     )
-    test_budget_3 = Budget(
-        user_id=test_user_id,
-        category=TransactionCategory.UTILITIES,
-        frequency=Frequency.FOUR_WEEKLY,
-        amount=200,
+    parser.add_argument(
+        "--budgets-per-user", type=int, default=PopulateConfig.budgets_per_user
     )
-    db.session.add(test_budget_1)
-    db.session.add(test_budget_2)
-    db.session.add(test_budget_3)
-    db.session.commit()
-    print("Test budget data added.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    return parser.parse_args()
 
 
 def main():
-    with app.app_context():
-        print("===== Resetting database ====")
-        reset_database()
-
-        print("===== Adding test user(s) to the database =====")
-        add_test_user()
-        test_user_id = get_test_user_id()[0]
-        print(f"Test user_id: {test_user_id}")
-
-        print("===== Adding test income to the database =====")
-        add_test_income(test_user_id)
+    args = parse_args()
+    if not args.db_uri:
+        raise SystemExit("Set FLOW_DB_URI or pass --db-uri")
 
-        print("===== Adding test expenses to the database =====")
-        add_test_expense(test_user_id)
-
-        print("===== Adding test budgets to the database =====")
-        add_test_budgets(test_user_id)
+    config = PopulateConfig(
+        users=args.users,
+        seed=args.seed,
+        start=args.start,
+        end=args.end,
+        transactions_per_user=args.transactions_per_user,
+        size_distribution=args.size_distribution,
+        size_sigma=args.size_sigma,
+        max_transactions_per_user=args.max_transactions_per_user,
+        budgets_per_user=args.budgets_per_user,
+    )
 
-        print("===== Database population complete =====")
-        print("Closing database connection...")
-        db.session.close()
-        print("Database connection closed.")
+    if args.reset:
+        reset_database(create_engine(args.db_uri))
 
-        print("===== Exiting populate.py =====")
+    started = time.perf_counter()
+    users, transactions, budgets = populate(
+        args.db_uri, config, workers=args.workers, batch_size=args.batch_size
+    )
+    print(
+        f"===== Loaded {users} users, {transactions} transactions and {budgets} budgets "
+        f"in {time.perf_counter() - started:.1f}s ====="
+    )
 
 
 if __name__ == "__main__":